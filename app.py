@@ -18,6 +18,10 @@ def main():
         layout=config.LAYOUT,
         initial_sidebar_state="expanded"
     )
+
+    # 定时在线备份（后台线程，每个进程只启动一次）
+    from services.backup_service import backup_service
+    backup_service.start_scheduler()
     
     # 侧边栏导航
     with st.sidebar:
@@ -32,30 +36,40 @@ def main():
         )
         
         st.markdown("---")
+    
+    # 本次重新运行执行的SQL按页面汇总，显示在侧边栏的性能面板中
+    from database.profiler import query_profiler
+    with query_profiler.scope(page) as profile:
+        with st.sidebar:
+            # 显示统计信息
+            from services.stats_service import stats_service
+            
+            st.markdown("### 📊 Statistics")
+            stats = stats_service.get_stats()
+            
+            st.metric("Total Lemmas", stats['total_lemmas'])
+            st.metric("Topics", stats['topic_count'])
+            st.metric("Examples", stats['total_examples'])
+            st.metric("Relations", stats['total_relations'])
+            
+            st.markdown("---")
+            st.caption("English Dictionary Warehouse v1.0")
+            st.caption("Built with Streamlit & SQLite")
         
-        # 显示统计信息
-        from services.lemma_service import lemma_service
-        
-        st.markdown("### 📊 Statistics")
-        total = lemma_service.count_lemmas()
-        topics = lemma_service.get_all_topics()
-        
-        st.metric("Total Lemmas", total)
-        st.metric("Topics", len(topics))
-        
-        st.markdown("---")
-        st.caption("English Dictionary Warehouse v1.0")
-        st.caption("Built with Streamlit & SQLite")
+        # 路由到对应页面
+        if page == "🔍 Browse":
+            browser.render()
+        elif page == "📝 Add Lemma":
+            add_lemma.render()
+        elif page == "📖 Add Example":
+            add_example.render()
+        elif page == "🔗 Add Relation":
+            add_relation.render()
     
-    # 路由到对应页面
-    if page == "🔍 Browse":
-        browser.render()
-    elif page == "📝 Add Lemma":
-        add_lemma.render()
-    elif page == "📖 Add Example":
-        add_example.render()
-    elif page == "🔗 Add Relation":
-        add_relation.render()
+    if config.QUERY_PROFILER_ENABLED:
+        from ui.components import perf_panel
+        with st.sidebar:
+            perf_panel.render(profile)
 
 
 if __name__ == "__main__":
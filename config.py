@@ -7,9 +7,9 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DB_PATH = os.path.join(DATA_DIR, 'dictionary.db')
-
-# 确保data目录存在
-os.makedirs(DATA_DIR, exist_ok=True)
+BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+BENCHMARK_DIR = os.path.join(BASE_DIR, 'benchmarks')  # tools.benchmark的结果
+# data目录在第一次使用数据库时创建（见DatabaseManager）
 
 # 词性选项
 POS_OPTIONS = [
@@ -31,10 +31,44 @@ RELATION_TYPES = [
     'contextual_synonym',   # 语境同义词
 ]
 
+# 关系网络遍历上限（防止稠密图上展开过大的邻域）
+NETWORK_MAX_NODES = 200
+NETWORK_MAX_EDGES = 1000
+RELATION_GRAPH_CACHE = True  # 在内存中缓存关系图，网络查询和关系计数不再访问数据库
+
 # UI配置
 PAGE_TITLE = "English Dictionary Warehouse"
 PAGE_ICON = "📚"
 LAYOUT = "wide"
+PAGE_SIZE_OPTIONS = [25, 50, 100, 200]  # 列表每页数量选项
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
 # 数据库配置
-DB_TIMEOUT = 30  # 数据库连接超时（秒）
\ No newline at end of file
+DB_TIMEOUT = 30  # 数据库连接超时（秒）
+DB_POOL_SIZE = 8  # 连接池最大连接数（只读连接；写入由单独的写线程完成）
+DB_WRITE_BATCH_SIZE = 64  # 写线程把排队的写任务合并到一个事务中提交，每个事务最多合并的任务数
+DB_POOL_HEALTH_CHECK_INTERVAL = 60  # 空闲连接超过该时长（秒）后复用前先做健康检查
+
+# 服务层读缓存
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_MAX_SIZE = 2048  # 最多缓存的查询结果数（LRU淘汰）
+
+# SQL性能分析
+QUERY_PROFILER_ENABLED = True  # 记录每条SQL的耗时、行数和调用位置，按页面汇总并在侧边栏显示
+SLOW_QUERY_MS = 200  # 超过该耗时（毫秒）的语句写入慢查询日志（logger: database.slow_query）
+PERF_PANEL_TOP_N = 10  # 性能面板显示的最耗时语句数
+
+# 批量导入/导出
+IMPORT_CHUNK_SIZE = 5000  # 每个事务写入的行数
+IMPORT_MAX_ERRORS = 1000  # 导入报告中最多保留的错误明细数
+EXPORT_BATCH_SIZE = 1000  # 导出时每次查询读取的行数
+
+# 备份
+BACKUP_KEEP = 10  # 保留最近的备份数量
+BACKUP_PAGES_PER_STEP = 1024  # 在线备份每步复制的页数，步与步之间写入可以继续
+BACKUP_MAX_RESTARTS = 3  # 分步备份因写入而重新开始的次数上限，超过后改为一次性复制
+BACKUP_INTERVAL_HOURS = 24  # 应用内定时备份的间隔（小时），0表示不自动备份
+BACKUP_INCREMENTAL = True  # 定时备份写入增量备份库（backups/store），否则生成完整的.db副本
+BACKUP_CHUNK_SIZE = 64 * 1024  # 增量备份的分块大小（字节，应为页大小的整数倍）
+BACKUP_COMPRESS_LEVEL = 6  # 增量备份数据块的zlib压缩级别
@@ -1,88 +1,592 @@
 """
 数据库管理器 - 处理所有数据库操作
 """
+import atexit
+import os
+import queue
 import sqlite3
-from typing import List, Optional, Tuple, Any
+import threading
+import time
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple, Any, Iterator
+from database import migrations
+from database.profiler import query_profiler
 import config
 
 
+class ConnectionPool:
+    """
+    SQLite连接池
+
+    线程在使用期间独占一个连接，同一线程内的嵌套调用复用该连接；
+    用完后连接归还到空闲列表，供后续调用（包括Streamlit的其他脚本线程）复用，
+    从而保留SQLite每个连接上的语句缓存和页缓存。
+    query_only为True时连接只能读取。
+    """
+
+    def __init__(self, db_path: str, max_size: int = config.DB_POOL_SIZE,
+                 timeout: float = config.DB_TIMEOUT,
+                 health_check_interval: float = config.DB_POOL_HEALTH_CHECK_INTERVAL,
+                 query_only: bool = False):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.query_only = query_only
+
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []  # (连接, 最后使用时间)
+        self._size = 0  # 已创建且未关闭的连接数
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接（连接会在线程间流转，因此关闭同线程检查）"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # 允许通过列名访问
+        if self.query_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """检查连接是否仍然可用"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection):
+        """关闭并丢弃一个连接"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _checkout(self) -> sqlite3.Connection:
+        """从池中取出一个连接，池满时等待其他线程归还"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            waited = 0.0
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise sqlite3.ProgrammingError("连接池已关闭")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()  # 后进先出，优先复用最热的连接
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError(
+                            f"连接池已耗尽: {self.max_size}个连接在{self.timeout}秒内均未归还")
+                    began = time.monotonic()
+                    self._cond.wait(remaining)
+                    waited += time.monotonic() - began
+            if waited:
+                query_profiler.record_lock_wait(waited)  # 等待其他线程归还连接
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn: sqlite3.Connection):
+        """归还连接，未提交的事务会被回滚"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """租用一个连接；同一线程内嵌套使用时返回同一个连接"""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            lease[1] += 1
+            try:
+                yield lease[0]
+            finally:
+                lease[1] -= 1
+            return
+
+        conn = self._checkout()
+        lease = self._local.lease = [conn, 1]
+        try:
+            yield conn
+        finally:
+            lease[1] -= 1
+            self._local.lease = None
+            self._checkin(conn)
+
+    def close(self):
+        """关闭连接池：立即关闭空闲连接，使用中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """连接池状态"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'closed': self._closed
+            }
+
+
+class WriteQueue:
+    """
+    单写线程
+
+    写线程独占唯一的写连接，按提交顺序执行各线程提交的写任务func(conn)。
+    轮到时已在排队的任务合并到同一个事务中（每个任务对应一个SAVEPOINT，失败只撤销该任务的写入），
+    提交后再通过Future把结果或异常交给调用方。各会话的写入因此在进程内排队，
+    不再争抢SQLite的写锁直到超时，多个小事务也只需一次提交。
+    写任务不能自行提交或回滚。
+    """
+
+    def __init__(self, db_path: str, batch_size: int = config.DB_WRITE_BATCH_SIZE,
+                 timeout: float = config.DB_TIMEOUT):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+        self._queue: queue.Queue = queue.Queue()  # (func, Future)，None表示停止
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batches = 0  # 已执行的事务数
+        self._jobs = 0  # 已执行的任务数
+
+    def submit(self, func: Callable[[sqlite3.Connection], Any]) -> Future:
+        """提交写任务，返回任务所在事务提交后完成的Future（第一次提交时启动写线程）"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("写线程已关闭")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+            self._queue.put((func, future))
+        return future
+
+    def run(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """提交写任务并等待其结果，排队的时间计入写锁等待"""
+        self._check_thread()
+        submitted, began = time.perf_counter(), []
+
+        def job(conn):
+            began.append(time.perf_counter())
+            return func(conn)
+
+        future = self.submit(job)
+        try:
+            return future.result()
+        finally:
+            if began:
+                query_profiler.record_lock_wait(began[0] - submitted)
+
+    @contextmanager
+    def lease(self) -> Iterator[sqlite3.Connection]:
+        """
+        在调用线程中使用写连接（上下文管理器）
+
+        作为一个写任务排队，轮到时写线程把连接交给调用线程并等待块结束；
+        块内抛出异常时撤销块内的写入。块结束后等到所在事务提交才返回。
+        """
+        self._check_thread()
+        handed = Future()
+        finished = threading.Event()
+        failed: List[BaseException] = []
+
+        def job(conn):
+            handed.set_result(conn)
+            finished.wait()
+            if failed:
+                raise failed[0]
+
+        submitted = time.perf_counter()
+        future = self.submit(job)
+        done, _ = wait((handed, future), timeout=self.timeout, return_when=FIRST_COMPLETED)
+        if not done and future.cancel():
+            raise sqlite3.OperationalError(f"写队列在{self.timeout}秒内未轮到本次写入")
+        wait((handed, future), return_when=FIRST_COMPLETED)
+        if not handed.done():
+            future.result()  # 写线程未能开始事务，抛出其异常
+        query_profiler.record_lock_wait(time.perf_counter() - submitted)
+
+        try:
+            yield handed.result()
+        except BaseException as e:
+            failed.append(e)
+            finished.set()
+            try:
+                future.result()
+            except BaseException:
+                pass
+            raise
+        finished.set()
+        started = time.perf_counter()
+        try:
+            future.result()
+        finally:
+            query_profiler.record("COMMIT", time.perf_counter() - started, 0)
+
+    def close(self):
+        """处理完已排队的任务后停止写线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(self.timeout)
+
+    def stats(self) -> dict:
+        """写线程状态"""
+        return {
+            'queued': self._queue.qsize(),
+            'batches': self._batches,
+            'jobs': self._jobs,
+            'closed': self._closed
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建写连接（transaction()块中会交给调用线程使用，因此关闭同线程检查）"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _check_thread(self):
+        """写线程内等待自己的队列会死锁"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("写任务中不能再提交写任务，请直接使用传入的连接")
+
+    def _run(self):
+        """写线程主循环"""
+        conn, error = None, None
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            error = e
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                if conn is None:
+                    for _, future in batch:
+                        if future.set_running_or_notify_cancel():
+                            future.set_exception(error)
+                else:
+                    self._run_batch(conn, batch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _next_batch(self) -> Optional[List[Tuple[Callable, Future]]]:
+        """等待下一个任务，再取出已在排队的任务一起执行；收到停止信号时返回None"""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 先执行完这一批再停止
+                break
+            batch.append(item)
+        return batch
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Callable, Future]]):
+        """在一个事务中执行一批任务，提交后再公布结果"""
+        jobs = [(func, future) for func, future in batch if future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        self._batches += 1
+        self._jobs += len(jobs)
+
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # 其他进程持有写锁时按busy timeout等待
+            for func, future in jobs:
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    result = func(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((future, result, None))
+            conn.commit()
+        except sqlite3.Error as e:
+            # 开始、提交或撤销保存点失败：整个事务回滚，这一批任务全部失败
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            for _, future in jobs:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
 class DatabaseManager:
-    """数据库管理器"""
-    
+    """
+    数据库管理器
+
+    读取使用只读连接池中的连接；所有写入由单写线程（WriteQueue）的唯一写连接完成。
+    数据库使用WAL日志模式，读取不会被正在进行的写入阻塞。
+    """
+
     def __init__(self, db_path: str = config.DB_PATH):
         self.db_path = db_path
-        self._init_database()
-    
-    def _init_database(self):
-        """初始化数据库，创建表"""
-        import os
-        schema_path = os.path.join(config.BASE_DIR, 'database', 'schema.sql')
-        
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            schema = f.read()
-        
-        conn = self.get_connection()
+        self._pool = ConnectionPool(db_path, query_only=True)
+        self._writer = WriteQueue(db_path)
+        self._local = threading.local()  # 当前线程使用的写连接、事务嵌套深度及事务结束后的回调
+        self._ready = False  # 第一次使用时才打开数据库，导入模块不访问数据库
+        self._ready_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """获取一个独立的新数据库连接（调用方负责关闭）"""
+        self._ensure_ready()
+        return self._connect()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        租用连接（上下文管理器）
+
+        在transaction()块或写任务中时返回写连接（能读到本事务尚未提交的写入），
+        否则从只读连接池租用。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        self._ensure_ready()
+        with self._pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        工作单元（上下文管理器）
+
+        最外层在写队列中排队，轮到时块内通过本管理器执行的读写都使用写连接，
+        与同时排队的其他写入一起提交一次，块内抛出异常时撤销块内的全部写入。
+        嵌套使用时对应一个SAVEPOINT，内层失败只回滚内层的写入。
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth > 0:
+            conn = self._local.conn
+            savepoint = f"tx_{depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            self._local.depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.depth = depth
+            return
+
+        self._ensure_ready()
+        self._local.callbacks = []
         try:
-            conn.executescript(schema)
-            conn.commit()
+            with self._writer.lease() as conn:
+                self._local.conn, self._local.depth = conn, 1
+                try:
+                    yield conn
+                finally:
+                    self._local.conn, self._local.depth = None, 0
         finally:
-            conn.close()
-    
-    def get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path, timeout=config.DB_TIMEOUT)
-        conn.row_factory = sqlite3.Row  # 允许通过列名访问
-        return conn
-    
+            callbacks, self._local.callbacks = self._local.callbacks, []
+            for callback in callbacks:
+                callback()
+
+    def in_transaction(self) -> bool:
+        """当前线程是否处于transaction()块或写任务中"""
+        return getattr(self._local, 'depth', 0) > 0
+
+    def after_transaction(self, callback: Callable[[], None]):
+        """在当前线程最外层事务结束（提交或回滚）后调用callback，不在事务中时立即调用"""
+        if self.in_transaction():
+            self._local.callbacks.append(callback)
+        else:
+            callback()
+
+    def write(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        由写线程执行func(conn)，等到所在事务提交后返回其结果（func抛出的异常原样抛出）
+
+        func中通过本管理器执行的语句同样使用写连接；已在事务中时直接在当前事务中执行。
+        func不能自行提交或回滚。
+        """
+        if self.in_transaction():
+            with self.transaction() as conn:
+                return func(conn)
+
+        self._ensure_ready()
+        callbacks = []
+
+        def job(conn):
+            self._local.conn, self._local.depth, self._local.callbacks = conn, 1, []
+            try:
+                return func(conn)
+            finally:
+                callbacks.extend(self._local.callbacks)
+                self._local.conn, self._local.depth = None, 0
+
+        try:
+            return self._writer.run(job)
+        finally:
+            for callback in callbacks:
+                callback()
+
+    def close(self):
+        """停止写线程并关闭连接池中的所有连接"""
+        self._writer.close()
+        self._pool.close()
+
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """执行查询并返回所有结果"""
-        conn = self.get_connection()
+        self._ensure_ready()  # 第一次使用时的迁移不计入这条语句的耗时
+        started, rows = time.perf_counter(), []
         try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
+            with self.connection() as conn:
+                cursor = conn.execute(query, params)
+                try:
+                    rows = cursor.fetchall()
+                    return rows
+                finally:
+                    cursor.close()
         finally:
-            conn.close()
-    
+            query_profiler.record(query, time.perf_counter() - started, len(rows), params)
+
     def execute_insert(self, query: str, params: tuple = ()) -> Optional[int]:
-        """执行插入并返回lastrowid"""
-        conn = self.get_connection()
+        """执行插入并返回lastrowid（在transaction()块中时由事务统一提交）"""
         try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.lastrowid
+            lastrowid, _ = self._execute_write(False, query, params)
+            return lastrowid
         except sqlite3.IntegrityError as e:
+            # 失败的语句已由SQLite自行撤销，事务中的其他写入交给事务决定去留
             raise ValueError(f"数据库约束错误: {str(e)}")
-        finally:
-            conn.close()
-    
+
     def execute_update(self, query: str, params: tuple = ()) -> int:
-        """执行更新并返回影响的行数"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
-    
+        """执行更新并返回影响的行数（在transaction()块中时由事务统一提交）"""
+        return self._execute_write(False, query, params)[1]
+
     def execute_delete(self, query: str, params: tuple = ()) -> int:
         """执行删除并返回影响的行数"""
         return self.execute_update(query, params)
-    
+
     def execute_many(self, query: str, params_list: List[tuple]) -> int:
-        """批量执行SQL"""
-        conn = self.get_connection()
+        """批量执行SQL（在transaction()块中时由事务统一提交）"""
+        return self._execute_write(True, query, params_list)[1]
+
+    def _execute_write(self, many: bool, query: str, params) -> Tuple[Optional[int], int]:
+        """
+        执行一条写语句，返回(lastrowid, rowcount)
+
+        已在transaction()块中时加入该事务，否则作为一个写任务交给写线程，提交后返回。
+        耗时（包括排队和提交）交给性能分析记录。
+        """
+        def execute(conn: sqlite3.Connection) -> Tuple[Optional[int], int]:
+            cursor = (conn.executemany if many else conn.execute)(query, params)
+            return cursor.lastrowid, cursor.rowcount
+
+        self._ensure_ready()
+        started, rowcount = time.perf_counter(), 0
         try:
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
-            return cursor.rowcount
+            if self.in_transaction():
+                lastrowid, rowcount = execute(self._local.conn)
+            else:
+                lastrowid, rowcount = self._writer.run(execute)
+            return lastrowid, rowcount
         finally:
-            conn.close()
+            query_profiler.record(query, time.perf_counter() - started, rowcount, params)
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开一个新连接"""
+        conn = sqlite3.connect(self.db_path, timeout=config.DB_TIMEOUT)
+        conn.row_factory = sqlite3.Row  # 允许通过列名访问
+        return conn
+
+    def _ensure_ready(self):
+        """
+        第一次使用时准备数据库：切换到WAL日志模式并执行尚未应用的迁移
+
+        已是最新版本时只在只读连接上读取journal_mode和user_version，
+        该连接随后留在连接池中供查询使用。
+        """
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._pool.connection() as conn:
+                journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                version = migrations.current_version(conn)
+            if journal_mode != 'wal' or version < migrations.latest_version():
+                conn = self._connect()
+                try:
+                    # 保存在数据库文件中，之后的连接都使用WAL；读取不会被正在进行的写入阻塞
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    migrations.migrate(conn)
+                finally:
+                    conn.close()
+            self._ready = True
 
 
 # 全局数据库实例
-db = DatabaseManager()
\ No newline at end of file
+db = DatabaseManager()
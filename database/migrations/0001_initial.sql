@@ -1,3 +1,5 @@
+-- 0001: 基本表和索引
+
 -- Lemmas表 (Sheet 1)
 CREATE TABLE IF NOT EXISTS lemmas (
     id TEXT PRIMARY KEY,
@@ -48,6 +50,8 @@ CREATE TABLE IF NOT EXISTS relations (
 -- 创建索引以提高查询性能
 CREATE INDEX IF NOT EXISTS idx_lemmas_lemma ON lemmas(lemma);
 CREATE INDEX IF NOT EXISTS idx_lemmas_topic ON lemmas(topic);
+CREATE INDEX IF NOT EXISTS idx_lemmas_topic_lemma ON lemmas(topic, lemma);
+CREATE INDEX IF NOT EXISTS idx_lemmas_created_at ON lemmas(created_at, lemma);
 CREATE INDEX IF NOT EXISTS idx_example_lemma_links_lemma ON example_lemma_links(lemma);
-CREATE INDEX IF NOT EXISTS idx_relations_lemma1 ON relations(lemma1, specific_word1);
-CREATE INDEX IF NOT EXISTS idx_relations_lemma2 ON relations(lemma2, specific_word2);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_relations_word1 ON relations(lemma1, specific_word1, created_at);
+CREATE INDEX IF NOT EXISTS idx_relations_word2 ON relations(lemma2, specific_word2, created_at);
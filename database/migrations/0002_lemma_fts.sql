@@ -0,0 +1,46 @@
+-- 0002: Lemma全文索引
+
+-- Lemma全文索引 (FTS5)：覆盖lemma、释义、搭配、派生词和topic，rowid与lemmas.rowid对应
+CREATE VIRTUAL TABLE IF NOT EXISTS lemmas_fts USING fts5(
+    lemma, meanings, collocation, derivation, topic
+);
+
+-- 从lemmas行提取可检索文本：pos_meaning中的meanings、derivation中的word
+CREATE VIEW IF NOT EXISTS lemma_search_text AS
+SELECT
+    l.rowid AS rowid,
+    l.lemma AS lemma,
+    (SELECT group_concat(j.value, ' ')
+     FROM json_tree(CASE WHEN json_valid(l.pos_meaning) THEN l.pos_meaning ELSE '[]' END) j
+     WHERE j.type = 'text' AND j.path LIKE '%.meanings') AS meanings,
+    l.collocation AS collocation,
+    (SELECT group_concat(j.value, ' ')
+     FROM json_tree(CASE WHEN json_valid(l.derivation) THEN l.derivation ELSE '[]' END) j
+     WHERE j.type = 'text' AND j.key = 'word') AS derivation,
+    l.topic AS topic
+FROM lemmas l;
+
+-- 触发器保持全文索引与lemmas表同步
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_insert AFTER INSERT ON lemmas BEGIN
+    INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+    SELECT rowid, lemma, meanings, collocation, derivation, topic
+    FROM lemma_search_text WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_delete AFTER DELETE ON lemmas BEGIN
+    DELETE FROM lemmas_fts WHERE rowid = OLD.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_update
+AFTER UPDATE OF lemma, pos_meaning, collocation, derivation, topic ON lemmas BEGIN
+    DELETE FROM lemmas_fts WHERE rowid = OLD.rowid;
+    INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+    SELECT rowid, lemma, meanings, collocation, derivation, topic
+    FROM lemma_search_text WHERE rowid = NEW.rowid;
+END;
+
+-- 首次创建索引时为已有数据建立索引
+INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+SELECT rowid, lemma, meanings, collocation, derivation, topic
+FROM lemma_search_text
+WHERE NOT EXISTS (SELECT 1 FROM lemmas_fts);
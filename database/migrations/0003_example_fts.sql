@@ -0,0 +1,27 @@
+-- 0003: Example全文索引
+
+-- Example全文索引 (FTS5)：外部内容表，直接引用examples表的文本，rowid与examples.rowid对应
+CREATE VIRTUAL TABLE IF NOT EXISTS examples_fts USING fts5(
+    example, content='examples'
+);
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_insert AFTER INSERT ON examples BEGIN
+    INSERT INTO examples_fts (rowid, example) VALUES (NEW.rowid, NEW.example);
+END;
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_delete AFTER DELETE ON examples BEGIN
+    INSERT INTO examples_fts (examples_fts, rowid, example) VALUES ('delete', OLD.rowid, OLD.example);
+END;
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_update AFTER UPDATE OF example ON examples BEGIN
+    INSERT INTO examples_fts (examples_fts, rowid, example) VALUES ('delete', OLD.rowid, OLD.example);
+    INSERT INTO examples_fts (rowid, example) VALUES (NEW.rowid, NEW.example);
+END;
+
+-- 首次创建索引时为已有数据建立索引（外部内容表没有数据时docsize为空）
+INSERT INTO examples_fts (examples_fts)
+SELECT 'rebuild'
+WHERE NOT EXISTS (SELECT 1 FROM examples_fts_docsize) AND EXISTS (SELECT 1 FROM examples);
+
+-- 例句列表默认按创建时间倒序
+CREATE INDEX IF NOT EXISTS idx_examples_created_at ON examples(created_at, id);
@@ -0,0 +1,103 @@
+-- 0004: 统计表及维护触发器
+
+-- 统计表：由触发器实时维护，侧边栏和Browse页的指标直接读取
+CREATE TABLE IF NOT EXISTS corpus_stats (
+    name TEXT PRIMARY KEY,      -- 'lemmas', 'examples', 'relations', 'lemmas_with_examples'
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS topic_stats (
+    topic TEXT PRIMARY KEY,
+    lemma_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- 首次创建时根据已有数据初始化（先清理已删除example遗留的关联）
+DELETE FROM example_lemma_links
+WHERE NOT EXISTS (SELECT 1 FROM corpus_stats)
+  AND example_id NOT IN (SELECT id FROM examples);
+
+INSERT INTO topic_stats (topic, lemma_count)
+SELECT topic, COUNT(*) FROM lemmas
+WHERE topic IS NOT NULL AND NOT EXISTS (SELECT 1 FROM corpus_stats)
+GROUP BY topic;
+
+INSERT INTO corpus_stats (name, value)
+SELECT name, value FROM (
+    SELECT 'lemmas' AS name, (SELECT COUNT(*) FROM lemmas) AS value
+    UNION ALL
+    SELECT 'examples', (SELECT COUNT(*) FROM examples)
+    UNION ALL
+    SELECT 'relations', (SELECT COUNT(*) FROM relations)
+    UNION ALL
+    SELECT 'lemmas_with_examples', (SELECT COUNT(*) FROM lemmas l
+        WHERE EXISTS (SELECT 1 FROM example_lemma_links el WHERE el.lemma = l.lemma))
+)
+WHERE NOT EXISTS (SELECT 1 FROM corpus_stats);
+
+-- lemmas: 总数、topic分布、有example的lemma数
+CREATE TRIGGER IF NOT EXISTS stats_lemma_insert AFTER INSERT ON lemmas BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas';
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = NEW.lemma);
+    INSERT INTO topic_stats (topic, lemma_count)
+    SELECT NEW.topic, 1 WHERE NEW.topic IS NOT NULL
+    ON CONFLICT (topic) DO UPDATE SET lemma_count = lemma_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_delete AFTER DELETE ON lemmas BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas';
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma);
+    UPDATE topic_stats SET lemma_count = lemma_count - 1 WHERE topic = OLD.topic;
+    DELETE FROM topic_stats WHERE topic = OLD.topic AND lemma_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_update_topic AFTER UPDATE OF topic ON lemmas
+WHEN OLD.topic IS NOT NEW.topic BEGIN
+    UPDATE topic_stats SET lemma_count = lemma_count - 1 WHERE topic = OLD.topic;
+    DELETE FROM topic_stats WHERE topic = OLD.topic AND lemma_count <= 0;
+    INSERT INTO topic_stats (topic, lemma_count)
+    SELECT NEW.topic, 1 WHERE NEW.topic IS NOT NULL
+    ON CONFLICT (topic) DO UPDATE SET lemma_count = lemma_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_rename AFTER UPDATE OF lemma ON lemmas
+WHEN OLD.lemma IS NOT NEW.lemma BEGIN
+    UPDATE corpus_stats SET value = value
+        + EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = NEW.lemma)
+        - EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma)
+    WHERE name = 'lemmas_with_examples';
+END;
+
+-- examples: 总数；删除example时一并删除其关联（外键未启用，不会自动级联）
+CREATE TRIGGER IF NOT EXISTS stats_example_insert AFTER INSERT ON examples BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'examples';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_example_delete AFTER DELETE ON examples BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'examples';
+    DELETE FROM example_lemma_links WHERE example_id = OLD.id;
+END;
+
+-- example_lemma_links: lemma的第一条/最后一条关联改变"有example的lemma数"
+CREATE TRIGGER IF NOT EXISTS stats_link_insert AFTER INSERT ON example_lemma_links BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM lemmas WHERE lemma = NEW.lemma)
+        AND NOT EXISTS (SELECT 1 FROM example_lemma_links
+                        WHERE lemma = NEW.lemma AND example_id <> NEW.example_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_link_delete AFTER DELETE ON example_lemma_links BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM lemmas WHERE lemma = OLD.lemma)
+        AND NOT EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma);
+END;
+
+-- relations: 总数
+CREATE TRIGGER IF NOT EXISTS stats_relation_insert AFTER INSERT ON relations BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'relations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_relation_delete AFTER DELETE ON relations BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'relations';
+END;
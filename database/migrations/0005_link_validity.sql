@@ -0,0 +1,22 @@
+-- 0005: example关联有效性触发器
+
+-- example关联的有效性：lemma新增、删除、改名时同步更新is_valid
+-- 首次创建触发器时先按当前数据修正已有关联（之前删除lemma不会把关联标为无效）
+UPDATE example_lemma_links
+SET is_valid = (lemma IN (SELECT lemma FROM lemmas))
+WHERE NOT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'links_lemma_insert')
+  AND is_valid IS NOT (lemma IN (SELECT lemma FROM lemmas));
+
+CREATE TRIGGER IF NOT EXISTS links_lemma_insert AFTER INSERT ON lemmas BEGIN
+    UPDATE example_lemma_links SET is_valid = 1 WHERE lemma = NEW.lemma AND is_valid = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS links_lemma_delete AFTER DELETE ON lemmas BEGIN
+    UPDATE example_lemma_links SET is_valid = 0 WHERE lemma = OLD.lemma AND is_valid = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS links_lemma_rename AFTER UPDATE OF lemma ON lemmas
+WHEN OLD.lemma IS NOT NEW.lemma BEGIN
+    UPDATE example_lemma_links SET is_valid = 0 WHERE lemma = OLD.lemma AND is_valid = 1;
+    UPDATE example_lemma_links SET is_valid = 1 WHERE lemma = NEW.lemma AND is_valid = 0;
+END;
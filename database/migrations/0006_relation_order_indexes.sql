@@ -0,0 +1,8 @@
+-- 0006: relations按lemma和created_at的索引
+
+-- 按lemma取relations时两侧都能按created_at顺序读出，合并时不需要再排序
+-- （替代只含lemma1/lemma2的旧索引idx_relations_lemma1/2）
+CREATE INDEX IF NOT EXISTS idx_relations_lemma1_created_at ON relations(lemma1, created_at);
+CREATE INDEX IF NOT EXISTS idx_relations_lemma2_created_at ON relations(lemma2, created_at);
+DROP INDEX IF EXISTS idx_relations_lemma1;
+DROP INDEX IF EXISTS idx_relations_lemma2;
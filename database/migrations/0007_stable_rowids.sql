@@ -0,0 +1,180 @@
+-- 0007: lemmas和examples改用显式的INTEGER PRIMARY KEY
+
+-- 全文索引按rowid对应lemmas/examples的行。主键为TEXT的表使用隐式rowid，
+-- VACUUM可能重新编号，索引就会静默地指向错误的行。
+-- 新增的seq列是rowid的别名，编号保存在表中不会改变，查询中的rowid照常使用。
+-- 重建表时保留原有rowid，引用这两个表的视图和触发器先删除、重建后按原定义创建。
+
+DROP VIEW IF EXISTS lemma_search_text;
+DROP TRIGGER IF EXISTS stats_link_insert;
+DROP TRIGGER IF EXISTS stats_link_delete;
+
+CREATE TABLE lemmas_new (
+    seq INTEGER PRIMARY KEY,    -- rowid的别名，全文索引的行号
+    id TEXT UNIQUE,
+    lemma TEXT UNIQUE NOT NULL,
+    pronunciation_british TEXT,
+    spell_nuance TEXT,
+    pos_meaning TEXT,           -- JSON格式: [{"pos": "n.", "meanings": ["意思1", "意思2"]}]
+    inflection TEXT,            -- JSON格式: {"verb": ["past", "past_participle"], "noun": ["plural"]}
+    derivation TEXT,            -- JSON格式: [{"word": "derived_word", "meaning": "特殊含义"}]
+    collocation TEXT,
+    topic TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO lemmas_new (seq, id, lemma, pronunciation_british, spell_nuance, pos_meaning,
+                        inflection, derivation, collocation, topic, created_at, updated_at)
+SELECT rowid, id, lemma, pronunciation_british, spell_nuance, pos_meaning,
+       inflection, derivation, collocation, topic, created_at, updated_at
+FROM lemmas;
+
+DROP TABLE lemmas;
+ALTER TABLE lemmas_new RENAME TO lemmas;
+
+CREATE TABLE examples_new (
+    seq INTEGER PRIMARY KEY,    -- rowid的别名，全文索引的行号
+    id TEXT UNIQUE,
+    example TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO examples_new (seq, id, example, created_at)
+SELECT rowid, id, example, created_at FROM examples;
+
+DROP TABLE examples;
+ALTER TABLE examples_new RENAME TO examples;
+
+-- 索引（同0001、0003）
+CREATE INDEX IF NOT EXISTS idx_lemmas_lemma ON lemmas(lemma);
+CREATE INDEX IF NOT EXISTS idx_lemmas_topic ON lemmas(topic);
+CREATE INDEX IF NOT EXISTS idx_lemmas_topic_lemma ON lemmas(topic, lemma);
+CREATE INDEX IF NOT EXISTS idx_lemmas_created_at ON lemmas(created_at, lemma);
+CREATE INDEX IF NOT EXISTS idx_examples_created_at ON examples(created_at, id);
+
+-- 全文索引的视图和触发器（同0002、0003）
+CREATE VIEW IF NOT EXISTS lemma_search_text AS
+SELECT
+    l.rowid AS rowid,
+    l.lemma AS lemma,
+    (SELECT group_concat(j.value, ' ')
+     FROM json_tree(CASE WHEN json_valid(l.pos_meaning) THEN l.pos_meaning ELSE '[]' END) j
+     WHERE j.type = 'text' AND j.path LIKE '%.meanings') AS meanings,
+    l.collocation AS collocation,
+    (SELECT group_concat(j.value, ' ')
+     FROM json_tree(CASE WHEN json_valid(l.derivation) THEN l.derivation ELSE '[]' END) j
+     WHERE j.type = 'text' AND j.key = 'word') AS derivation,
+    l.topic AS topic
+FROM lemmas l;
+
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_insert AFTER INSERT ON lemmas BEGIN
+    INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+    SELECT rowid, lemma, meanings, collocation, derivation, topic
+    FROM lemma_search_text WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_delete AFTER DELETE ON lemmas BEGIN
+    DELETE FROM lemmas_fts WHERE rowid = OLD.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lemmas_fts_update
+AFTER UPDATE OF lemma, pos_meaning, collocation, derivation, topic ON lemmas BEGIN
+    DELETE FROM lemmas_fts WHERE rowid = OLD.rowid;
+    INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+    SELECT rowid, lemma, meanings, collocation, derivation, topic
+    FROM lemma_search_text WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_insert AFTER INSERT ON examples BEGIN
+    INSERT INTO examples_fts (rowid, example) VALUES (NEW.rowid, NEW.example);
+END;
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_delete AFTER DELETE ON examples BEGIN
+    INSERT INTO examples_fts (examples_fts, rowid, example) VALUES ('delete', OLD.rowid, OLD.example);
+END;
+
+CREATE TRIGGER IF NOT EXISTS examples_fts_update AFTER UPDATE OF example ON examples BEGIN
+    INSERT INTO examples_fts (examples_fts, rowid, example) VALUES ('delete', OLD.rowid, OLD.example);
+    INSERT INTO examples_fts (rowid, example) VALUES (NEW.rowid, NEW.example);
+END;
+
+-- 统计触发器（同0004）
+CREATE TRIGGER IF NOT EXISTS stats_lemma_insert AFTER INSERT ON lemmas BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas';
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = NEW.lemma);
+    INSERT INTO topic_stats (topic, lemma_count)
+    SELECT NEW.topic, 1 WHERE NEW.topic IS NOT NULL
+    ON CONFLICT (topic) DO UPDATE SET lemma_count = lemma_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_delete AFTER DELETE ON lemmas BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas';
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma);
+    UPDATE topic_stats SET lemma_count = lemma_count - 1 WHERE topic = OLD.topic;
+    DELETE FROM topic_stats WHERE topic = OLD.topic AND lemma_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_update_topic AFTER UPDATE OF topic ON lemmas
+WHEN OLD.topic IS NOT NEW.topic BEGIN
+    UPDATE topic_stats SET lemma_count = lemma_count - 1 WHERE topic = OLD.topic;
+    DELETE FROM topic_stats WHERE topic = OLD.topic AND lemma_count <= 0;
+    INSERT INTO topic_stats (topic, lemma_count)
+    SELECT NEW.topic, 1 WHERE NEW.topic IS NOT NULL
+    ON CONFLICT (topic) DO UPDATE SET lemma_count = lemma_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_lemma_rename AFTER UPDATE OF lemma ON lemmas
+WHEN OLD.lemma IS NOT NEW.lemma BEGIN
+    UPDATE corpus_stats SET value = value
+        + EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = NEW.lemma)
+        - EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma)
+    WHERE name = 'lemmas_with_examples';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_example_insert AFTER INSERT ON examples BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'examples';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_example_delete AFTER DELETE ON examples BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'examples';
+    DELETE FROM example_lemma_links WHERE example_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_link_insert AFTER INSERT ON example_lemma_links BEGIN
+    UPDATE corpus_stats SET value = value + 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM lemmas WHERE lemma = NEW.lemma)
+        AND NOT EXISTS (SELECT 1 FROM example_lemma_links
+                        WHERE lemma = NEW.lemma AND example_id <> NEW.example_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_link_delete AFTER DELETE ON example_lemma_links BEGIN
+    UPDATE corpus_stats SET value = value - 1 WHERE name = 'lemmas_with_examples'
+        AND EXISTS (SELECT 1 FROM lemmas WHERE lemma = OLD.lemma)
+        AND NOT EXISTS (SELECT 1 FROM example_lemma_links WHERE lemma = OLD.lemma);
+END;
+
+-- 关联有效性触发器（同0005）
+CREATE TRIGGER IF NOT EXISTS links_lemma_insert AFTER INSERT ON lemmas BEGIN
+    UPDATE example_lemma_links SET is_valid = 1 WHERE lemma = NEW.lemma AND is_valid = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS links_lemma_delete AFTER DELETE ON lemmas BEGIN
+    UPDATE example_lemma_links SET is_valid = 0 WHERE lemma = OLD.lemma AND is_valid = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS links_lemma_rename AFTER UPDATE OF lemma ON lemmas
+WHEN OLD.lemma IS NOT NEW.lemma BEGIN
+    UPDATE example_lemma_links SET is_valid = 0 WHERE lemma = OLD.lemma AND is_valid = 1;
+    UPDATE example_lemma_links SET is_valid = 1 WHERE lemma = NEW.lemma AND is_valid = 0;
+END;
+
+-- 之前若执行过VACUUM，全文索引可能已与行错位，按当前数据重建
+DELETE FROM lemmas_fts;
+INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+SELECT rowid, lemma, meanings, collocation, derivation, topic
+FROM lemma_search_text;
+
+INSERT INTO examples_fts (examples_fts) VALUES ('rebuild');
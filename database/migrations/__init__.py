@@ -0,0 +1,94 @@
+"""
+数据库迁移
+
+本目录下按编号命名的SQL文件（0001_initial.sql, 0002_lemma_fts.sql, ...）依次定义表结构，
+数据库已应用到的编号保存在 PRAGMA user_version 中。启动时只执行编号更大的迁移，
+已是最新版本时只读取一次user_version。
+
+已发布的迁移不要再修改，结构变更写成编号更大的新文件。
+0001-0006来自引入版本号之前的schema.sql，其中的语句都可以重复执行，
+因此没有版本号的旧数据库（user_version为0）会从头补齐缺少的部分。
+"""
+import os
+import re
+import sqlite3
+from typing import Iterator, List, Tuple
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_FILENAME = re.compile(r"^(\d+)_\w+\.sql$")
+
+
+def available() -> List[Tuple[int, str]]:
+    """全部迁移 [(编号, 文件路径)]，按编号排序"""
+    migrations = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = _FILENAME.match(name)
+        if match:
+            migrations.append((int(match.group(1)), os.path.join(MIGRATIONS_DIR, name)))
+    migrations.sort()
+    numbers = [number for number, _ in migrations]
+    if len(set(numbers)) != len(numbers):
+        raise ValueError(f"迁移编号重复: {numbers}")
+    return migrations
+
+
+def latest_version() -> int:
+    """最新的迁移编号（没有迁移时为0）"""
+    migrations = available()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """数据库已应用到的迁移编号"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """
+    执行尚未应用的迁移
+
+    每个迁移在一个事务中执行并同时更新user_version，失败时该迁移整体回滚。
+    多个进程同时启动时由写锁串行，取得写锁后重新读取版本号，已被其他进程执行的迁移会跳过。
+
+    Returns:
+        本次执行的迁移编号
+    """
+    applied = []
+    for number, path in available():
+        if current_version(conn) >= number:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= number:
+                conn.rollback()
+                continue
+            for statement in _statements(sql):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(number)
+    return applied
+
+
+def _statements(sql: str) -> Iterator[str]:
+    """
+    把迁移文件拆成单条语句
+
+    不使用executescript：它会先提交当前事务，迁移和版本号就不能在同一个事务中提交。
+    """
+    statement = ''
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ''
+    rest = [line for line in statement.splitlines() if line.strip() and not line.strip().startswith('--')]
+    if rest:
+        raise ValueError(f"迁移末尾的语句不完整: {rest[0]}")
@@ -1,9 +1,11 @@
 """
 数据模型定义
 """
+from collections.abc import Mapping, MutableMapping
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Sequence, Tuple
 from datetime import datetime
+from utils.helpers import from_json, to_json
 
 
 @dataclass
@@ -45,6 +47,13 @@ class Example:
     created_at: Optional[datetime] = None
 
 
+@dataclass
+class ExampleLink:
+    """Example关联的lemma（is_valid表示该lemma当前是否存在）"""
+    lemma: str
+    is_valid: bool = True
+
+
 @dataclass
 class Relation:
     """Relation数据模型 (Sheet 3)"""
@@ -55,4 +64,263 @@ class Relation:
     specific_word2: str
     relation_type: str
     note: Optional[str] = None
-    created_at: Optional[datetime] = None
\ No newline at end of file
+    created_at: Optional[datetime] = None
+
+
+class LazyRow(MutableMapping):
+    """
+    按需解码JSON列的行字典
+
+    用法与dict相同；json_columns中的列保存原始JSON字符串，
+    第一次访问时才用from_json解码，列表只显示部分字段时不必解析每一行的全部JSON。
+    """
+
+    __slots__ = ('_data', '_pending')
+
+    def __init__(self, data: Dict[str, Any], json_columns: Iterable[str] = ()):
+        self._data = data
+        self._pending = {column for column in json_columns if column in data}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._pending:
+            self._pending.discard(key)
+            self._data[key] = from_json(self._data[key])
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self._pending.discard(key)
+        self._data[key] = value
+
+    def __delitem__(self, key: str):
+        self._pending.discard(key)
+        del self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __repr__(self) -> str:
+        return f"LazyRow({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return LazyRow, (dict(self._data), tuple(self._pending))
+
+    def copy(self) -> 'LazyRow':
+        return LazyRow(dict(self._data), self._pending)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """解码全部JSON列，返回普通dict"""
+        return {key: self[key] for key in self._data}
+
+
+class Record(Mapping):
+    """
+    紧凑记录的基类
+
+    字段保存在__slots__中，没有实例__dict__，比每行一个dict省内存、创建更快。
+    既可以用属性访问（record.lemma），也可以像dict一样访问
+    （record['lemma']、get、keys、items、in），UI代码无需区分；
+    只能修改已有字段，不能增加新键。
+
+    子类声明_fields（与构造函数参数及查询列的顺序一致）和__slots__；
+    _json_fields中的字段以JSON字符串传入，用JsonField在首次读取时解码。
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _field_set = frozenset()
+    _json_fields: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'Record':
+        """由列顺序与_fields一致的查询行创建记录"""
+        return cls(*row)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self._field_set:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_set
+
+    def __repr__(self) -> str:
+        values = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        # JSON字段按构造函数的约定传入JSON字符串：已解码的字段可能被修改过，按当前值重新编码，
+        # 从未解码的字段直接使用原始JSON
+        values = []
+        for name in self._fields:
+            if name in self._json_fields:
+                try:
+                    values.append(to_json(getattr(self, f'_{name}')))
+                except AttributeError:
+                    values.append(getattr(self, f'_{name}_json'))
+            else:
+                values.append(getattr(self, name))
+        return type(self), tuple(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通dict（JSON字段会被解码）"""
+        return {name: getattr(self, name) for name in self._fields}
+
+
+class JsonField:
+    """
+    Record的JSON字段：原始JSON保存在_<name>_json槽中，首次读取时用from_json解码
+    并保存到_<name>槽中，赋值直接写入解码后的值
+    """
+
+    def __set_name__(self, owner: type, name: str):
+        self._decoded = f'_{name}'
+        self._raw = f'_{name}_json'
+
+    def __get__(self, instance: Optional[Record], owner: type = None) -> Any:
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self._decoded)
+        except AttributeError:
+            value = from_json(getattr(instance, self._raw))
+            setattr(instance, self._decoded, value)
+            return value
+
+    def __set__(self, instance: Record, value: Any):
+        setattr(instance, self._decoded, value)
+
+
+# 服务层可选返回的记录类型
+
+class LemmaRecord(Record):
+    """Lemma记录：全部字段，pos_meaning/inflection/derivation首次访问时才解码"""
+
+    __slots__ = ('id', 'lemma', 'pronunciation_british', 'spell_nuance',
+                 '_pos_meaning_json', '_pos_meaning', '_inflection_json', '_inflection',
+                 '_derivation_json', '_derivation', 'collocation', 'topic', 'created_at', 'updated_at')
+    _fields = ('id', 'lemma', 'pronunciation_british', 'spell_nuance', 'pos_meaning',
+               'inflection', 'derivation', 'collocation', 'topic', 'created_at', 'updated_at')
+    _json_fields = ('pos_meaning', 'inflection', 'derivation')
+
+    pos_meaning = JsonField()
+    inflection = JsonField()
+    derivation = JsonField()
+
+    def __init__(self, id: str, lemma: str, pronunciation_british: Optional[str],
+                 spell_nuance: Optional[str], pos_meaning: Optional[str], inflection: Optional[str],
+                 derivation: Optional[str], collocation: Optional[str], topic: Optional[str],
+                 created_at: Optional[str], updated_at: Optional[str]):
+        self.id = id
+        self.lemma = lemma
+        self.pronunciation_british = pronunciation_british
+        self.spell_nuance = spell_nuance
+        self._pos_meaning_json = pos_meaning
+        self._inflection_json = inflection
+        self._derivation_json = derivation
+        self.collocation = collocation
+        self.topic = topic
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class LemmaDetailRecord(LemmaRecord):
+    """Lemma列表记录（detail）：全部字段及example/relation数量"""
+
+    __slots__ = ('example_count', 'relation_count')
+    _fields = LemmaRecord._fields + ('example_count', 'relation_count')
+
+    def __init__(self, id: str, lemma: str, pronunciation_british: Optional[str],
+                 spell_nuance: Optional[str], pos_meaning: Optional[str], inflection: Optional[str],
+                 derivation: Optional[str], collocation: Optional[str], topic: Optional[str],
+                 created_at: Optional[str], updated_at: Optional[str],
+                 example_count: int, relation_count: int):
+        super().__init__(id, lemma, pronunciation_british, spell_nuance, pos_meaning, inflection,
+                         derivation, collocation, topic, created_at, updated_at)
+        self.example_count = example_count
+        self.relation_count = relation_count
+
+
+class LemmaSummaryRecord(Record):
+    """Lemma列表记录（summary）：列表显示的字段及example/relation数量"""
+
+    __slots__ = ('id', 'lemma', 'pronunciation_british', 'topic', 'created_at', 'updated_at',
+                 'example_count', 'relation_count')
+    _fields = __slots__
+
+    def __init__(self, id: str, lemma: str, pronunciation_british: Optional[str],
+                 topic: Optional[str], created_at: Optional[str], updated_at: Optional[str],
+                 example_count: int, relation_count: int):
+        self.id = id
+        self.lemma = lemma
+        self.pronunciation_british = pronunciation_british
+        self.topic = topic
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.example_count = example_count
+        self.relation_count = relation_count
+
+
+class ExampleLinkRecord(Record):
+    """Example关联的lemma记录"""
+
+    __slots__ = ('lemma', 'is_valid')
+    _fields = __slots__
+
+    def __init__(self, lemma: str, is_valid: bool = True):
+        self.lemma = lemma
+        self.is_valid = is_valid
+
+
+class ExampleRecord(Record):
+    """Example记录，lemmas为ExampleLinkRecord列表"""
+
+    __slots__ = ('id', 'example', 'lemmas', 'created_at')
+    _fields = __slots__
+
+    def __init__(self, id: str, example: str, lemmas: List[ExampleLinkRecord],
+                 created_at: Optional[str]):
+        self.id = id
+        self.example = example
+        self.lemmas = lemmas
+        self.created_at = created_at
+
+
+class RelationRecord(Record):
+    """Relation记录"""
+
+    __slots__ = ('id', 'lemma1', 'specific_word1', 'lemma2', 'specific_word2',
+                 'relation_type', 'note', 'created_at')
+    _fields = __slots__
+
+    def __init__(self, id: int, lemma1: str, specific_word1: str, lemma2: str,
+                 specific_word2: str, relation_type: str, note: Optional[str],
+                 created_at: Optional[str]):
+        self.id = id
+        self.lemma1 = lemma1
+        self.specific_word1 = specific_word1
+        self.lemma2 = lemma2
+        self.specific_word2 = specific_word2
+        self.relation_type = relation_type
+        self.note = note
+        self.created_at = created_at
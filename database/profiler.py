@@ -0,0 +1,287 @@
+"""
+SQL性能分析
+
+DatabaseManager执行的每条语句都会交给query_profiler.record()：
+- 超过SLOW_QUERY_MS的语句写入慢查询日志（logger: database.slow_query），与是否在统计范围内无关；
+- 在scope()范围内执行的语句按规范化后的SQL汇总次数、耗时、行数和调用位置。
+
+app.py把每次Streamlit重新运行包在一个以页面命名的scope中，
+结束后并入该页面的累计统计，供侧边栏的性能面板显示。
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import config
+
+
+slow_query_logger = logging.getLogger('database.slow_query')
+
+# 调用位置跳过的文件：数据库层本身、缓存装饰器和contextlib
+_INTERNAL_FILES = {
+    os.path.normcase(os.path.abspath(__file__)).rsplit('.', 1)[0],
+    os.path.normcase(os.path.join(config.BASE_DIR, 'database', 'db_manager')),
+    os.path.normcase(os.path.join(config.BASE_DIR, 'services', 'cache')),
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStat:
+    """一条规范化SQL的汇总"""
+
+    __slots__ = ('sql', 'count', 'total', 'max', 'rows', 'sites')
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0  # 秒
+        self.max = 0.0
+        self.rows = 0
+        self.sites: Dict[str, int] = {}  # 调用位置 -> 次数
+
+    def add(self, elapsed: float, rows: int, site: str):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.rows += rows
+        self.sites[site] = self.sites.get(site, 0) + 1
+
+    def merge(self, other: 'QueryStat'):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.rows += other.rows
+        for site, count in other.sites.items():
+            self.sites[site] = self.sites.get(site, 0) + count
+
+    def to_dict(self) -> Dict:
+        return {
+            'sql': self.sql,
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'avg_ms': self.total * 1000 / self.count if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'rows': self.rows,
+            'site': max(self.sites, key=self.sites.get) if self.sites else '',
+            'sites': dict(self.sites)
+        }
+
+
+class ProfileScope:
+    """一次统计范围（如一次Streamlit重新运行）内的语句汇总"""
+
+    def __init__(self, name: str, capture: bool = False):
+        self.name = name
+        self.started = time.perf_counter()
+        self.elapsed = 0.0  # 范围的总耗时（秒），结束时填写
+        self.lock_wait = 0.0  # 等待连接池和写锁的时间（秒）
+        self.stats: Dict[str, QueryStat] = {}
+        # capture时保存执行过的原始SQL: SQL -> (参数, 调用位置)，供检查查询计划
+        self.statements: Optional[Dict[str, tuple]] = {} if capture else None
+
+    @property
+    def query_count(self) -> int:
+        return sum(stat.count for stat in self.stats.values())
+
+    @property
+    def db_time(self) -> float:
+        return sum(stat.total for stat in self.stats.values())
+
+    def top(self, n: int = config.PERF_PANEL_TOP_N) -> List[Dict]:
+        """总耗时最多的n条语句"""
+        ranked = sorted(self.stats.values(), key=lambda stat: stat.total, reverse=True)
+        return [stat.to_dict() for stat in ranked[:n]]
+
+    def summary(self, n: int = config.PERF_PANEL_TOP_N) -> Dict:
+        return {
+            'name': self.name,
+            'queries': self.query_count,
+            'db_time_ms': self.db_time * 1000,
+            'lock_wait_ms': self.lock_wait * 1000,
+            'elapsed_ms': self.elapsed * 1000,
+            'top': self.top(n)
+        }
+
+    def _add(self, sql: str, elapsed: float, rows: int, site: str):
+        stat = self.stats.get(sql)
+        if stat is None:
+            stat = self.stats[sql] = QueryStat(sql)
+        stat.add(elapsed, rows, site)
+
+
+class QueryProfiler:
+    """按统计范围和页面汇总SQL耗时，记录慢查询（线程安全）"""
+
+    def __init__(self, enabled: bool = config.QUERY_PROFILER_ENABLED,
+                 slow_query_ms: float = config.SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pages: Dict[str, Dict] = {}  # 页面 -> {'runs', 'elapsed', 'lock_wait', 'stats'}
+        self._normalized: Dict[str, str] = {}  # 原始SQL -> 规范化SQL
+
+    @contextmanager
+    def scope(self, name: str, capture: bool = False) -> Iterator[ProfileScope]:
+        """
+        统计范围：当前线程在块内执行的语句计入返回的ProfileScope，
+        结束时并入名为name的页面的累计统计。嵌套使用时内层单独统计。
+        capture为True时同时保存原始SQL和参数（ProfileScope.statements）。
+        """
+        scope = ProfileScope(name, capture)
+        previous = getattr(self._local, 'scope', None)
+        self._local.scope = scope
+        try:
+            yield scope
+        finally:
+            self._local.scope = previous
+            scope.elapsed = time.perf_counter() - scope.started
+            self._merge_page(scope)
+
+    def current(self) -> Optional[ProfileScope]:
+        """当前线程的统计范围"""
+        return getattr(self._local, 'scope', None)
+
+    def record(self, sql: str, elapsed: float, rows: int, params=()):
+        """
+        记录一条执行完的语句
+
+        Args:
+            sql: 执行的SQL
+            elapsed: 耗时（秒），包括等待连接和锁的时间
+            rows: 返回的行数（查询）或影响的行数（写入）
+            params: 语句的参数（只在capture范围内保存；executemany时为参数列表）
+        """
+        if not self.enabled:
+            return
+        scope = getattr(self._local, 'scope', None)
+        slow = elapsed * 1000 >= self.slow_query_ms
+        if scope is None and not slow:
+            return
+
+        normalized = self.normalize(sql)
+        site = _call_site()
+        if scope is not None:
+            scope._add(normalized, elapsed, rows, site)
+            if scope.statements is not None:
+                scope.statements.setdefault(sql, (params, site))
+        if slow:
+            slow_query_logger.warning("慢查询 %.1f ms, %d行, %s: %s",
+                                      elapsed * 1000, rows, site, normalized)
+
+    def record_lock_wait(self, seconds: float):
+        """
+        记录一次等待：连接池耗尽时等待归还连接，或写入在写队列中排队
+
+        只计入当前线程的统计范围（ProfileScope.lock_wait）。
+        写入所在事务的提交时间包含在COMMIT或写语句本身的耗时中。
+        """
+        if self.enabled:
+            scope = getattr(self._local, 'scope', None)
+            if scope is not None:
+                scope.lock_wait += seconds
+
+    def page_stats(self, name: str, n: int = config.PERF_PANEL_TOP_N) -> Optional[Dict]:
+        """
+        页面的累计统计
+
+        Returns:
+            {'name', 'runs': 重新运行次数, 'queries', 'db_time_ms', 'lock_wait_ms', 'elapsed_ms',
+             'avg_queries', 'avg_db_time_ms', 'top': 总耗时最多的语句}，没有记录时返回None
+        """
+        with self._lock:
+            page = self._pages.get(name)
+            if page is None:
+                return None
+            stats = sorted(page['stats'].values(), key=lambda stat: stat.total, reverse=True)
+            queries = sum(stat.count for stat in stats)
+            db_time = sum(stat.total for stat in stats)
+            runs = page['runs']
+            return {
+                'name': name,
+                'runs': runs,
+                'queries': queries,
+                'db_time_ms': db_time * 1000,
+                'lock_wait_ms': page['lock_wait'] * 1000,
+                'elapsed_ms': page['elapsed'] * 1000,
+                'avg_queries': queries / runs,
+                'avg_db_time_ms': db_time * 1000 / runs,
+                'top': [stat.to_dict() for stat in stats[:n]]
+            }
+
+    def pages(self) -> List[str]:
+        """有统计记录的页面"""
+        with self._lock:
+            return list(self._pages)
+
+    def reset(self):
+        """清空页面累计统计"""
+        with self._lock:
+            self._pages.clear()
+
+    def normalize(self, sql: str) -> str:
+        """
+        规范化SQL：合并空白，字面量替换为?，IN (?, ?, ...) 合并为 IN (...)，
+        参数个数不同的同一查询归为一条
+        """
+        normalized = self._normalized.get(sql)
+        if normalized is None:
+            normalized = _STRING_LITERAL.sub('?', sql)
+            normalized = _NUMBER_LITERAL.sub('?', normalized)
+            normalized = _WHITESPACE.sub(' ', normalized).strip()
+            normalized = _PARAM_LIST.sub('(...)', normalized)
+            if len(self._normalized) < 10000:  # 动态拼接的SQL不会无限占用内存
+                self._normalized[sql] = normalized
+        return normalized
+
+    def _merge_page(self, scope: ProfileScope):
+        """把结束的统计范围并入页面累计统计"""
+        with self._lock:
+            page = self._pages.setdefault(scope.name, {'runs': 0, 'elapsed': 0.0, 'lock_wait': 0.0,
+                                                       'stats': {}})
+            page['runs'] += 1
+            page['elapsed'] += scope.elapsed
+            page['lock_wait'] += scope.lock_wait
+            for sql, stat in scope.stats.items():
+                total = page['stats'].get(sql)
+                if total is None:
+                    total = page['stats'][sql] = QueryStat(sql)
+                total.merge(stat)
+
+
+def _call_site() -> str:
+    """数据库层之外最近的调用位置，如 services/lemma_service.py:120 get_lemma"""
+    frame = sys._getframe(2)
+    while frame is not None and _is_internal(frame.f_code.co_filename):
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    filename = frame.f_code.co_filename
+    if filename.startswith(config.BASE_DIR):
+        filename = os.path.relpath(filename, config.BASE_DIR).replace(os.sep, '/')
+    return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+_internal_cache: Dict[str, bool] = {}
+
+
+def _is_internal(filename: str) -> bool:
+    """文件是否属于调用位置应跳过的部分"""
+    internal = _internal_cache.get(filename)
+    if internal is None:
+        internal = (os.path.normcase(os.path.abspath(filename)).rsplit('.', 1)[0] in _INTERNAL_FILES
+                    or os.path.basename(filename) == 'contextlib.py')
+        _internal_cache[filename] = internal
+    return internal
+
+
+# 全局性能分析实例
+query_profiler = QueryProfiler()
@@ -0,0 +1,484 @@
+"""
+备份服务
+
+使用SQLite在线备份API（sqlite3.Connection.backup）按页分步复制数据库，
+步与步之间其他连接可以继续写入，得到的是某一时刻的一致快照，
+不会像直接复制文件那样拷到写了一半的数据。
+
+除完整的.db副本外，还支持增量备份库（backups/store）：
+快照按固定大小（页大小的整数倍）分块，每个内容不同的块只以zlib压缩保存一次，
+每个快照记录一份由块哈希组成的清单，未变化的数据不占用额外空间。
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from database.db_manager import db
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class _BackupRestarted(Exception):
+    """分步备份因源数据库被写入而重新开始的次数过多"""
+
+
+class BackupService:
+    """备份服务"""
+
+    FILE_PREFIX = 'dictionary_backup_'  # 与backup.sh/backup.bat的命名一致
+    STORE_DIRNAME = 'store'  # 增量备份库在备份目录下的子目录
+    CHUNK_GRACE_SECONDS = 3600  # 未被引用的数据块至少闲置这么久才会被清理
+
+    def __init__(self):
+        self._backup_lock = threading.Lock()  # 同一时间只进行一个备份
+        self._scheduler_lock = threading.Lock()
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_error: Optional[str] = None
+
+    def create_backup(self, backup_dir: str = config.BACKUP_DIR, keep: int = config.BACKUP_KEEP,
+                      progress: Optional[Callable[[int, int, int], None]] = None
+                      ) -> Tuple[bool, str, Optional[str]]:
+        """
+        创建一个在线备份，校验通过后按保留数量清理旧备份
+
+        Args:
+            backup_dir: 备份目录
+            keep: 保留最近的备份数量，0表示不清理
+            progress: 每复制一步后调用，参数为(状态, 剩余页数, 总页数)
+
+        Returns:
+            (成功标志, 消息, 备份文件路径)
+        """
+        os.makedirs(backup_dir, exist_ok=True)
+
+        with self._backup_lock:
+            path = self._new_backup_path(backup_dir, '.db')
+            temp_path = path + '.part'
+            try:
+                self._copy(temp_path, progress)
+                valid, message = self.verify_backup(temp_path)
+                if not valid:
+                    return False, f"备份校验失败: {message}", None
+                os.replace(temp_path, path)
+            except (sqlite3.Error, OSError) as e:
+                return False, f"备份失败: {str(e)}", None
+            finally:
+                for temp in (temp_path, temp_path + '-wal', temp_path + '-shm'):
+                    if os.path.exists(temp):
+                        os.remove(temp)
+
+        removed = self.prune_backups(backup_dir, keep) if keep > 0 else []
+        message = f"备份成功: {os.path.basename(path)}"
+        if removed:
+            message += f"（已清理 {len(removed)} 个旧备份）"
+        return True, message, path
+
+    def verify_backup(self, path: str) -> Tuple[bool, str]:
+        """用PRAGMA integrity_check校验备份文件"""
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                results = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+        if results == ['ok']:
+            return True, "ok"
+        return False, '; '.join(results[:5])
+
+    def list_backups(self, backup_dir: str = config.BACKUP_DIR) -> List[Dict]:
+        """
+        列出备份文件（最新的在前）
+
+        Returns:
+            [{'name': 文件名, 'path': 路径, 'size': 字节数, 'modified': 修改时间戳}, ...]
+        """
+        backups = []
+        for path in glob.glob(os.path.join(backup_dir, f'{self.FILE_PREFIX}*.db')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # 刚被删除
+            backups.append({
+                'name': os.path.basename(path),
+                'path': path,
+                'size': stat.st_size,
+                'modified': stat.st_mtime
+            })
+        backups.sort(key=lambda b: b['modified'], reverse=True)
+        return backups
+
+    def prune_backups(self, backup_dir: str = config.BACKUP_DIR,
+                      keep: int = config.BACKUP_KEEP) -> List[str]:
+        """只保留最近的keep个备份，返回被删除的文件名"""
+        removed = []
+        for backup in self.list_backups(backup_dir)[keep:]:
+            try:
+                os.remove(backup['path'])
+                removed.append(backup['name'])
+            except OSError:
+                pass
+        return removed
+
+    # ========== 增量备份 ==========
+
+    def create_snapshot(self, backup_dir: str = config.BACKUP_DIR, keep: int = config.BACKUP_KEEP,
+                        progress: Optional[Callable[[int, int, int], None]] = None
+                        ) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        创建增量快照
+
+        先用在线备份API得到一致的临时副本，再按BACKUP_CHUNK_SIZE分块计算SHA-256，
+        只有备份库中还没有的块才压缩写入，最后写入快照清单。
+        SQLite的修改只影响被写到的页，因此两次快照之间的大部分块可以直接复用。
+        快照在恢复时校验（块哈希 + integrity_check），创建时不做完整性检查。
+
+        Args:
+            backup_dir: 备份目录，增量备份库位于其下的store子目录
+            keep: 保留最近的快照数量，0表示不清理
+            progress: 复制数据库时每步调用，参数同create_backup
+
+        Returns:
+            (成功标志, 消息, 快照清单)
+        """
+        snapshot_dir, chunk_dir = self._store_paths(backup_dir)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        os.makedirs(chunk_dir, exist_ok=True)
+
+        with self._backup_lock:
+            manifest_path = self._new_backup_path(snapshot_dir, '.json')
+            name = os.path.basename(manifest_path)[:-len('.json')]
+            temp_path = os.path.join(snapshot_dir, name + '.db.part')
+            try:
+                self._copy(temp_path, progress)
+                chunks, new_chunks, new_bytes, size = [], 0, 0, 0
+                with open(temp_path, 'rb') as f:
+                    while True:
+                        data = f.read(config.BACKUP_CHUNK_SIZE)
+                        if not data:
+                            break
+                        size += len(data)
+                        digest = hashlib.sha256(data).hexdigest()
+                        stored = self._store_chunk(chunk_dir, digest, data)
+                        if stored:
+                            new_chunks += 1
+                            new_bytes += stored
+                        chunks.append(digest)
+
+                manifest = {
+                    'name': name,
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'size': size,
+                    'chunk_size': config.BACKUP_CHUNK_SIZE,
+                    'new_chunks': new_chunks,
+                    'new_bytes': new_bytes,
+                    'chunks': chunks
+                }
+                with open(manifest_path + '.part', 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f)
+                os.replace(manifest_path + '.part', manifest_path)
+            except (sqlite3.Error, OSError) as e:
+                return False, f"增量备份失败: {str(e)}", None
+            finally:
+                for path in (temp_path, manifest_path + '.part'):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            removed = self.prune_snapshots(backup_dir, keep) if keep > 0 else []
+
+        message = (f"增量备份成功: {name}（{len(chunks)} 块，新增 {new_chunks} 块 "
+                   f"{new_bytes / 1024 / 1024:.1f} MB）")
+        if removed:
+            message += f"（已清理 {len(removed)} 个旧快照）"
+        return True, message, manifest
+
+    def list_snapshots(self, backup_dir: str = config.BACKUP_DIR) -> List[Dict]:
+        """
+        列出增量快照（最新的在前）
+
+        Returns:
+            [{'name': 快照名, 'path': 清单路径, 'modified': 创建时间戳}, ...]
+        """
+        snapshot_dir, _ = self._store_paths(backup_dir)
+        snapshots = []
+        for path in glob.glob(os.path.join(snapshot_dir, f'{self.FILE_PREFIX}*.json')):
+            try:
+                modified = os.stat(path).st_mtime
+            except OSError:
+                continue
+            snapshots.append({
+                'name': os.path.basename(path)[:-len('.json')],
+                'path': path,
+                'modified': modified
+            })
+        snapshots.sort(key=lambda b: b['modified'], reverse=True)
+        return snapshots
+
+    def restore_snapshot(self, name: str, target_path: str, backup_dir: str = config.BACKUP_DIR,
+                         overwrite: bool = False) -> Tuple[bool, str]:
+        """
+        把快照恢复为数据库文件
+
+        逐块解压并校验哈希，写完后用integrity_check检查，全部通过才替换目标文件。
+        恢复到正在使用的数据库前应先关闭应用。
+
+        Args:
+            name: 快照名（如dictionary_backup_20241124_153020）
+            target_path: 恢复出的数据库文件路径
+            overwrite: 目标文件已存在时是否覆盖
+        """
+        snapshot_dir, chunk_dir = self._store_paths(backup_dir)
+        manifest_path = os.path.join(snapshot_dir, name + '.json')
+        if not os.path.isfile(manifest_path):
+            return False, f"快照不存在: {name}"
+        if os.path.exists(target_path) and not overwrite:
+            return False, f"目标文件已存在: {target_path}"
+
+        temp_path = target_path + '.part'
+        try:
+            manifest = self._read_manifest(manifest_path)
+            with open(temp_path, 'wb') as out:
+                for digest in manifest['chunks']:
+                    with open(self._chunk_path(chunk_dir, digest), 'rb') as f:
+                        data = zlib.decompress(f.read())
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        return False, f"数据块已损坏: {digest}"
+                    out.write(data)
+
+            # 源数据库运行在WAL模式，快照复制的文件头同样标记为WAL，转回DELETE模式以免留下-wal/-shm文件
+            conn = sqlite3.connect(temp_path)
+            try:
+                self._to_rollback_journal(conn)
+            finally:
+                conn.close()
+            valid, message = self.verify_backup(temp_path)
+            if not valid:
+                return False, f"恢复后校验失败: {message}"
+            # 原数据库遗留的WAL文件属于旧数据，必须在替换前删除，
+            # 否则替换后第一个打开的连接会把它们应用到恢复出的文件上
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(target_path + suffix):
+                    os.remove(target_path + suffix)
+            os.replace(temp_path, target_path)
+        except (sqlite3.Error, OSError, ValueError, KeyError, zlib.error) as e:
+            return False, f"恢复失败: {str(e)}"
+        finally:
+            for path in (temp_path, temp_path + '-wal', temp_path + '-shm'):
+                if os.path.exists(path):
+                    os.remove(path)
+        return True, f"已恢复快照 {name} -> {target_path}"
+
+    def prune_snapshots(self, backup_dir: str = config.BACKUP_DIR,
+                        keep: int = config.BACKUP_KEEP) -> List[str]:
+        """只保留最近的keep个快照并清理无用的数据块，返回被删除的快照名"""
+        removed = []
+        for snapshot in self.list_snapshots(backup_dir)[keep:]:
+            try:
+                os.remove(snapshot['path'])
+                removed.append(snapshot['name'])
+            except OSError:
+                pass
+        if removed:
+            self._collect_garbage(backup_dir)
+        return removed
+
+    def store_usage(self, backup_dir: str = config.BACKUP_DIR) -> Dict:
+        """增量备份库的占用：{'snapshots': 快照数, 'chunks': 块数, 'bytes': 压缩后总字节数}"""
+        _, chunk_dir = self._store_paths(backup_dir)
+        chunks = glob.glob(os.path.join(chunk_dir, '*', '*'))
+        return {
+            'snapshots': len(self.list_snapshots(backup_dir)),
+            'chunks': len(chunks),
+            'bytes': sum(os.path.getsize(path) for path in chunks)
+        }
+
+    # ========== 定时备份 ==========
+
+    def start_scheduler(self, interval_hours: float = config.BACKUP_INTERVAL_HOURS,
+                        backup_dir: str = config.BACKUP_DIR,
+                        incremental: bool = config.BACKUP_INCREMENTAL) -> bool:
+        """
+        在后台线程中定时备份（每个进程只会启动一个，重复调用没有影响）
+
+        距最近一个备份（完整副本或增量快照）满interval_hours小时后执行下一次备份，
+        因此重启应用不会立即产生多余的备份。
+
+        Args:
+            incremental: 写入增量备份库还是生成完整的.db副本
+
+        Returns:
+            是否新启动了定时任务
+        """
+        if interval_hours <= 0:
+            return False
+        with self._scheduler_lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return False
+            self._stop.clear()
+            self._scheduler = threading.Thread(
+                target=self._schedule_loop, args=(interval_hours * 3600, backup_dir, incremental),
+                name='backup-scheduler', daemon=True)
+            self._scheduler.start()
+            return True
+
+    def stop_scheduler(self):
+        """停止定时备份"""
+        self._stop.set()
+        with self._scheduler_lock:
+            if self._scheduler is not None:
+                self._scheduler.join()
+                self._scheduler = None
+
+    def scheduler_status(self) -> Dict:
+        """定时备份状态"""
+        return {
+            'running': self._scheduler is not None and self._scheduler.is_alive(),
+            'last_backup': self._last_backup_time(config.BACKUP_DIR),
+            'last_error': self._last_error
+        }
+
+    def _schedule_loop(self, interval: float, backup_dir: str, incremental: bool):
+        create = self.create_snapshot if incremental else self.create_backup
+        while not self._stop.is_set():
+            last_backup = self._last_backup_time(backup_dir)
+            wait = last_backup + interval - time.time() if last_backup else 0
+            if wait > 0:
+                # 醒来后重新计算，期间若手动备份过则顺延
+                self._stop.wait(wait)
+                continue
+
+            success, message, _ = create(backup_dir)
+            if success:
+                self._last_error = None
+            else:
+                self._last_error = message
+                logger.warning("定时备份失败: %s", message)
+                self._stop.wait(min(interval, 600))  # 稍后重试
+
+    def _last_backup_time(self, backup_dir: str) -> Optional[float]:
+        """最近一个完整副本或增量快照的时间"""
+        latest = self.list_backups(backup_dir)[:1] + self.list_snapshots(backup_dir)[:1]
+        return max((backup['modified'] for backup in latest), default=None)
+
+    def _copy(self, path: str, progress: Optional[Callable[[int, int, int], None]]):
+        """
+        用在线备份API把数据库复制到path
+
+        先按页分步复制，每步之间释放锁，不会阻塞写入；
+        但其他连接的每次写入都会让备份从头开始，持续写入时可能一直完成不了，
+        因此重新开始超过BACKUP_MAX_RESTARTS次后改为一次性复制
+        （持有读锁直到复制结束，期间的写入会等待）。
+        副本随后切换为DELETE日志模式，见_to_rollback_journal。
+        """
+        restarts = 0
+        last_remaining = None
+
+        def step(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > config.BACKUP_MAX_RESTARTS:
+                    raise _BackupRestarted()
+            last_remaining = remaining
+            if progress:
+                progress(status, remaining, total)
+
+        source = db.get_connection()
+        try:
+            target = sqlite3.connect(path)
+            try:
+                try:
+                    source.backup(target, pages=config.BACKUP_PAGES_PER_STEP, progress=step)
+                except _BackupRestarted:
+                    source.backup(target, pages=-1, progress=progress)
+                self._to_rollback_journal(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+    def _to_rollback_journal(self, conn: sqlite3.Connection):
+        """
+        把复制出的数据库切换为DELETE日志模式
+
+        备份API连同WAL标记一起复制，WAL模式的文件被只读打开（verify_backup）时
+        会在旁边留下-wal/-shm文件，它们不会随.part文件一起改名，也不会被清理。
+        切换后副本是单个自包含的文件，应用打开时会重新启用WAL。
+        """
+        conn.execute("PRAGMA journal_mode=DELETE")
+
+    def _store_chunk(self, chunk_dir: str, digest: str, data: bytes) -> int:
+        """保存数据块，已存在时只更新修改时间；返回新写入的字节数"""
+        path = self._chunk_path(chunk_dir, digest)
+        if os.path.exists(path):
+            os.utime(path)  # 标记为正在使用，见_collect_garbage
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, config.BACKUP_COMPRESS_LEVEL)
+        with open(path + '.part', 'wb') as f:
+            f.write(compressed)
+        os.replace(path + '.part', path)
+        return len(compressed)
+
+    def _new_backup_path(self, directory: str, extension: str) -> str:
+        """生成备份文件名（格式：dictionary_backup_20241124_153020.db）"""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(directory, f'{self.FILE_PREFIX}{stamp}{extension}')
+        suffix = 1
+        while os.path.exists(path):  # 同一秒内的多次备份
+            path = os.path.join(directory, f'{self.FILE_PREFIX}{stamp}_{suffix}{extension}')
+            suffix += 1
+        return path
+
+    def _store_paths(self, backup_dir: str) -> Tuple[str, str]:
+        """增量备份库的(清单目录, 数据块目录)"""
+        store = os.path.join(backup_dir, self.STORE_DIRNAME)
+        return os.path.join(store, 'snapshots'), os.path.join(store, 'chunks')
+
+    def _chunk_path(self, chunk_dir: str, digest: str) -> str:
+        """数据块按哈希前两位分目录保存，避免单个目录中文件过多"""
+        return os.path.join(chunk_dir, digest[:2], digest)
+
+    def _read_manifest(self, path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _collect_garbage(self, backup_dir: str) -> int:
+        """
+        删除不再被任何快照引用的数据块，返回删除数量
+
+        最近CHUNK_GRACE_SECONDS内写入或复用过的块不删除：
+        其他进程可能正在创建引用它们的快照（清单最后才写入）。
+        """
+        snapshot_dir, chunk_dir = self._store_paths(backup_dir)
+        referenced = set()
+        for snapshot in self.list_snapshots(backup_dir):
+            referenced.update(self._read_manifest(snapshot['path'])['chunks'])
+
+        removed = 0
+        cutoff = time.time() - self.CHUNK_GRACE_SECONDS
+        for path in glob.glob(os.path.join(chunk_dir, '*', '*')):
+            if os.path.basename(path) in referenced:
+                continue
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# 全局服务实例
+backup_service = BackupService()
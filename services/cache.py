@@ -0,0 +1,166 @@
+"""
+服务层读缓存
+
+Streamlit每次交互都会重新执行整个脚本，同样的读取会被反复调用。
+读方法的结果按参数缓存，并记录读取前各相关表的"代数"(generation)；
+写方法完成后递增对应表的代数，旧结果在下次访问时因代数不一致而失效。
+
+缓存是进程内共享的（同一个Streamlit服务进程中的所有会话），
+其他进程直接修改数据库时需要调用clear()。
+"""
+import copy
+import functools
+import marshal
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+from database.db_manager import db
+import config
+
+
+class QueryCache:
+    """带表代数校验的LRU读缓存（线程安全）"""
+
+    def __init__(self, max_size: int = config.QUERY_CACHE_MAX_SIZE,
+                 enabled: bool = config.QUERY_CACHE_ENABLED):
+        self.max_size = max_size
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # key -> (代数快照, 结果)
+        self._generations: Dict[str, int] = {}  # 表名 -> 代数
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cached(self, *tables: str) -> Callable:
+        """
+        装饰读方法：结果依赖于tables中的表
+
+        参数不可哈希时直接执行，不缓存。每次命中都返回结果的新副本，
+        调用方修改结果不会影响缓存及其他会话。
+        在db.transaction()块或写任务中调用时既不查缓存也不写入缓存：
+        事务中读到的可能是尚未提交的数据，不能提供给其他线程。
+        """
+        def decorator(func: Callable) -> Callable:
+            name = func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(instance, *args, **kwargs):
+                if not self.enabled or db.in_transaction():
+                    return func(instance, *args, **kwargs)
+                key = (name, args, tuple(sorted(kwargs.items())))
+                try:
+                    hash(key)
+                except TypeError:
+                    return func(instance, *args, **kwargs)
+
+                found, frozen, stamp = self._lookup(key, tables)
+                if found:
+                    return _thaw(frozen)
+
+                # 代数快照取在读取之前：读取期间发生的写入会使本结果立即失效
+                value = func(instance, *args, **kwargs)
+                self._store(key, stamp, _freeze(value))
+                return value
+            return wrapper
+        return decorator
+
+    def invalidates(self, *tables: str) -> Callable:
+        """
+        装饰写方法：执行完成后（无论成功与否）递增tables的代数
+
+        在db.transaction()块中调用时，事务结束后再递增一次：
+        提交之前其他线程读到的仍是旧数据，不能让它们以新的代数留在缓存中。
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.bump(*tables)
+                    if db.in_transaction():
+                        db.after_transaction(functools.partial(self.bump, *tables))
+            return wrapper
+        return decorator
+
+    def bump(self, *tables: str):
+        """递增表的代数，使依赖这些表的缓存结果失效"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        """清空所有缓存结果"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """命中/未命中计数及缓存状态"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'generations': dict(self._generations)
+            }
+
+    def _lookup(self, key: Tuple, tables: Tuple[str, ...]) -> Tuple[bool, object, Tuple]:
+        """查找缓存，返回(是否命中, 结果, 当前代数快照)"""
+        with self._lock:
+            stamp = tuple(self._generations.get(table, 0) for table in tables)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == stamp:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, entry[1], stamp
+                del self._entries[key]  # 已过期
+            self._misses += 1
+            return False, None, stamp
+
+    def _store(self, key: Tuple, stamp: Tuple, value: object):
+        """写入缓存，超出容量时淘汰最久未使用的结果"""
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+
+def _freeze(value: object) -> Tuple[str, object]:
+    """
+    保存结果的独立副本
+
+    服务层结果通常只由dict/list/str/数字组成，用marshal序列化
+    （比deepcopy快一个数量级且更省内存）；含其他类型（如LazyRow）时用pickle，
+    都不支持时退回deepcopy。
+    """
+    try:
+        return 'marshal', marshal.dumps(value)
+    except ValueError:
+        pass
+    try:
+        return 'pickle', pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return 'copy', copy.deepcopy(value)
+
+
+def _thaw(frozen: Tuple[str, object]) -> object:
+    """从保存的副本生成新的结果对象"""
+    method, data = frozen
+    if method == 'marshal':
+        return marshal.loads(data)
+    if method == 'pickle':
+        return pickle.loads(data)
+    return copy.deepcopy(data)
+
+
+# 全局缓存实例
+query_cache = QueryCache()
@@ -3,13 +3,18 @@ Example业务逻辑服务 (Sheet 2)
 """
 from typing import List, Tuple, Dict, Optional
 from database.db_manager import db
+from database.models import ExampleRecord, ExampleLinkRecord
+from services.cache import query_cache
 from services.lemma_service import lemma_service
-from utils.helpers import generate_uuid
+from services.stats_service import stats_service
+from utils.helpers import generate_uuid, to_json, from_json, to_fts_query
+import config
 
 
 class ExampleService:
     """Example服务"""
     
+    @query_cache.invalidates('examples')
     def create_example(self, example: str, lemmas: List[str]) -> Tuple[bool, str, Optional[str]]:
         """
         创建新的example并关联lemmas
@@ -27,19 +32,21 @@ class ExampleService:
         # 生成UUID
         example_id = generate_uuid()
         
-        # 插入example
+        # 插入example并关联lemmas，在同一个事务中提交
         query = "INSERT INTO examples (id, example) VALUES (?, ?)"
         try:
-            db.execute_insert(query, (example_id, example.strip()))
-            
-            # 关联lemmas
-            if lemmas:
-                self._link_lemmas(example_id, lemmas)
+            with db.transaction():
+                db.execute_insert(query, (example_id, example.strip()))
+                
+                # 关联lemmas
+                if lemmas:
+                    self._link_lemmas(example_id, lemmas)
             
             return True, "Example创建成功", example_id
         except Exception as e:
             return False, f"创建失败: {str(e)}", None
     
+    @query_cache.cached('examples')
     def get_example(self, example_id: str) -> Optional[Dict]:
         """获取example详情"""
         query = "SELECT * FROM examples WHERE id = ?"
@@ -60,25 +67,24 @@ class ExampleService:
             'created_at': row['created_at']
         }
     
-    def get_all_examples(self) -> List[Dict]:
-        """获取所有examples"""
+    @query_cache.cached('examples')
+    def get_all_examples(self, as_records: bool = False) -> List[Dict]:
+        """获取所有examples（as_records为True时返回紧凑的ExampleRecord）"""
         query = "SELECT * FROM examples ORDER BY created_at DESC"
         results = db.execute_query(query)
         
-        examples = []
-        for row in results:
-            lemmas = self.get_linked_lemmas(row['id'])
-            examples.append({
-                'id': row['id'],
-                'example': row['example'],
-                'lemmas': lemmas,
-                'created_at': row['created_at']
-            })
-        
-        return examples
+        # 一次性取出所有关联，避免逐条查询
+        links_query = """
+            SELECT example_id, lemma, is_valid FROM example_lemma_links
+            ORDER BY example_id, lemma
+        """
+        links = db.execute_query(links_query)
+        
+        return self._hydrate_examples(results, links, as_records)
     
-    def get_examples_by_lemma(self, lemma: str) -> List[Dict]:
-        """获取某个lemma的所有examples"""
+    @query_cache.cached('examples')
+    def get_examples_by_lemma(self, lemma: str, as_records: bool = False) -> List[Dict]:
+        """获取某个lemma的所有examples（as_records为True时返回ExampleRecord）"""
         query = """
             SELECT e.* FROM examples e
             JOIN example_lemma_links el ON e.id = el.example_id
@@ -87,18 +93,101 @@ class ExampleService:
         """
         results = db.execute_query(query, (lemma,))
         
-        examples = []
-        for row in results:
-            lemmas = self.get_linked_lemmas(row['id'])
-            examples.append({
-                'id': row['id'],
-                'example': row['example'],
-                'lemmas': lemmas,
-                'created_at': row['created_at']
-            })
-        
-        return examples
+        if not results:
+            return []
+        
+        # 这些examples的全部关联lemmas（包括其他lemma）
+        links_query = """
+            SELECT l.example_id, l.lemma, l.is_valid FROM example_lemma_links l
+            WHERE l.example_id IN (
+                SELECT example_id FROM example_lemma_links WHERE lemma = ?
+            )
+            ORDER BY l.example_id, l.lemma
+        """
+        links = db.execute_query(links_query, (lemma,))
+        
+        return self._hydrate_examples(results, links, as_records)
+    
+    @query_cache.cached('examples')
+    def search_examples(self, query: Optional[str] = None, cursor: Optional[str] = None,
+                        limit: int = config.DEFAULT_PAGE_SIZE) -> Dict:
+        """
+        分页获取examples（keyset分页）
+        
+        Args:
+            query: 可选，全文搜索关键词；为空时按创建时间倒序列出
+            cursor: 上一页返回的next_cursor，None表示第一页
+            limit: 每页数量
+            
+        Returns:
+            {
+                'items': [example字典, ...],  # 同get_example，搜索时额外包含'score'
+                'next_cursor': 下一页游标，没有下一页时为None,
+                'total': 符合条件的总数
+            }
+        """
+        limit = max(1, min(int(limit), config.MAX_PAGE_SIZE))
+        last_key = from_json(cursor)
+        if not (isinstance(last_key, list) and len(last_key) == 2):
+            last_key = None
+        
+        fts_query = to_fts_query(query) if query else None
+        if query and fts_query is None:
+            # 没有可检索的词
+            return {'items': [], 'next_cursor': None, 'total': 0}
+        
+        if fts_query is None:
+            total = stats_service.count('examples')
+            keyset = "WHERE (created_at, id) < (?, ?)" if last_key else ""
+            page_query = f"""
+                SELECT * FROM examples
+                {keyset}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """
+            params = (*(last_key or ()), limit + 1)
+        else:
+            count_query = "SELECT COUNT(*) as count FROM examples_fts WHERE examples_fts MATCH ?"
+            total = db.execute_query(count_query, (fts_query,))[0]['count']
+            keyset = "AND (bm25(examples_fts), examples_fts.rowid) > (?, ?)" if last_key else ""
+            page_query = f"""
+                SELECT e.*, hits.score AS score, hits.rowid AS hit_rowid
+                FROM (
+                    SELECT rowid, bm25(examples_fts) AS score FROM examples_fts
+                    WHERE examples_fts MATCH ? {keyset}
+                    ORDER BY score, rowid
+                    LIMIT ?
+                ) hits
+                JOIN examples e ON e.rowid = hits.rowid
+                ORDER BY hits.score, hits.rowid
+            """
+            params = (fts_query, *(last_key or ()), limit + 1)
+        
+        results = db.execute_query(page_query, params)
+        has_more = len(results) > limit
+        results = results[:limit]
+        
+        items = self._hydrate_examples(results, self._get_links_for(
+            [row['id'] for row in results]))
+        if fts_query is not None:
+            for item, row in zip(items, results):
+                item['score'] = row['score']
+        
+        next_cursor = None
+        if has_more:
+            last = results[-1]
+            if fts_query is None:
+                next_cursor = to_json([last['created_at'], last['id']])
+            else:
+                next_cursor = to_json([last['score'], last['hit_rowid']])
+        
+        return {
+            'items': items,
+            'next_cursor': next_cursor,
+            'total': total
+        }
     
+    @query_cache.cached('examples')
     def get_linked_lemmas(self, example_id: str) -> List[Dict]:
         """
         获取example关联的所有lemmas
@@ -109,36 +198,40 @@ class ExampleService:
         query = """
             SELECT lemma, is_valid FROM example_lemma_links
             WHERE example_id = ?
+            ORDER BY lemma
         """
         results = db.execute_query(query, (example_id,))
         
         return [{'lemma': row['lemma'], 'is_valid': bool(row['is_valid'])} 
                 for row in results]
     
+    @query_cache.invalidates('examples')
     def update_example(self, example_id: str, example: Optional[str] = None, 
                       lemmas: Optional[List[str]] = None) -> Tuple[bool, str]:
-        """更新example"""
-        query = "SELECT COUNT(*) as count FROM examples WHERE id = ?"
-        result = db.execute_query(query, (example_id,))[0]
-        
-        if result['count'] == 0:
-            return False, f"Example ID '{example_id}' 不存在"
-        
-        # 更新example文本
-        if example is not None:
-            query = "UPDATE examples SET example = ? WHERE id = ?"
-            db.execute_update(query, (example.strip(), example_id))
-        
-        # 更新lemma关联
-        if lemmas is not None:
-            # 删除旧关联
-            db.execute_delete("DELETE FROM example_lemma_links WHERE example_id = ?", 
-                            (example_id,))
-            # 添加新关联
-            self._link_lemmas(example_id, lemmas)
+        """更新example（文本和关联在同一个事务中提交，失败时全部回滚）"""
+        with db.transaction():
+            query = "SELECT COUNT(*) as count FROM examples WHERE id = ?"
+            result = db.execute_query(query, (example_id,))[0]
+            
+            if result['count'] == 0:
+                return False, f"Example ID '{example_id}' 不存在"
+            
+            # 更新example文本
+            if example is not None:
+                query = "UPDATE examples SET example = ? WHERE id = ?"
+                db.execute_update(query, (example.strip(), example_id))
+            
+            # 更新lemma关联
+            if lemmas is not None:
+                # 删除旧关联
+                db.execute_delete("DELETE FROM example_lemma_links WHERE example_id = ?", 
+                                (example_id,))
+                # 添加新关联
+                self._link_lemmas(example_id, lemmas)
         
         return True, "更新成功"
     
+    @query_cache.invalidates('examples')
     def delete_example(self, example_id: str) -> Tuple[bool, str]:
         """删除example"""
         query = "DELETE FROM examples WHERE id = ?"
@@ -150,6 +243,50 @@ class ExampleService:
         except Exception as e:
             return False, f"删除失败: {str(e)}"
     
+    def _hydrate_examples(self, rows, links, as_records: bool = False) -> List[Dict]:
+        """
+        将example行与预先取出的关联行组装成结果
+        
+        Args:
+            rows: examples表的行（决定结果顺序）
+            links: example_lemma_links行，包含example_id, lemma, is_valid
+            as_records: 组装为ExampleRecord / ExampleLinkRecord而不是dict
+        """
+        linked = {}
+        if as_records:
+            for link in links:
+                linked.setdefault(link['example_id'], []).append(
+                    ExampleLinkRecord(link['lemma'], bool(link['is_valid'])))
+            return [ExampleRecord(row['id'], row['example'], linked.get(row['id'], []),
+                                  row['created_at'])
+                    for row in rows]
+        
+        for link in links:
+            linked.setdefault(link['example_id'], []).append(
+                {'lemma': link['lemma'], 'is_valid': bool(link['is_valid'])})
+        
+        return [{
+            'id': row['id'],
+            'example': row['example'],
+            'lemmas': list(linked.get(row['id'], [])),
+            'created_at': row['created_at']
+        } for row in rows]
+    
+    def _get_links_for(self, example_ids: List[str]) -> List:
+        """取出一批examples的关联行（按SQLite变量上限分块）"""
+        links = []
+        chunk_size = 500
+        for i in range(0, len(example_ids), chunk_size):
+            chunk = example_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            query = f"""
+                SELECT example_id, lemma, is_valid FROM example_lemma_links
+                WHERE example_id IN ({placeholders})
+                ORDER BY example_id, lemma
+            """
+            links.extend(db.execute_query(query, tuple(chunk)))
+        return links
+    
     def _link_lemmas(self, example_id: str, lemmas: List[str]):
         """
         关联example和lemmas
@@ -158,13 +295,11 @@ class ExampleService:
         if not lemmas:
             return
         
-        links = []
-        for lemma in lemmas:
-            lemma = lemma.strip().lower()
-            if lemma:
-                # 检查lemma是否存在
-                is_valid = lemma_service.lemma_exists(lemma)
-                links.append((example_id, lemma, 1 if is_valid else 0))
+        names = [lemma.strip().lower() for lemma in lemmas]
+        names = [name for name in names if name]
+        # 一次查询检查全部lemma是否存在（结果已去重，大小写不同或重复的lemma只关联一次）
+        exists = lemma_service.lemmas_exist(names)
+        links = [(example_id, name, 1 if valid else 0) for name, valid in exists.items()]
         
         if links:
             query = """
@@ -173,26 +308,23 @@ class ExampleService:
             """
             db.execute_many(query, links)
     
-    def refresh_lemma_validity(self):
-        """
-        刷新所有example-lemma链接的有效性
-        当新增lemma后调用，更新之前无效的链接
+    @query_cache.invalidates('examples')
+    def refresh_lemma_validity(self) -> int:
         """
-        # 获取所有无效的链接
-        query = "SELECT DISTINCT lemma FROM example_lemma_links WHERE is_valid = 0"
-        results = db.execute_query(query)
+        按当前的lemmas重新计算所有example-lemma链接的有效性
+        
+        lemma新增、删除、改名时由触发器实时维护is_valid（见database/migrations），
+        正常写入后无需调用；仅用于修复绕过触发器直接修改过的数据。
         
-        # 检查这些lemma现在是否存在
-        for row in results:
-            lemma = row['lemma']
-            if lemma_service.lemma_exists(lemma):
-                # 更新为有效
-                update_query = """
-                    UPDATE example_lemma_links 
-                    SET is_valid = 1 
-                    WHERE lemma = ?
-                """
-                db.execute_update(update_query, (lemma,))
+        Returns:
+            被修正的链接数
+        """
+        query = """
+            UPDATE example_lemma_links
+            SET is_valid = (lemma IN (SELECT lemma FROM lemmas))
+            WHERE is_valid IS NOT (lemma IN (SELECT lemma FROM lemmas))
+        """
+        return db.execute_update(query)
 
 
 # 全局服务实例
@@ -0,0 +1,202 @@
+"""
+导出服务
+
+按rowid分批（keyset）读取数据并逐行写出为JSONL或CSV（支持.gz压缩），
+内存占用与数据量无关。每批是一次独立的短查询，导出期间不会长时间阻塞写入。
+导出文件的字段与批量导入一致，可以直接用tools.import_data导回。
+"""
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from database.db_manager import db
+from utils.helpers import from_json, detect_file_format, open_text_file
+import config
+
+
+class ExportService:
+    """导出服务"""
+
+    KINDS = ('lemmas', 'examples', 'relations')
+    FORMATS = ('csv', 'jsonl')
+
+    # 各类型导出的字段（CSV列顺序）
+    COLUMNS = {
+        'lemmas': ['id', 'lemma', 'pronunciation_british', 'spell_nuance', 'pos_meaning',
+                   'inflection', 'derivation', 'collocation', 'topic', 'created_at', 'updated_at'],
+        'examples': ['id', 'example', 'lemmas', 'created_at'],
+        'relations': ['id', 'lemma1', 'specific_word1', 'lemma2', 'specific_word2',
+                      'relation_type', 'note', 'created_at']
+    }
+
+    def iter_lemmas(self, topic: Optional[str] = None, updated_since: Optional[str] = None,
+                    batch_size: int = config.EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        逐个产生lemma（JSON字段已解码）
+
+        Args:
+            topic: 只导出该topic的lemma
+            updated_since: 只导出updated_at不早于该时间的lemma（如'2025-01-01'）
+        """
+        conditions, params = [], []
+        if topic:
+            conditions.append("topic = ?")
+            params.append(topic)
+        if updated_since:
+            conditions.append("updated_at >= ?")
+            params.append(updated_since)
+
+        for row in self._iter_batches("SELECT rowid AS _rowid, * FROM lemmas",
+                                      "rowid", conditions, params, batch_size):
+            item = {column: row[column] for column in self.COLUMNS['lemmas']}
+            for column in ('pos_meaning', 'inflection', 'derivation'):
+                item[column] = from_json(item[column])
+            yield item
+
+    def iter_examples(self, topic: Optional[str] = None, updated_since: Optional[str] = None,
+                      batch_size: int = config.EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        逐个产生example及其关联的lemma列表
+
+        Args:
+            topic: 只导出关联了该topic下lemma的example
+            updated_since: 只导出created_at不早于该时间的example（example没有更新时间）
+        """
+        conditions, params = [], []
+        if topic:
+            conditions.append("""EXISTS (SELECT 1 FROM example_lemma_links el
+                                         JOIN lemmas l ON l.lemma = el.lemma
+                                         WHERE el.example_id = e.id AND l.topic = ?)""")
+            params.append(topic)
+        if updated_since:
+            conditions.append("e.created_at >= ?")
+            params.append(updated_since)
+
+        query = """
+            SELECT e.rowid AS _rowid, e.id, e.example, e.created_at,
+                   (SELECT json_group_array(el.lemma) FROM example_lemma_links el
+                    WHERE el.example_id = e.id) AS lemmas
+            FROM examples e
+        """
+        for row in self._iter_batches(query, "e.rowid", conditions, params, batch_size):
+            yield {
+                'id': row['id'],
+                'example': row['example'],
+                'lemmas': json.loads(row['lemmas']),
+                'created_at': row['created_at']
+            }
+
+    def iter_relations(self, topic: Optional[str] = None, updated_since: Optional[str] = None,
+                       batch_size: int = config.EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        逐个产生relation
+
+        Args:
+            topic: 只导出至少一端lemma属于该topic的relation
+            updated_since: 只导出created_at不早于该时间的relation
+        """
+        conditions, params = [], []
+        if topic:
+            conditions.append("""(lemma1 IN (SELECT lemma FROM lemmas WHERE topic = ?)
+                                  OR lemma2 IN (SELECT lemma FROM lemmas WHERE topic = ?))""")
+            params.extend([topic, topic])
+        if updated_since:
+            conditions.append("created_at >= ?")
+            params.append(updated_since)
+
+        for row in self._iter_batches("SELECT id AS _rowid, * FROM relations",
+                                      "id", conditions, params, batch_size):
+            yield {column: row[column] for column in self.COLUMNS['relations']}
+
+    def export_file(self, kind: str, path: str, file_format: Optional[str] = None,
+                    topic: Optional[str] = None, updated_since: Optional[str] = None,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict:
+        """
+        导出到文件
+
+        先写入临时文件，完成后再替换目标文件，中途失败不会留下不完整的导出。
+
+        Args:
+            kind: 'lemmas', 'examples' 或 'relations'
+            path: 输出文件路径，以.gz结尾时压缩
+            file_format: 'csv' 或 'jsonl'，为空时根据扩展名判断
+            topic, updated_since: 过滤条件，见iter_*方法
+            progress: 每写出一批后调用，参数为已写出的行数
+
+        Returns:
+            {'kind': 导出类型, 'path': 文件路径, 'rows': 行数, 'elapsed': 耗时（秒）}
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的导出类型: {kind}")
+        file_format = file_format or detect_file_format(path)
+        if file_format not in self.FORMATS:
+            raise ValueError(f"不支持的文件格式: {file_format}")
+
+        started = time.perf_counter()
+        items = getattr(self, f'iter_{kind}')(topic=topic, updated_since=updated_since)
+        temp_path = path + '.part'
+        rows = 0
+        try:
+            with open_text_file(temp_path, 'w', compressed=path.endswith('.gz')) as f:
+                write = self._writer(kind, file_format, f)
+                for item in items:
+                    write(item)
+                    rows += 1
+                    if progress and rows % config.EXPORT_BATCH_SIZE == 0:
+                        progress(rows)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if progress:
+            progress(rows)
+        return {
+            'kind': kind,
+            'path': path,
+            'rows': rows,
+            'elapsed': time.perf_counter() - started
+        }
+
+    def _iter_batches(self, query: str, key: str, conditions: List[str], params: List,
+                      batch_size: int) -> Iterator:
+        """按rowid分批执行查询，逐行产生结果"""
+        batch_size = max(1, int(batch_size))
+        where = ' AND '.join([f"{key} > ?"] + conditions)
+        batch_query = f"{query} WHERE {where} ORDER BY {key} LIMIT ?"
+
+        last_rowid = 0
+        while True:
+            rows = db.execute_query(batch_query, (last_rowid, *params, batch_size))
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_rowid = rows[-1]['_rowid']
+
+    def _writer(self, kind: str, file_format: str, f) -> Callable[[Dict], None]:
+        """返回写出单行的函数"""
+        if file_format == 'jsonl':
+            def write(item: Dict):
+                f.write(json.dumps(item, ensure_ascii=False))
+                f.write('\n')
+            return write
+
+        writer = csv.DictWriter(f, fieldnames=self.COLUMNS[kind])
+        writer.writeheader()
+
+        def write(item: Dict):
+            writer.writerow({key: self._csv_value(key, value) for key, value in item.items()})
+        return write
+
+    def _csv_value(self, key: str, value):
+        """CSV单元格：lemma列表用逗号连接，其他列表/对象写成JSON字符串"""
+        if key == 'lemmas':
+            return ','.join(value)
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+
+# 全局服务实例
+export_service = ExportService()
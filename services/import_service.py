@@ -0,0 +1,409 @@
+"""
+批量导入服务
+
+流式读取CSV/JSONL文件（支持.gz压缩），逐行验证后按块用executemany写入，
+每块一个事务。无效行记录到导入报告中并跳过，不会中断整个导入。
+"""
+import csv
+import json
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from database.db_manager import db
+from services.cache import query_cache
+from services.relation_graph import relation_graph
+from utils.helpers import generate_time_uuid, to_json, detect_file_format, open_text_file
+from utils.validators import (validate_lemma, validate_specific_word,
+                              validate_relation_type, validate_pos)
+import config
+
+
+class ImportService:
+    """批量导入服务"""
+
+    KINDS = ('lemmas', 'examples', 'relations')
+    FORMATS = ('csv', 'jsonl')
+
+    def import_file(self, kind: str, path: str, file_format: Optional[str] = None,
+                    chunk_size: int = config.IMPORT_CHUNK_SIZE,
+                    progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        从文件导入
+
+        Args:
+            kind: 'lemmas', 'examples' 或 'relations'
+            path: CSV或JSONL文件路径（可以是.gz压缩文件）
+            file_format: 'csv' 或 'jsonl'，为空时根据扩展名判断
+            chunk_size: 每个事务写入的行数
+            progress: 每写完一块后调用，参数为当前的导入报告
+
+        Returns:
+            导入报告，见import_rows
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的导入类型: {kind}")
+        file_format = file_format or detect_file_format(path)
+        return self._run(kind, self._read_file(path, file_format), chunk_size, progress)
+
+    def import_rows(self, kind: str, rows: Iterable[Dict],
+                    chunk_size: int = config.IMPORT_CHUNK_SIZE,
+                    progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        从字典序列导入（行号从1开始计）
+
+        lemma行的字段同lemmas表，pos_meaning/inflection/derivation可以是对象或JSON字符串；
+        example行包含example和lemmas（列表或逗号分隔的字符串）；
+        relation行包含lemma1, specific_word1, lemma2, specific_word2, relation_type, note。
+
+        Returns:
+            {
+                'kind': 导入类型,
+                'total': 处理的行数,
+                'imported': 成功导入的行数,
+                'failed': 失败的行数,
+                'errors': [{'line': 行号, 'error': 错误信息}, ...],  # 最多IMPORT_MAX_ERRORS条
+                'elapsed': 耗时（秒）
+            }
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的导入类型: {kind}")
+        return self._run(kind, enumerate(rows, 1), chunk_size, progress)
+
+    def import_lemmas(self, rows: Iterable[Dict], **kwargs) -> Dict:
+        """批量导入lemmas"""
+        return self.import_rows('lemmas', rows, **kwargs)
+
+    def import_examples(self, rows: Iterable[Dict], **kwargs) -> Dict:
+        """批量导入examples"""
+        return self.import_rows('examples', rows, **kwargs)
+
+    def import_relations(self, rows: Iterable[Dict], **kwargs) -> Dict:
+        """批量导入relations"""
+        return self.import_rows('relations', rows, **kwargs)
+
+    # ========== 导入流程 ==========
+
+    def _run(self, kind: str, numbered_rows: Iterator[Tuple[int, object]],
+             chunk_size: int, progress: Optional[Callable[[Dict], None]]) -> Dict:
+        """验证、分块写入并生成报告"""
+        started = time.perf_counter()
+        chunk_size = max(1, int(chunk_size))
+        report = {'kind': kind, 'total': 0, 'imported': 0, 'failed': 0, 'errors': []}
+
+        # 已存在的lemma一次性读入内存，之后的存在性检查不再查询数据库
+        known = self._load_lemmas()
+        prepare = getattr(self, f'_prepare_{kind[:-1]}')
+        write = getattr(self, f'_write_{kind}')
+
+        batch = []
+        for line_no, row in numbered_rows:
+            report['total'] += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValueError("每行必须是一个对象")
+                batch.append((line_no, prepare(row, known)))
+            except ValueError as e:
+                self._add_error(report, line_no, str(e))
+                continue
+
+            if len(batch) >= chunk_size:
+                self._flush(kind, write, batch, known, report)
+                batch = []
+                if progress:
+                    progress(report)
+
+        if batch:
+            self._flush(kind, write, batch, known, report)
+        report['elapsed'] = time.perf_counter() - started
+        if progress:
+            progress(report)
+        return report
+
+    def _flush(self, kind: str, write: Callable, batch: List[Tuple[int, Tuple]],
+               known: Set[str], report: Dict):
+        """写入一块数据；整块失败时逐行重试以定位出错的行"""
+        def flush(conn: sqlite3.Connection):
+            try:
+                with db.transaction():
+                    self._write_chunk(conn, kind, write, [payload for _, payload in batch])
+                report['imported'] += len(batch)
+            except sqlite3.Error:
+                for line_no, payload in batch:
+                    try:
+                        with db.transaction():
+                            write(conn, [payload])
+                        report['imported'] += 1
+                    except sqlite3.Error as e:
+                        self._add_error(report, line_no, f"数据库错误: {e}")
+                        if kind == 'lemmas':
+                            known.discard(payload[1])
+
+        # 整块作为一个写任务由写线程执行，块内失败的部分用保存点撤销
+        db.write(flush)
+
+        # 新数据已提交，使读缓存和关系图失效（新lemma会使已有example关联变为有效）
+        query_cache.bump(kind)
+        if kind == 'lemmas':
+            query_cache.bump('examples')
+        if kind == 'relations':
+            relation_graph.invalidate()
+
+    def _write_chunk(self, conn: sqlite3.Connection, kind: str, write: Callable,
+                     payloads: List[Tuple]):
+        """
+        在调用方的事务中写入一块数据（失败时由调用方撤销）
+
+        逐行执行的全文索引和统计触发器在批量写入时开销很大，因此在同一事务内暂时删除，
+        写完后用几条集合语句补齐本块新增行的索引和计数，再按原定义重建触发器。
+        DDL同样受事务保护，其他连接不会看到缺少触发器的中间状态。
+        """
+        triggers, catch_up = self._DEFERRED_TRIGGERS.get(kind, ((), ()))
+        placeholders = ','.join('?' * len(triggers))
+        definitions = conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+            triggers).fetchall() if triggers else []
+        if len(definitions) != len(triggers):
+            # 触发器与预期不一致时按常规方式逐行触发
+            write(conn, payloads)
+            return
+
+        last_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {kind}").fetchone()[0]
+        for name, _ in definitions:
+            conn.execute(f"DROP TRIGGER {name}")
+        write(conn, payloads)
+        for statement in catch_up:
+            conn.execute(statement, (last_rowid,))
+        for _, sql in definitions:
+            conn.execute(sql)
+
+    def _add_error(self, report: Dict, line_no: int, error: str):
+        """记录一行错误"""
+        report['failed'] += 1
+        if len(report['errors']) < config.IMPORT_MAX_ERRORS:
+            report['errors'].append({'line': line_no, 'error': error})
+
+    def _load_lemmas(self) -> Set[str]:
+        """读取所有已存在的lemma"""
+        known = set()
+        with db.connection() as conn:
+            cursor = conn.execute("SELECT lemma FROM lemmas")
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                known.update(row[0] for row in rows)
+        return known
+
+    # ========== 行验证 ==========
+
+    def _prepare_lemma(self, row: Dict, known: Set[str]) -> Tuple:
+        """验证lemma行，返回插入参数"""
+        valid, lemma, error = validate_lemma(row.get('lemma') or '')
+        if not valid:
+            raise ValueError(error)
+        if lemma in known:
+            raise ValueError(f"Lemma '{lemma}' 已存在")
+
+        pos_meaning = self._json_field(row, 'pos_meaning', list)
+        for item in pos_meaning or []:
+            if not isinstance(item, dict) or not validate_pos(item.get('pos')):
+                raise ValueError(f"无效的词性: {item}")
+        inflection = self._json_field(row, 'inflection', dict)
+        derivation = self._json_field(row, 'derivation', list)
+        for item in derivation or []:
+            if not isinstance(item, dict) or not item.get('word'):
+                raise ValueError(f"无效的派生词: {item}")
+
+        known.add(lemma)
+        return (
+            self._text(row, 'id') or generate_time_uuid(),
+            lemma,
+            self._text(row, 'pronunciation_british'),
+            self._text(row, 'spell_nuance'),
+            to_json(pos_meaning) if pos_meaning else None,
+            to_json(inflection) if inflection else None,
+            to_json(derivation) if derivation else None,
+            self._text(row, 'collocation'),
+            self._text(row, 'topic'),
+            self._text(row, 'created_at'),
+            self._text(row, 'updated_at')
+        )
+
+    def _prepare_example(self, row: Dict, known: Set[str]) -> Tuple:
+        """验证example行，返回(example参数, 关联参数列表)"""
+        example = self._text(row, 'example')
+        if not example:
+            raise ValueError("Example不能为空")
+
+        lemmas = row.get('lemmas') or []
+        if isinstance(lemmas, str):
+            lemmas = lemmas.split(',')
+        if not isinstance(lemmas, list):
+            raise ValueError("lemmas必须是列表或逗号分隔的字符串")
+
+        example_id = self._text(row, 'id') or generate_time_uuid()
+        links = {}
+        for lemma in lemmas:
+            lemma = str(lemma).strip().lower()
+            if lemma and lemma not in links:
+                links[lemma] = (example_id, lemma, 1 if lemma in known else 0)
+
+        return (example_id, example, self._text(row, 'created_at')), list(links.values())
+
+    def _prepare_relation(self, row: Dict, known: Set[str]) -> Tuple:
+        """验证relation行，返回插入参数"""
+        params = []
+        for n in (1, 2):
+            lemma = self._text(row, f'lemma{n}') or ''
+            if lemma not in known:
+                raise ValueError(f"Lemma '{lemma}' 不存在，请先创建")
+            valid, word, error = validate_specific_word(self._text(row, f'specific_word{n}') or '')
+            if not valid:
+                raise ValueError(f"Specific word {n}: {error}")
+            params.extend([lemma, word])
+
+        relation_type = self._text(row, 'relation_type')
+        if not validate_relation_type(relation_type):
+            raise ValueError(f"无效的关系类型: {relation_type}")
+
+        return (*params, relation_type, self._text(row, 'note'), self._text(row, 'created_at'))
+
+    def _text(self, row: Dict, key: str) -> Optional[str]:
+        """读取文本字段，空字符串视为空值"""
+        value = row.get(key)
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value or None
+
+    def _json_field(self, row: Dict, key: str, expected: type):
+        """读取JSON字段（CSV中为JSON字符串）"""
+        value = row.get(key)
+        if isinstance(value, str):
+            if not value.strip():
+                return None
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError(f"{key}不是有效的JSON")
+        if value is not None and not isinstance(value, expected):
+            raise ValueError(f"{key}格式错误")
+        return value or None
+
+    # ========== 写入 ==========
+
+    # 导入时暂停的触发器: 类型 -> (触发器名, 补齐本块数据的语句)
+    # 语句的参数?1为写入前表中最大的rowid，与对应触发器的逐行效果等价
+    _DEFERRED_TRIGGERS = {
+        'lemmas': (
+            ('lemmas_fts_insert', 'stats_lemma_insert', 'links_lemma_insert'),
+            (
+                """
+                INSERT INTO lemmas_fts (rowid, lemma, meanings, collocation, derivation, topic)
+                SELECT rowid, lemma, meanings, collocation, derivation, topic
+                FROM lemma_search_text WHERE rowid > ?1
+                """,
+                """
+                UPDATE corpus_stats SET value = value + (SELECT COUNT(*) FROM lemmas WHERE rowid > ?1)
+                WHERE name = 'lemmas'
+                """,
+                """
+                UPDATE corpus_stats SET value = value + (
+                    SELECT COUNT(*) FROM lemmas l
+                    WHERE l.rowid > ?1
+                      AND EXISTS (SELECT 1 FROM example_lemma_links el WHERE el.lemma = l.lemma))
+                WHERE name = 'lemmas_with_examples'
+                """,
+                """
+                INSERT INTO topic_stats (topic, lemma_count)
+                SELECT topic, COUNT(*) FROM lemmas
+                WHERE rowid > ?1 AND topic IS NOT NULL
+                GROUP BY topic
+                ON CONFLICT (topic) DO UPDATE SET lemma_count = lemma_count + excluded.lemma_count
+                """,
+                """
+                UPDATE example_lemma_links SET is_valid = 1
+                WHERE is_valid = 0 AND lemma IN (SELECT lemma FROM lemmas WHERE rowid > ?1)
+                """
+            )
+        ),
+        'examples': (
+            ('examples_fts_insert', 'stats_example_insert', 'stats_link_insert'),
+            (
+                """
+                INSERT INTO examples_fts (rowid, example)
+                SELECT rowid, example FROM examples WHERE rowid > ?1
+                """,
+                """
+                UPDATE corpus_stats SET value = value + (SELECT COUNT(*) FROM examples WHERE rowid > ?1)
+                WHERE name = 'examples'
+                """,
+                # 本块之前没有任何关联、现在有了关联的已存在lemma
+                """
+                UPDATE corpus_stats SET value = value + (
+                    SELECT COUNT(DISTINCT el.lemma)
+                    FROM examples e
+                    CROSS JOIN example_lemma_links el ON el.example_id = e.id  -- 从本块的example出发
+                    WHERE e.rowid > ?1
+                      AND EXISTS (SELECT 1 FROM lemmas WHERE lemma = el.lemma)
+                      AND NOT EXISTS (SELECT 1 FROM example_lemma_links old
+                                      JOIN examples oe ON oe.id = old.example_id
+                                      WHERE old.lemma = el.lemma AND oe.rowid <= ?1))
+                WHERE name = 'lemmas_with_examples'
+                """
+            )
+        )
+    }
+
+    def _write_lemmas(self, conn: sqlite3.Connection, payloads: List[Tuple]):
+        conn.executemany("""
+            INSERT INTO lemmas (id, lemma, pronunciation_british, spell_nuance,
+                               pos_meaning, inflection, derivation, collocation, topic,
+                               created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+        """, payloads)
+
+    def _write_examples(self, conn: sqlite3.Connection, payloads: List[Tuple]):
+        conn.executemany("""
+            INSERT INTO examples (id, example, created_at)
+            VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, [example for example, _ in payloads])
+        conn.executemany("""
+            INSERT INTO example_lemma_links (example_id, lemma, is_valid)
+            VALUES (?, ?, ?)
+        """, [link for _, links in payloads for link in links])
+
+    def _write_relations(self, conn: sqlite3.Connection, payloads: List[Tuple]):
+        conn.executemany("""
+            INSERT INTO relations (lemma1, specific_word1, lemma2, specific_word2,
+                                  relation_type, note, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, payloads)
+
+    # ========== 文件读取 ==========
+
+    def _read_file(self, path: str, file_format: str) -> Iterator[Tuple[int, object]]:
+        """逐行读取文件，产生(行号, 行数据或解析错误)"""
+        if file_format not in self.FORMATS:
+            raise ValueError(f"不支持的文件格式: {file_format}")
+
+        with open_text_file(path) as f:
+            if file_format == 'jsonl':
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, ValueError(f"JSON格式错误: {e.msg}")
+            else:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    yield reader.line_num, row
+
+
+# 全局服务实例
+import_service = ImportService()
@@ -1,17 +1,23 @@
 """
 Lemma业务逻辑服务 (Sheet 1)
 """
-from typing import List, Optional, Dict, Tuple
+from typing import Iterable, List, Optional, Dict, Tuple
 from database.db_manager import db
-from database.models import Lemma, POSMeaning, Derivation
-from utils.helpers import generate_uuid, to_json, from_json
+from services.cache import query_cache
+from services.stats_service import stats_service
+from database.models import (Lemma, POSMeaning, Derivation, LazyRow, LemmaRecord,
+                             LemmaSummaryRecord, LemmaDetailRecord)
+from utils.helpers import generate_uuid, to_json, from_json, to_fts_query
 from utils.validators import validate_lemma
 from datetime import datetime
+import config
 
 
 class LemmaService:
     """Lemma服务"""
     
+    # 触发器会同步example关联的is_valid，因此同时使examples的缓存失效
+    @query_cache.invalidates('lemmas', 'examples')
     def create_lemma(self, lemma: str, pronunciation_british: Optional[str] = None,
                     spell_nuance: Optional[str] = None, pos_meaning: List[Dict] = None,
                     inflection: Optional[Dict] = None, derivation: List[Dict] = None,
@@ -53,9 +59,10 @@ class LemmaService:
         except Exception as e:
             return False, f"创建失败: {str(e)}", None
     
+    @query_cache.cached('lemmas')
     def get_lemma(self, lemma: str) -> Optional[Dict]:
         """根据lemma获取完整信息"""
-        query = "SELECT * FROM lemmas WHERE lemma = ?"
+        query = f"SELECT {self._LEMMA_COLUMNS} FROM lemmas l WHERE l.lemma = ?"
         results = db.execute_query(query, (lemma,))
         
         if not results:
@@ -64,9 +71,10 @@ class LemmaService:
         row = results[0]
         return self._row_to_dict(row)
     
+    @query_cache.cached('lemmas')
     def get_lemma_by_id(self, lemma_id: str) -> Optional[Dict]:
         """根据ID获取lemma"""
-        query = "SELECT * FROM lemmas WHERE id = ?"
+        query = f"SELECT {self._LEMMA_COLUMNS} FROM lemmas l WHERE l.id = ?"
         results = db.execute_query(query, (lemma_id,))
         
         if not results:
@@ -74,36 +82,239 @@ class LemmaService:
         
         return self._row_to_dict(results[0])
     
-    def get_all_lemmas(self, sort_by: str = 'lemma') -> List[Dict]:
+    @query_cache.cached('lemmas')
+    def get_all_lemmas(self, sort_by: str = 'lemma', as_records: bool = False) -> List[Dict]:
         """
         获取所有lemmas
         
         Args:
             sort_by: 排序字段 ('lemma', 'created_at', 'topic')
+            as_records: 返回紧凑的LemmaRecord（可像dict一样访问）而不是dict
         """
         valid_sorts = {'lemma', 'created_at', 'topic'}
         if sort_by not in valid_sorts:
             sort_by = 'lemma'
         
-        query = f"SELECT * FROM lemmas ORDER BY {sort_by}"
+        query = f"SELECT {self._LEMMA_COLUMNS} FROM lemmas l ORDER BY {sort_by}"
         results = db.execute_query(query)
         
-        return [self._row_to_dict(row) for row in results]
+        return self._rows_to_lemmas(results, as_records)
     
-    def search_lemmas(self, keyword: str) -> List[Dict]:
-        """搜索lemmas（模糊匹配）"""
-        query = "SELECT * FROM lemmas WHERE lemma LIKE ? ORDER BY lemma"
-        results = db.execute_query(query, (f"%{keyword}%",))
+    @query_cache.cached('lemmas')
+    def search_lemmas(self, keyword: str, as_records: bool = False) -> List[Dict]:
+        """
+        全文搜索lemmas，按相关度(bm25)排序
+        
+        匹配lemma、释义、搭配、派生词和topic；关键词中没有可检索的词时退回lemma模糊匹配。
+        as_records为True时返回LemmaRecord。
+        """
+        fts_query = to_fts_query(keyword)
+        if fts_query is None:
+            query = f"SELECT {self._LEMMA_COLUMNS} FROM lemmas l WHERE lemma LIKE ? ORDER BY lemma"
+            results = db.execute_query(query, (f"%{keyword}%",))
+            return self._rows_to_lemmas(results, as_records)
+        
+        query = f"""
+            SELECT {self._LEMMA_COLUMNS} FROM lemmas_fts
+            JOIN lemmas l ON l.rowid = lemmas_fts.rowid
+            WHERE lemmas_fts MATCH ?
+            ORDER BY bm25(lemmas_fts, {self._FTS_WEIGHTS}), l.rowid
+        """
+        results = db.execute_query(query, (fts_query,))
         
-        return [self._row_to_dict(row) for row in results]
+        return self._rows_to_lemmas(results, as_records)
     
-    def get_lemmas_by_topic(self, topic: str) -> List[Dict]:
-        """根据topic获取lemmas"""
-        query = "SELECT * FROM lemmas WHERE topic = ? ORDER BY lemma"
+    @query_cache.cached('lemmas')
+    def get_lemmas_by_topic(self, topic: str, as_records: bool = False) -> List[Dict]:
+        """根据topic获取lemmas（as_records为True时返回LemmaRecord）"""
+        query = f"SELECT {self._LEMMA_COLUMNS} FROM lemmas l WHERE topic = ? ORDER BY lemma"
         results = db.execute_query(query, (topic,))
         
-        return [self._row_to_dict(row) for row in results]
+        return self._rows_to_lemmas(results, as_records)
+    
+    @query_cache.cached('lemmas', 'examples', 'relations')
+    def get_lemma_summaries(self, sort_by: str = 'lemma', topic: Optional[str] = None,
+                            keyword: Optional[str] = None, projection: str = 'summary',
+                            as_records: bool = False) -> List[Dict]:
+        """
+        获取lemma列表，并在同一条查询中附带example数量和relation数量
+        
+        Args:
+            sort_by: 排序字段 ('lemma', 'created_at', 'topic')
+            topic: 可选，只返回该topic下的lemmas
+            keyword: 可选，全文搜索关键词（结果按lemma排序）
+            projection: 'summary' 只取列表显示的字段（id, lemma, pronunciation_british,
+                        topic, created_at, updated_at）；'detail' 取全部字段
+            as_records: 返回紧凑记录（LemmaSummaryRecord / LemmaDetailRecord）而不是LazyRow
+            
+        Returns:
+            LazyRow列表（可像dict一样读写的Mapping，JSON列在首次访问时才解码），
+            每项额外包含 'example_count' 和 'relation_count'
+        """
+        sort_by = self._listing_sort(sort_by, topic, keyword)
+        conditions, params = self._listing_filters(topic, keyword)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        query = f"""
+            SELECT {self._listing_columns(projection)}
+            FROM lemmas l
+            {where}
+            ORDER BY {self._listing_order(sort_by)}
+        """
+        results = db.execute_query(query, tuple(params))
+        
+        if as_records:
+            record_type = LemmaDetailRecord if projection == 'detail' else LemmaSummaryRecord
+            return [record_type.from_row(row) for row in results]
+        return [self._row_to_summary(row) for row in results]
     
+    @query_cache.cached('lemmas', 'examples', 'relations')
+    def get_lemma_page(self, sort_by: str = 'lemma', topic: Optional[str] = None,
+                       keyword: Optional[str] = None, cursor: Optional[str] = None,
+                       page_size: int = config.DEFAULT_PAGE_SIZE,
+                       projection: str = 'summary') -> Dict:
+        """
+        分页获取lemma列表（keyset分页，翻页代价与总数据量无关）
+        
+        覆盖全部列表视图：按排序字段浏览、按topic过滤、按关键词搜索。
+        
+        Args:
+            sort_by: 排序字段 ('lemma', 'created_at', 'topic')
+            topic: 可选，只返回该topic下的lemmas（按lemma排序）
+            keyword: 可选，全文搜索关键词（按相关度排序，结果额外包含'score'和'snippet'）
+            cursor: 上一页返回的next_cursor，None表示第一页
+            page_size: 每页数量
+            projection: 'summary' 或 'detail'，同get_lemma_summaries
+            
+        Returns:
+            {
+                'items': [LazyRow, ...],  # 同get_lemma_summaries
+                'next_cursor': 下一页游标，没有下一页时为None,
+                'total': 符合条件的总数
+            }
+        """
+        page_size = max(1, min(int(page_size), config.MAX_PAGE_SIZE))
+        fts_query = to_fts_query(keyword)
+        if fts_query is not None:
+            return self._search_page(fts_query, topic, cursor, page_size, projection)
+        
+        sort_by = self._listing_sort(sort_by, topic, keyword)
+        conditions, params = self._listing_filters(topic, keyword)
+        
+        # 总数（不含游标条件）；无过滤条件时直接读统计表
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if conditions:
+            count_query = f"SELECT COUNT(*) as count FROM lemmas l {where}"
+            total = db.execute_query(count_query, tuple(params))[0]['count']
+        else:
+            total = stats_service.count('lemmas')
+        
+        # 游标条件：从上一页最后一行之后开始
+        last_key = self._decode_cursor(cursor, sort_by)
+        if last_key is not None:
+            keyset_condition, keyset_params = self._keyset_condition(sort_by, last_key)
+            conditions.append(keyset_condition)
+            params.extend(keyset_params)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        # 多取一行用于判断是否还有下一页
+        query = f"""
+            SELECT {self._listing_columns(projection)}
+            FROM lemmas l
+            {where}
+            ORDER BY {self._listing_order(sort_by)}
+            LIMIT ?
+        """
+        params.append(page_size + 1)
+        results = db.execute_query(query, tuple(params))
+        
+        items = [self._row_to_summary(row) for row in results[:page_size]]
+        next_cursor = None
+        if len(results) > page_size:
+            last = items[-1]
+            if sort_by == 'lemma':
+                next_cursor = to_json([last['lemma']])
+            else:
+                next_cursor = to_json([last[sort_by], last['lemma']])
+        
+        return {
+            'items': items,
+            'next_cursor': next_cursor,
+            'total': total
+        }
+    
+    def _search_page(self, fts_query: str, topic: Optional[str], cursor: Optional[str],
+                     page_size: int, projection: str) -> Dict:
+        """全文搜索的一页结果，按(bm25得分, rowid)做keyset分页"""
+        conditions = ["lemmas_fts MATCH ?"]
+        params = [fts_query]
+        if topic:
+            conditions.append("l.topic = ?")
+            params.append(topic)
+        
+        count_query = f"""
+            SELECT COUNT(*) as count FROM lemmas_fts
+            JOIN lemmas l ON l.rowid = lemmas_fts.rowid
+            WHERE {' AND '.join(conditions)}
+        """
+        total = db.execute_query(count_query, tuple(params))[0]['count']
+        
+        last_key = from_json(cursor)
+        if isinstance(last_key, list) and len(last_key) == 2:
+            conditions.append(f"(bm25(lemmas_fts, {self._FTS_WEIGHTS}), lemmas_fts.rowid) > (?, ?)")
+            params.extend(last_key)
+        
+        # 先在全文索引中选出当前页，再只为这几行计算数量统计
+        query = f"""
+            SELECT {self._listing_columns(projection)}, hits.score AS score, hits.rowid AS hit_rowid
+            FROM (
+                SELECT lemmas_fts.rowid AS rowid,
+                       bm25(lemmas_fts, {self._FTS_WEIGHTS}) AS score
+                FROM lemmas_fts
+                JOIN lemmas l ON l.rowid = lemmas_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score, lemmas_fts.rowid
+                LIMIT ?
+            ) hits
+            JOIN lemmas l ON l.rowid = hits.rowid
+            ORDER BY hits.score, hits.rowid
+        """
+        params.append(page_size + 1)
+        results = db.execute_query(query, tuple(params))
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        
+        # 只为当前页生成摘要片段
+        snippets = {}
+        if results:
+            placeholders = ', '.join('?' for _ in results)
+            snippet_query = f"""
+                SELECT rowid, snippet(lemmas_fts, -1, '**', '**', '…', 10) AS snippet
+                FROM lemmas_fts
+                WHERE lemmas_fts MATCH ? AND rowid IN ({placeholders})
+            """
+            snippet_rows = db.execute_query(
+                snippet_query, (fts_query, *[row['hit_rowid'] for row in results]))
+            snippets = {row['rowid']: row['snippet'] for row in snippet_rows}
+        
+        items = []
+        for row in results:
+            item = self._row_to_summary(row)
+            del item['hit_rowid']
+            item['snippet'] = snippets.get(row['hit_rowid'])
+            items.append(item)
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = to_json([results[-1]['score'], results[-1]['hit_rowid']])
+        
+        return {
+            'items': items,
+            'next_cursor': next_cursor,
+            'total': total
+        }
+    
+    @query_cache.cached('lemmas')
     def get_all_topics(self) -> List[str]:
         """获取所有不同的topics"""
         query = "SELECT DISTINCT topic FROM lemmas WHERE topic IS NOT NULL ORDER BY topic"
@@ -113,22 +324,36 @@ class LemmaService:
     
     def count_lemmas(self) -> int:
         """统计lemma总数"""
-        query = "SELECT COUNT(*) as count FROM lemmas"
-        result = db.execute_query(query)[0]
-        return result['count']
+        return stats_service.count('lemmas')
     
     def count_lemmas_by_topic(self, topic: str) -> int:
         """统计特定topic下的lemma数量"""
-        query = "SELECT COUNT(*) as count FROM lemmas WHERE topic = ?"
-        result = db.execute_query(query, (topic,))[0]
-        return result['count']
+        return stats_service.count_topic(topic)
     
+    @query_cache.cached('lemmas')
     def lemma_exists(self, lemma: str) -> bool:
         """检查lemma是否存在"""
         query = "SELECT COUNT(*) as count FROM lemmas WHERE lemma = ?"
         result = db.execute_query(query, (lemma,))[0]
         return result['count'] > 0
     
+    def lemmas_exist(self, lemmas: Iterable[str]) -> Dict[str, bool]:
+        """
+        批量检查lemma是否存在（一次查询，数量多时按SQLite变量上限分块）
+        
+        Args:
+            lemmas: lemma名称（调用方负责格式化，与lemma_exists相同）
+            
+        Returns:
+            {lemma: 是否存在}，按首次出现的顺序，重复的名称只出现一次
+        """
+        names = tuple(dict.fromkeys(lemmas))
+        if not names:
+            return {}
+        existing = set(self._existing_lemmas(names))
+        return {name: name in existing for name in names}
+    
+    @query_cache.invalidates('lemmas')
     def update_lemma(self, lemma: str, **kwargs) -> Tuple[bool, str]:
         """更新lemma信息"""
         if not self.lemma_exists(lemma):
@@ -172,6 +397,7 @@ class LemmaService:
         except Exception as e:
             return False, f"更新失败: {str(e)}"
     
+    @query_cache.invalidates('lemmas', 'examples')
     def delete_lemma(self, lemma: str) -> Tuple[bool, str]:
         """删除lemma"""
         if not self.lemma_exists(lemma):
@@ -184,21 +410,115 @@ class LemmaService:
         except Exception as e:
             return False, f"删除失败: {str(e)}"
     
+    # lemma的全部列，顺序与LemmaRecord的字段一致
+    _LEMMA_COLUMNS = ', '.join(f"l.{name}" for name in LemmaRecord._fields)
+    
+    # 列表查询的lemma字段：summary只取列表显示需要的列，detail取全部列
+    # （顺序与LemmaSummaryRecord / LemmaDetailRecord一致，数量统计列在最后）
+    _PROJECTIONS = {
+        'summary': ', '.join(f"l.{name}" for name in LemmaSummaryRecord._fields[:-2]),
+        'detail': _LEMMA_COLUMNS
+    }
+    
+    # 存储为JSON字符串的列（_row_to_dict立即解码，列表的LazyRow首次访问时解码）
+    _JSON_COLUMNS = ('pos_meaning', 'inflection', 'derivation')
+    
+    # 列表查询附带的example/relation数量（走索引的相关子查询）
+    _COUNT_COLUMNS = """
+        (SELECT COUNT(*) FROM example_lemma_links el
+         JOIN examples e ON e.id = el.example_id
+         WHERE el.lemma = l.lemma) AS example_count,
+        (SELECT COUNT(*) FROM relations r
+         WHERE r.lemma1 = l.lemma OR r.lemma2 = l.lemma) AS relation_count
+    """
+    
+    # bm25列权重：lemma, meanings, collocation, derivation, topic
+    _FTS_WEIGHTS = "10.0, 4.0, 2.0, 3.0, 1.0"
+    
+    def _listing_columns(self, projection: str) -> str:
+        """列表查询的SELECT列，未知的projection按summary处理"""
+        columns = self._PROJECTIONS.get(projection, self._PROJECTIONS['summary'])
+        return f"{columns}, {self._COUNT_COLUMNS}"
+    
+    def _listing_sort(self, sort_by: str, topic: Optional[str], keyword: Optional[str]) -> str:
+        """确定列表的排序字段；topic过滤和关键词搜索固定按lemma排序"""
+        if topic or keyword:
+            return 'lemma'
+        if sort_by not in {'lemma', 'created_at', 'topic'}:
+            return 'lemma'
+        return sort_by
+    
+    def _listing_filters(self, topic: Optional[str], keyword: Optional[str]) -> Tuple[List[str], List]:
+        """构建列表查询的过滤条件"""
+        conditions = []
+        params = []
+        if keyword:
+            fts_query = to_fts_query(keyword)
+            if fts_query is not None:
+                conditions.append("l.rowid IN (SELECT rowid FROM lemmas_fts WHERE lemmas_fts MATCH ?)")
+                params.append(fts_query)
+            else:
+                conditions.append("l.lemma LIKE ?")
+                params.append(f"%{keyword}%")
+        if topic:
+            conditions.append("l.topic = ?")
+            params.append(topic)
+        return conditions, params
+    
+    def _listing_order(self, sort_by: str) -> str:
+        """ORDER BY子句，lemma作为唯一的次级排序键保证顺序稳定"""
+        if sort_by == 'lemma':
+            return "l.lemma"
+        return f"l.{sort_by}, l.lemma"
+    
+    def _decode_cursor(self, cursor: Optional[str], sort_by: str) -> Optional[list]:
+        """解析分页游标，无效游标视为第一页"""
+        key = from_json(cursor)
+        expected_len = 1 if sort_by == 'lemma' else 2
+        if not isinstance(key, list) or len(key) != expected_len:
+            return None
+        return key
+    
+    def _keyset_condition(self, sort_by: str, last_key: list) -> Tuple[str, List]:
+        """构建"位于上一页最后一行之后"的条件（NULL排在最前）"""
+        if sort_by == 'lemma':
+            return "l.lemma > ?", [last_key[0]]
+        
+        last_value, last_lemma = last_key
+        if last_value is None:
+            return (f"((l.{sort_by} IS NULL AND l.lemma > ?) OR l.{sort_by} IS NOT NULL)",
+                    [last_lemma])
+        return f"(l.{sort_by}, l.lemma) > (?, ?)", [last_value, last_lemma]
+    
+    @query_cache.cached('lemmas')
+    def _existing_lemmas(self, names: Tuple[str, ...]) -> List[str]:
+        """names中存在的lemma"""
+        existing = []
+        chunk_size = 500
+        for i in range(0, len(names), chunk_size):
+            chunk = names[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            query = f"SELECT lemma FROM lemmas WHERE lemma IN ({placeholders})"
+            existing.extend(row['lemma'] for row in db.execute_query(query, chunk))
+        return existing
+    
+    def _rows_to_lemmas(self, rows, as_records: bool) -> List[Dict]:
+        """将lemma查询结果转换为字典或LemmaRecord"""
+        if as_records:
+            return [LemmaRecord.from_row(row) for row in rows]
+        return [self._row_to_dict(row) for row in rows]
+    
+    def _row_to_summary(self, row) -> LazyRow:
+        """将列表查询的行转换为LazyRow（含所选字段及example/relation数量，JSON列在首次访问时解码）"""
+        return LazyRow(dict(row), self._JSON_COLUMNS)
+    
     def _row_to_dict(self, row) -> Dict:
-        """将数据库行转换为字典"""
-        return {
-            'id': row['id'],
-            'lemma': row['lemma'],
-            'pronunciation_british': row['pronunciation_british'],
-            'spell_nuance': row['spell_nuance'],
-            'pos_meaning': from_json(row['pos_meaning']),
-            'inflection': from_json(row['inflection']),
-            'derivation': from_json(row['derivation']),
-            'collocation': row['collocation'],
-            'topic': row['topic'],
-            'created_at': row['created_at'],
-            'updated_at': row['updated_at']
-        }
+        """将数据库行转换为字典（JSON列解码为对象）"""
+        data = dict(row)
+        for column in self._JSON_COLUMNS:
+            if column in data:
+                data[column] = from_json(data[column])
+        return data
 
 
 # 全局服务实例
@@ -0,0 +1,279 @@
+"""
+Relation图的进程内缓存 (Sheet 3)
+
+以 (lemma, specific_word) 为节点、relation为边，在内存中维护邻接结构，
+首次使用时从relations表整体加载一次，之后由RelationService的写操作增量更新。
+"""
+import sys
+import threading
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from database.db_manager import db
+import config
+
+
+class RelationGraph:
+    """
+    紧凑的内存关系图
+
+    - 节点字符串驻留(intern)后只保存一份，节点用整数编号
+    - 边按relation id直接寻址，端点和类型存放在array中（每条边约9字节）
+    - 每个节点的邻接表是一个relation id数组
+    """
+
+    _NO_EDGE = -1
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        """清空所有数据"""
+        self._node_index: Dict[Tuple[str, str], int] = {}  # (lemma, word) -> 节点编号
+        self._nodes: List[Tuple[str, str]] = []  # 节点编号 -> (lemma, word)
+        self._adjacency: List[array] = []  # 节点编号 -> relation id数组
+        self._edge_a = array('i')  # relation id -> 端点1编号
+        self._edge_b = array('i')  # relation id -> 端点2编号
+        self._edge_type = array('b')  # relation id -> 关系类型编号
+        self._types: List[str] = list(config.RELATION_TYPES)
+        self._notes: Dict[int, str] = {}  # 只保存非空的note
+        self._lemma_counts: Dict[str, int] = {}  # lemma -> 相关relation数量
+        self._edge_count = 0
+
+    # ========== 加载与失效 ==========
+
+    def _ensure_loaded(self):
+        """首次使用时从数据库加载整个图"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._reset()
+            query = """
+                SELECT id, lemma1, specific_word1, lemma2, specific_word2, relation_type, note
+                FROM relations ORDER BY id
+            """
+            with db.connection() as conn:
+                cursor = conn.execute(query)
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows:
+                        break
+                    for row in rows:
+                        self._add(*row)
+            self._loaded = True
+
+    def invalidate(self):
+        """丢弃缓存，下次使用时重新加载（例如其他进程直接修改了数据库）"""
+        with self._lock:
+            self._loaded = False
+            self._reset()
+
+    # ========== 写入（由RelationService在提交后调用） ==========
+
+    def add(self, relation_id: int, lemma1: str, specific_word1: str, lemma2: str,
+            specific_word2: str, relation_type: str, note: Optional[str] = None):
+        """新增或覆盖一条relation"""
+        with self._lock:
+            if self._loaded:
+                self._add(relation_id, lemma1, specific_word1, lemma2, specific_word2,
+                          relation_type, note)
+
+    def remove(self, relation_id: int):
+        """删除一条relation"""
+        with self._lock:
+            if self._loaded:
+                self._remove(relation_id)
+
+    def _node(self, lemma: str, word: str) -> int:
+        """获取节点编号，不存在则创建"""
+        key = (lemma, word)
+        node = self._node_index.get(key)
+        if node is None:
+            node = len(self._nodes)
+            key = (sys.intern(lemma), sys.intern(word))
+            self._node_index[key] = node
+            self._nodes.append(key)
+            self._adjacency.append(array('i'))
+        return node
+
+    def _add(self, relation_id: int, lemma1: str, specific_word1: str, lemma2: str,
+             specific_word2: str, relation_type: str, note: Optional[str]):
+        if relation_id < len(self._edge_a) and self._edge_a[relation_id] != self._NO_EDGE:
+            self._remove(relation_id)
+
+        # 边数组按relation id寻址，按需扩容
+        if relation_id >= len(self._edge_a):
+            grow = max(relation_id + 1 - len(self._edge_a), len(self._edge_a) // 4, 1024)
+            self._edge_a.extend(array('i', [self._NO_EDGE]) * grow)
+            self._edge_b.extend(array('i', [self._NO_EDGE]) * grow)
+            self._edge_type.extend(array('b', [0]) * grow)
+
+        if relation_type not in self._types:
+            self._types.append(relation_type)
+
+        a = self._node(lemma1, specific_word1)
+        b = self._node(lemma2, specific_word2)
+        self._edge_a[relation_id] = a
+        self._edge_b[relation_id] = b
+        self._edge_type[relation_id] = self._types.index(relation_type)
+        if note:
+            self._notes[relation_id] = note
+
+        self._adjacency[a].append(relation_id)
+        if b != a:
+            self._adjacency[b].append(relation_id)
+
+        self._lemma_counts[lemma1] = self._lemma_counts.get(lemma1, 0) + 1
+        if lemma2 != lemma1:
+            self._lemma_counts[lemma2] = self._lemma_counts.get(lemma2, 0) + 1
+        self._edge_count += 1
+
+    def _remove(self, relation_id: int):
+        if relation_id >= len(self._edge_a) or self._edge_a[relation_id] == self._NO_EDGE:
+            return
+
+        a = self._edge_a[relation_id]
+        b = self._edge_b[relation_id]
+        self._adjacency[a].remove(relation_id)
+        if b != a:
+            self._adjacency[b].remove(relation_id)
+
+        for lemma in {self._nodes[a][0], self._nodes[b][0]}:
+            count = self._lemma_counts[lemma] - 1
+            if count:
+                self._lemma_counts[lemma] = count
+            else:
+                del self._lemma_counts[lemma]
+
+        self._edge_a[relation_id] = self._NO_EDGE
+        self._edge_b[relation_id] = self._NO_EDGE
+        self._notes.pop(relation_id, None)
+        self._edge_count -= 1
+
+    # ========== 查询 ==========
+
+    def relation_count(self, lemma: str) -> int:
+        """lemma相关的relation数量（与get_relations_by_lemma的结果数一致）"""
+        self._ensure_loaded()
+        return self._lemma_counts.get(lemma, 0)
+
+    def degree(self, lemma: str, specific_word: str) -> int:
+        """某个节点的relation数量"""
+        self._ensure_loaded()
+        with self._lock:
+            node = self._node_index.get((lemma, specific_word))
+            return len(self._adjacency[node]) if node is not None else 0
+
+    def network(self, lemma: str, specific_word: str, max_depth: int = 2,
+                max_nodes: int = config.NETWORK_MAX_NODES,
+                max_edges: int = config.NETWORK_MAX_EDGES) -> Dict:
+        """
+        广度优先展开关系网络，结果结构同RelationService.get_relation_network
+        """
+        self._ensure_loaded()
+        nodes = {}  # 节点编号 -> node dict
+        edges = []
+        truncated = False
+
+        def add_node(node: int, depth: int) -> str:
+            if node not in nodes:
+                l, w = self._nodes[node]
+                nodes[node] = {'id': f"{l}-{w}", 'lemma': l, 'word': w, 'depth': depth}
+            return nodes[node]['id']
+
+        with self._lock:
+            start = self._node_index.get((lemma, specific_word))
+            if start is None:
+                return {
+                    'nodes': [{'id': f"{lemma}-{specific_word}", 'lemma': lemma,
+                               'word': specific_word, 'depth': 0}],
+                    'edges': [],
+                    'truncated': False
+                }
+
+            depths = {start: 0}
+            queue = deque([start])
+            expanded = 0
+            while queue:
+                if expanded >= max_nodes:
+                    truncated = True
+                    break
+                node = queue.popleft()
+                depth = depths[node]
+                node_id = add_node(node, depth)
+                expanded += 1
+
+                # 新建的relation排在前面，与按created_at倒序的查询一致
+                for relation_id in reversed(self._adjacency[node]):
+                    if len(edges) >= max_edges:
+                        truncated = True
+                        break
+                    a = self._edge_a[relation_id]
+                    other = self._edge_b[relation_id] if a == node else a
+                    other_id = add_node(other, depth + 1)
+                    edges.append({
+                        'source': node_id,
+                        'target': other_id,
+                        'type': self._types[self._edge_type[relation_id]],
+                        'note': self._notes.get(relation_id)
+                    })
+                    if other not in depths:
+                        depths[other] = depth + 1
+                        if depth + 1 <= max_depth:
+                            queue.append(other)
+                if truncated:
+                    break
+
+        return {
+            'nodes': list(nodes.values()),
+            'edges': edges,
+            'truncated': truncated
+        }
+
+    def stats(self) -> Dict:
+        """
+        图的规模和内存占用估算（字节）
+
+        统计节点表、邻接数组、边数组、note和lemma计数的容器及其元素，
+        驻留字符串按去重后计算一次。
+        """
+        self._ensure_loaded()
+        with self._lock:
+            strings = {}
+            for lemma, word in self._nodes:
+                strings[id(lemma)] = lemma
+                strings[id(word)] = word
+            for lemma in self._lemma_counts:
+                strings[id(lemma)] = lemma
+
+            node_bytes = (sys.getsizeof(self._node_index) + sys.getsizeof(self._nodes)
+                          + sum(sys.getsizeof(key) for key in self._nodes)
+                          + sum(sys.getsizeof(s) for s in strings.values()))
+            adjacency_bytes = (sys.getsizeof(self._adjacency)
+                               + sum(sys.getsizeof(adj) for adj in self._adjacency))
+            edge_bytes = (sys.getsizeof(self._edge_a) + sys.getsizeof(self._edge_b)
+                          + sys.getsizeof(self._edge_type))
+            note_bytes = sys.getsizeof(self._notes) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._notes.items())
+            count_bytes = sys.getsizeof(self._lemma_counts)
+
+            return {
+                'nodes': len(self._nodes),
+                'edges': self._edge_count,
+                'bytes': {
+                    'nodes': node_bytes,
+                    'adjacency': adjacency_bytes,
+                    'edges': edge_bytes,
+                    'notes': note_bytes,
+                    'lemma_counts': count_bytes,
+                    'total': node_bytes + adjacency_bytes + edge_bytes + note_bytes + count_bytes
+                }
+            }
+
+
+# 全局关系图实例
+relation_graph = RelationGraph()
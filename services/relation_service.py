@@ -1,15 +1,20 @@
 """
 Relation业务逻辑服务 (Sheet 3)
 """
-from typing import List, Tuple, Dict, Optional, Set
+from typing import Callable, List, Tuple, Dict, Optional, Set
 from database.db_manager import db
+from database.models import RelationRecord
+from services.cache import query_cache
 from services.lemma_service import lemma_service
+from services.relation_graph import relation_graph
 from utils.validators import validate_specific_word, validate_relation_type
+import config
 
 
 class RelationService:
     """Relation服务"""
     
+    @query_cache.invalidates('relations')
     def create_relation(self, lemma1: str, specific_word1: str, lemma2: str, 
                        specific_word2: str, relation_type: str, 
                        note: Optional[str] = None) -> Tuple[bool, str, Optional[int]]:
@@ -19,11 +24,12 @@ class RelationService:
         Returns:
             (成功标志, 消息, relation_id)
         """
-        # 验证lemmas必须存在
-        if not lemma_service.lemma_exists(lemma1):
+        # 验证lemmas必须存在（一次查询）
+        exists = lemma_service.lemmas_exist([lemma1, lemma2])
+        if not exists[lemma1]:
             return False, f"Lemma '{lemma1}' 不存在，请先创建", None
         
-        if not lemma_service.lemma_exists(lemma2):
+        if not exists[lemma2]:
             return False, f"Lemma '{lemma2}' 不存在，请先创建", None
         
         # 验证specific words
@@ -48,10 +54,13 @@ class RelationService:
         try:
             relation_id = db.execute_insert(query, (lemma1, word1, lemma2, word2, 
                                                    relation_type, note))
+            self._sync_graph(lambda: relation_graph.add(
+                relation_id, lemma1, word1, lemma2, word2, relation_type, note))
             return True, "Relation创建成功", relation_id
         except Exception as e:
             return False, f"创建失败: {str(e)}", None
     
+    @query_cache.cached('relations')
     def get_relation(self, relation_id: int) -> Optional[Dict]:
         """获取单个relation"""
         query = "SELECT * FROM relations WHERE id = ?"
@@ -62,117 +71,89 @@ class RelationService:
         
         return self._row_to_dict(results[0])
     
-    def get_all_relations(self) -> List[Dict]:
-        """获取所有relations"""
-        query = "SELECT * FROM relations ORDER BY created_at DESC"
+    @query_cache.cached('relations')
+    def get_all_relations(self, as_records: bool = False) -> List[Dict]:
+        """获取所有relations（as_records为True时返回紧凑的RelationRecord）"""
+        query = f"SELECT {self._COLUMNS} FROM relations ORDER BY created_at DESC"
         results = db.execute_query(query)
         
-        return [self._row_to_dict(row) for row in results]
+        return self._rows_to_relations(results, as_records)
     
-    def get_relations_by_lemma(self, lemma: str, specific_word: Optional[str] = None) -> List[Dict]:
+    @query_cache.cached('relations')
+    def get_relations_by_lemma(self, lemma: str, specific_word: Optional[str] = None,
+                               as_records: bool = False) -> List[Dict]:
         """
         获取某个lemma相关的所有relations
         
         Args:
             lemma: lemma名称
             specific_word: 可选，指定specific word则只返回该词的关系
+            as_records: 返回RelationRecord而不是dict
         """
+        # 两侧分别按索引顺序读出再合并（用OR时需要对全部结果再排序一次）；
+        # 第二部分排除两侧都匹配的relation，避免重复
         if specific_word:
-            query = """
-                SELECT * FROM relations
-                WHERE (lemma1 = ? AND specific_word1 = ?) 
-                   OR (lemma2 = ? AND specific_word2 = ?)
+            query = f"""
+                SELECT {self._COLUMNS} FROM relations
+                WHERE lemma1 = ? AND specific_word1 = ?
+                UNION ALL
+                SELECT {self._COLUMNS} FROM relations
+                WHERE lemma2 = ? AND specific_word2 = ?
+                  AND NOT (lemma1 = ? AND specific_word1 = ?)
                 ORDER BY created_at DESC
             """
-            results = db.execute_query(query, (lemma, specific_word, lemma, specific_word))
+            results = db.execute_query(query, (lemma, specific_word) * 3)
         else:
-            query = """
-                SELECT * FROM relations
-                WHERE lemma1 = ? OR lemma2 = ?
+            query = f"""
+                SELECT {self._COLUMNS} FROM relations
+                WHERE lemma1 = ?
+                UNION ALL
+                SELECT {self._COLUMNS} FROM relations
+                WHERE lemma2 = ? AND lemma1 != ?
                 ORDER BY created_at DESC
             """
-            results = db.execute_query(query, (lemma, lemma))
+            results = db.execute_query(query, (lemma, lemma, lemma))
         
-        return [self._row_to_dict(row) for row in results]
+        return self._rows_to_relations(results, as_records)
     
+    @query_cache.cached('relations')
     def get_relation_network(self, lemma: str, specific_word: str, 
-                           max_depth: int = 2) -> Dict:
+                           max_depth: int = 2,
+                           max_nodes: int = config.NETWORK_MAX_NODES,
+                           max_edges: int = config.NETWORK_MAX_EDGES) -> Dict:
         """
         获取关系网络数据（用于绘图）
         
+        距起点不超过max_depth跳的节点会被展开，其相邻节点也会出现在结果中。
+        启用RELATION_GRAPH_CACHE时由内存关系图直接计算，否则查询数据库。
+        
         Args:
             lemma: 起始lemma
             specific_word: 起始specific word
-            max_depth: 最大递归深度
+            max_depth: 最大展开深度
+            max_nodes: 最多展开的节点数（超出时优先保留离起点近的）
+            max_edges: 最多返回的边数
             
         Returns:
             {
-                'nodes': [{'id': 'lemma-word', 'lemma': 'xxx', 'word': 'xxx'}, ...],
-                'edges': [{'source': 'node1', 'target': 'node2', 'type': 'xxx', 'note': 'xxx'}, ...]
+                'nodes': [{'id': 'lemma-word', 'lemma': 'xxx', 'word': 'xxx', 'depth': 0}, ...],
+                'edges': [{'source': 'node1', 'target': 'node2', 'type': 'xxx', 'note': 'xxx'}, ...],
+                'truncated': 是否因节点/边数上限被截断
             }
         """
-        nodes = {}  # key: 'lemma-word', value: node dict
-        edges = []
-        visited = set()
-        
-        def make_node_id(l: str, w: str) -> str:
-            return f"{l}-{w}"
-        
-        def add_node(l: str, w: str):
-            node_id = make_node_id(l, w)
-            if node_id not in nodes:
-                nodes[node_id] = {
-                    'id': node_id,
-                    'lemma': l,
-                    'word': w
-                }
-            return node_id
-        
-        def explore(l: str, w: str, depth: int):
-            if depth > max_depth:
-                return
-            
-            node_id = make_node_id(l, w)
-            if node_id in visited:
-                return
-            
-            visited.add(node_id)
-            add_node(l, w)
-            
-            # 获取相关的relations
-            relations = self.get_relations_by_lemma(l, w)
-            
-            for rel in relations:
-                # 确定另一端的节点
-                if rel['lemma1'] == l and rel['specific_word1'] == w:
-                    other_lemma = rel['lemma2']
-                    other_word = rel['specific_word2']
-                else:
-                    other_lemma = rel['lemma1']
-                    other_word = rel['specific_word1']
-                
-                other_id = add_node(other_lemma, other_word)
-                
-                # 添加边
-                edge = {
-                    'source': node_id,
-                    'target': other_id,
-                    'type': rel['relation_type'],
-                    'note': rel['note']
-                }
-                edges.append(edge)
-                
-                # 递归探索
-                explore(other_lemma, other_word, depth + 1)
-        
-        # 从起始节点开始探索
-        explore(lemma, specific_word, 0)
-        
-        return {
-            'nodes': list(nodes.values()),
-            'edges': edges
-        }
+        if config.RELATION_GRAPH_CACHE:
+            return relation_graph.network(lemma, specific_word, max_depth, max_nodes, max_edges)
+        return self._query_relation_network(lemma, specific_word, max_depth, max_nodes, max_edges)
+    
+    @query_cache.cached('relations')
+    def count_relations(self, lemma: str) -> int:
+        """统计lemma相关的relation数量（与get_relations_by_lemma的结果数一致）"""
+        if config.RELATION_GRAPH_CACHE:
+            return relation_graph.relation_count(lemma)
+        query = "SELECT COUNT(*) as count FROM relations WHERE lemma1 = ? OR lemma2 = ?"
+        return db.execute_query(query, (lemma, lemma))[0]['count']
     
+    @query_cache.invalidates('relations')
     def update_relation(self, relation_id: int, **kwargs) -> Tuple[bool, str]:
         """更新relation"""
         # 检查是否存在
@@ -219,10 +200,18 @@ class RelationService:
         
         try:
             db.execute_update(query, tuple(params))
+            query_cache.bump('relations')  # 下面需要读到更新后的数据
+            updated = self.get_relation(relation_id)
+            if updated:
+                self._sync_graph(lambda: relation_graph.add(
+                    relation_id, updated['lemma1'], updated['specific_word1'],
+                    updated['lemma2'], updated['specific_word2'],
+                    updated['relation_type'], updated['note']))
             return True, "更新成功"
         except Exception as e:
             return False, f"更新失败: {str(e)}"
     
+    @query_cache.invalidates('relations')
     def delete_relation(self, relation_id: int) -> Tuple[bool, str]:
         """删除relation"""
         query = "DELETE FROM relations WHERE id = ?"
@@ -230,10 +219,108 @@ class RelationService:
             rows = db.execute_delete(query, (relation_id,))
             if rows == 0:
                 return False, f"Relation ID {relation_id} 不存在"
+            self._sync_graph(lambda: relation_graph.remove(relation_id))
             return True, "删除成功"
         except Exception as e:
             return False, f"删除失败: {str(e)}"
     
+    def _query_relation_network(self, lemma: str, specific_word: str, max_depth: int,
+                                max_nodes: int, max_edges: int) -> Dict:
+        """
+        在SQLite中用递归CTE做广度优先遍历，一条查询取回所有节点、边和跳数
+        """
+        query = """
+            WITH RECURSIVE walk(lemma, word, depth) AS (
+                SELECT ?, ?, 0
+                UNION
+                SELECT r.lemma2, r.specific_word2, w.depth + 1
+                FROM walk w
+                JOIN relations r ON r.lemma1 = w.lemma AND r.specific_word1 = w.word
+                WHERE w.depth < ?
+                UNION
+                SELECT r.lemma1, r.specific_word1, w.depth + 1
+                FROM walk w
+                JOIN relations r ON r.lemma2 = w.lemma AND r.specific_word2 = w.word
+                WHERE w.depth < ?
+                LIMIT ?
+            ),
+            visited(lemma, word, depth) AS (
+                SELECT lemma, word, MIN(depth) FROM walk
+                GROUP BY lemma, word
+                ORDER BY 3
+                LIMIT ?
+            )
+            SELECT v.lemma AS node_lemma, v.word AS node_word, v.depth AS depth,
+                   r.lemma1, r.specific_word1, r.lemma2, r.specific_word2,
+                   r.relation_type, r.note
+            FROM visited v
+            LEFT JOIN relations r
+                ON (r.lemma1 = v.lemma AND r.specific_word1 = v.word)
+                OR (r.lemma2 = v.lemma AND r.specific_word2 = v.word)
+            ORDER BY v.depth, r.created_at DESC
+            LIMIT ?
+        """
+        # walk中同一节点可能以不同深度出现多次，按深度层数放宽生成上限
+        walk_limit = max_nodes * (max_depth + 1)
+        results = db.execute_query(query, (lemma, specific_word, max_depth, max_depth,
+                                           walk_limit, max_nodes, max_edges))
+        
+        nodes = {}  # key: 'lemma-word', value: node dict
+        edges = []
+        
+        def add_node(l: str, w: str, depth: int) -> str:
+            node_id = f"{l}-{w}"
+            if node_id not in nodes:
+                nodes[node_id] = {
+                    'id': node_id,
+                    'lemma': l,
+                    'word': w,
+                    'depth': depth
+                }
+            return node_id
+        
+        # 先登记所有展开过的节点，保证它们的深度是最短跳数
+        for row in results:
+            add_node(row['node_lemma'], row['node_word'], row['depth'])
+        
+        for row in results:
+            if row['relation_type'] is None:
+                continue  # 没有关系的孤立节点
+            l, w = row['node_lemma'], row['node_word']
+            node_id = f"{l}-{w}"
+            
+            # 确定另一端的节点
+            if row['lemma1'] == l and row['specific_word1'] == w:
+                other_lemma, other_word = row['lemma2'], row['specific_word2']
+            else:
+                other_lemma, other_word = row['lemma1'], row['specific_word1']
+            other_id = add_node(other_lemma, other_word, row['depth'] + 1)
+            
+            edges.append({
+                'source': node_id,
+                'target': other_id,
+                'type': row['relation_type'],
+                'note': row['note']
+            })
+        
+        truncated = len(results) >= max_edges or \
+            len({row['node_lemma'] + '-' + row['node_word'] for row in results}) >= max_nodes
+        
+        return {
+            'nodes': list(nodes.values()),
+            'edges': edges,
+            'truncated': truncated
+        }
+    
+    # relation的全部列，顺序与RelationRecord的字段一致
+    _COLUMNS = ', '.join(RelationRecord._fields)
+    
+    def _rows_to_relations(self, rows, as_records: bool) -> List[Dict]:
+        """将relation查询结果转换为字典或RelationRecord"""
+        if as_records:
+            return [RelationRecord.from_row(row) for row in rows]
+        return [self._row_to_dict(row) for row in rows]
+    
     def _row_to_dict(self, row) -> Dict:
         """将数据库行转换为字典"""
         return {
@@ -246,6 +333,18 @@ class RelationService:
             'note': row['note'],
             'created_at': row['created_at']
         }
+    
+    def _sync_graph(self, update: Callable[[], None]):
+        """
+        写入提交后更新内存关系图
+        
+        在外层db.transaction()中调用时写入可能随事务回滚，
+        因此改为事务结束后丢弃关系图，下次使用时按数据库重新加载。
+        """
+        if db.in_transaction():
+            db.after_transaction(relation_graph.invalidate)
+        else:
+            update()
 
 
 # 全局服务实例
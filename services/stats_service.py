@@ -0,0 +1,79 @@
+"""
+统计信息服务
+
+读取由触发器维护的corpus_stats / topic_stats表（见database/migrations），
+侧边栏和Browse页的指标只需一次查询，开销与语料规模无关。
+"""
+from typing import Dict
+from database.db_manager import db
+from services.cache import query_cache
+
+
+class StatsService:
+    """统计服务"""
+
+    # corpus_stats中的计数名 -> 返回结果中的键名
+    _COUNTERS = {
+        'lemmas': 'total_lemmas',
+        'examples': 'total_examples',
+        'relations': 'total_relations',
+        'lemmas_with_examples': 'lemmas_with_examples'
+    }
+
+    @query_cache.cached('lemmas', 'examples', 'relations')
+    def get_stats(self) -> Dict:
+        """
+        获取全部统计信息（单次查询）
+
+        Returns:
+            {
+                'total_lemmas': int,
+                'total_examples': int,
+                'total_relations': int,
+                'lemmas_with_examples': int,
+                'topic_count': int,
+                'topics': {topic: lemma数量, ...}  # 按topic排序
+            }
+        """
+        query = """
+            SELECT 'counter' AS kind, name, value FROM corpus_stats
+            UNION ALL
+            SELECT 'topic', topic, lemma_count FROM topic_stats
+            ORDER BY kind, name
+        """
+        results = db.execute_query(query)
+
+        stats = {key: 0 for key in self._COUNTERS.values()}
+        topics = {}
+        for row in results:
+            if row['kind'] == 'topic':
+                topics[row['name']] = row['value']
+            elif row['name'] in self._COUNTERS:
+                stats[self._COUNTERS[row['name']]] = row['value']
+
+        stats['topic_count'] = len(topics)
+        stats['topics'] = topics
+        return stats
+
+    @query_cache.cached('lemmas', 'examples', 'relations')
+    def count(self, name: str) -> int:
+        """
+        读取单个计数
+
+        Args:
+            name: 'lemmas', 'examples', 'relations' 或 'lemmas_with_examples'
+        """
+        query = "SELECT value FROM corpus_stats WHERE name = ?"
+        results = db.execute_query(query, (name,))
+        return results[0]['value'] if results else 0
+
+    @query_cache.cached('lemmas')
+    def count_topic(self, topic: str) -> int:
+        """读取特定topic下的lemma数量"""
+        query = "SELECT lemma_count FROM topic_stats WHERE topic = ?"
+        results = db.execute_query(query, (topic,))
+        return results[0]['lemma_count'] if results else 0
+
+
+# 全局服务实例
+stats_service = StatsService()
@@ -0,0 +1,16 @@
+"""
+测试配置：所有测试共用一个临时数据库
+
+database.db_manager在导入时按config.DB_PATH创建全局db，
+因此必须在导入任何服务模块之前修改DB_PATH。
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+TEST_DIR = tempfile.mkdtemp(prefix='dictionary_tests_')
+config.DB_PATH = os.path.join(TEST_DIR, 'test.db')
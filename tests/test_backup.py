@@ -0,0 +1,39 @@
+"""备份与快照恢复"""
+import os
+import sqlite3
+from services.backup_service import backup_service
+from services.lemma_service import lemma_service
+
+
+def test_backup_leaves_no_sidecar_files(tmp_path):
+    lemma_service.create_lemma('backedup', topic='backup')
+    success, message, path = backup_service.create_backup(str(tmp_path), keep=1)
+    assert success, message
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(path)]
+    assert backup_service.verify_backup(path) == (True, 'ok')
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(path)]
+
+
+def test_restore_snapshot_ignores_stale_wal(tmp_path):
+    lemma_service.create_lemma('snapshotted', topic='backup')
+    success, message, manifest = backup_service.create_snapshot(str(tmp_path), keep=1)
+    assert success, message
+
+    # 目标位置有旧数据库留下的WAL文件
+    target = str(tmp_path / 'restored.db')
+    for suffix in ('', '-wal', '-shm'):
+        with open(target + suffix, 'wb') as f:
+            f.write(b'stale')
+
+    success, message = backup_service.restore_snapshot(
+        manifest['name'], target, backup_dir=str(tmp_path), overwrite=True)
+    assert success, message
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('restored.db')
+                and name != 'restored.db']
+
+    conn = sqlite3.connect(target)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+        assert conn.execute("SELECT 1 FROM lemmas WHERE lemma = 'snapshotted'").fetchone()
+    finally:
+        conn.close()
@@ -0,0 +1,71 @@
+"""服务层读缓存与事务的交互"""
+import threading
+import pytest
+from database.db_manager import db
+from services.cache import query_cache
+from services.lemma_service import lemma_service
+from services.relation_graph import relation_graph
+from services.relation_service import relation_service
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _in_thread(func):
+    """在另一个线程中执行func并返回结果（模拟其他会话）"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+@pytest.fixture(autouse=True)
+def cache_enabled():
+    enabled = query_cache.enabled
+    query_cache.enabled = True
+    query_cache.clear()
+    yield
+    query_cache.enabled = enabled
+
+
+def test_uncommitted_reads_are_not_cached_for_other_threads():
+    seen_before_commit = []
+    with pytest.raises(_Rollback):
+        with db.transaction():
+            success, _, _ = lemma_service.create_lemma('uncommitted', topic='cache')
+            assert success
+            # 事务内能读到自己的写入
+            assert lemma_service.get_lemma('uncommitted') is not None
+            seen_before_commit.append(_in_thread(lambda: lemma_service.get_lemma('uncommitted')))
+            raise _Rollback()
+
+    assert seen_before_commit == [None]
+    assert _in_thread(lambda: lemma_service.get_lemma('uncommitted')) is None
+    assert lemma_service.get_lemma('uncommitted') is None
+
+
+def test_committed_transaction_is_visible_to_other_threads():
+    assert _in_thread(lambda: lemma_service.get_lemma('committed')) is None
+    with db.transaction():
+        lemma_service.create_lemma('committed', topic='cache')
+        lemma_service.get_lemma('committed')
+    assert _in_thread(lambda: lemma_service.get_lemma('committed')) is not None
+
+
+def test_relation_graph_follows_rollback():
+    for name in ('grapha', 'graphb'):
+        lemma_service.create_lemma(name, topic='cache')
+    relation_graph.invalidate()
+    assert relation_graph.relation_count('grapha') == 0  # 加载关系图
+
+    with pytest.raises(_Rollback):
+        with db.transaction():
+            success, _, _ = relation_service.create_relation(
+                'grapha', 'grapha', 'graphb', 'graphb', 'interchangeable')
+            assert success
+            raise _Rollback()
+
+    assert relation_graph.relation_count('grapha') == 0
+    assert relation_service.get_relations_by_lemma('grapha') == []
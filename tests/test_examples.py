@@ -0,0 +1,19 @@
+"""example与lemma的关联"""
+from services.example_service import example_service
+from services.lemma_service import lemma_service
+
+
+def test_duplicate_and_case_variant_lemmas_are_linked_once():
+    lemma_service.create_lemma('linkwalk', topic='examples')
+    success, message, example_id = example_service.create_example(
+        "We walk every day.", ['linkwalk', 'LinkWalk', 'linkwalk', 'linkmissing'])
+    assert success, message
+    assert example_service.get_linked_lemmas(example_id) == [
+        {'lemma': 'linkmissing', 'is_valid': False},
+        {'lemma': 'linkwalk', 'is_valid': True}]
+
+    success, message = example_service.update_example(
+        example_id, lemmas=['linkmissing', ' LINKMISSING ', 'linkwalk'])
+    assert success, message
+    assert [link['lemma'] for link in example_service.get_linked_lemmas(example_id)] == [
+        'linkmissing', 'linkwalk']
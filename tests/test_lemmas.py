@@ -0,0 +1,42 @@
+"""lemma读取方法的返回类型"""
+import json
+from collections.abc import Mapping
+from database.models import LazyRow
+from services.lemma_service import lemma_service
+
+POS_MEANING = [{'pos': 'v.', 'meanings': ['跑']}]
+
+
+def test_reads_return_plain_dicts():
+    lemma_service.create_lemma('plaindict', pos_meaning=POS_MEANING, topic='types')
+    lemma = lemma_service.get_lemma('plaindict')
+    assert type(lemma) is dict
+    assert lemma['pos_meaning'] == POS_MEANING
+    assert json.loads(json.dumps(lemma))['pos_meaning'] == POS_MEANING
+    assert type(lemma_service.get_lemma_by_id(lemma['id'])) is dict
+    for lemmas in (lemma_service.get_all_lemmas(), lemma_service.search_lemmas('plaindict'),
+                   lemma_service.get_lemmas_by_topic('types')):
+        assert lemmas and all(type(item) is dict for item in lemmas)
+
+
+def test_listings_return_lazy_rows():
+    lemma_service.create_lemma('lazylisting', pos_meaning=POS_MEANING, topic='types')
+    items = lemma_service.get_lemma_page(topic='types', projection='detail')['items']
+    assert items and all(isinstance(item, LazyRow) for item in items)
+    item = next(item for item in items if item['lemma'] == 'lazylisting')
+    assert isinstance(item, Mapping)
+    assert item['pos_meaning'] == POS_MEANING
+    assert dict(item.to_dict())['pos_meaning'] == POS_MEANING
+
+
+def test_count_lemmas_by_topic_follows_topic_changes():
+    lemma_service.create_lemma('countedfirst', topic='counting')
+    lemma_service.create_lemma('countedsecond', topic='counting')
+    assert lemma_service.count_lemmas_by_topic('counting') == 2
+
+    lemma_service.update_lemma('countedsecond', topic='recounted')
+    assert lemma_service.count_lemmas_by_topic('counting') == 1
+    assert lemma_service.count_lemmas_by_topic('recounted') == 1
+
+    lemma_service.delete_lemma('countedfirst')
+    assert lemma_service.count_lemmas_by_topic('counting') == 0
@@ -0,0 +1,45 @@
+"""Record和LazyRow的复制与pickle"""
+import copy
+import pickle
+import pytest
+from database.models import LazyRow, LemmaRecord
+from utils.helpers import to_json
+
+
+def _record():
+    return LemmaRecord('id-1', 'run', None, None,
+                       to_json([{'pos': 'v.', 'meanings': ['跑']}]),
+                       to_json({'past': ['ran']}), None, None, 'sport', None, None)
+
+
+@pytest.mark.parametrize('clone', [copy.copy, copy.deepcopy,
+                                   lambda record: pickle.loads(pickle.dumps(record))])
+def test_record_clone_keeps_assigned_json_fields(clone):
+    record = _record()
+    record.pos_meaning = [{'pos': 'n.', 'meanings': ['跑步']}]
+    record['inflection'] = {'past': ['ran'], 'past_participle': ['run']}
+
+    cloned = clone(record)
+    assert cloned.pos_meaning == [{'pos': 'n.', 'meanings': ['跑步']}]
+    assert cloned.inflection == {'past': ['ran'], 'past_participle': ['run']}
+    assert cloned.derivation is None
+    assert cloned.to_dict() == record.to_dict()
+
+
+def test_record_clone_keeps_undecoded_json_fields():
+    cloned = pickle.loads(pickle.dumps(_record()))
+    assert cloned.pos_meaning == [{'pos': 'v.', 'meanings': ['跑']}]
+
+
+@pytest.mark.parametrize('clone', [lambda row: row.copy(), copy.copy,
+                                   lambda row: pickle.loads(pickle.dumps(row))])
+def test_lazy_row_clone_keeps_assigned_json_fields(clone):
+    row = LazyRow({'lemma': 'run', 'pos_meaning': to_json([{'pos': 'v.'}]),
+                   'inflection': to_json({'past': ['ran']})},
+                  json_columns=('pos_meaning', 'inflection'))
+    row['pos_meaning'] = [{'pos': 'n.'}]
+
+    cloned = clone(row)
+    assert cloned['pos_meaning'] == [{'pos': 'n.'}]
+    assert cloned['inflection'] == {'past': ['ran']}
+    assert cloned.to_dict() == row.to_dict()
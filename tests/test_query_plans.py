@@ -0,0 +1,20 @@
+"""查询计划回归检查（tools.check_query_plans）在生成的小语料上不应报告问题"""
+import config
+from database.profiler import query_profiler
+from services.cache import query_cache
+from tools import check_query_plans
+from tools.generate_corpus import CorpusGenerator
+
+
+def test_no_flagged_statements(monkeypatch, capsys):
+    # 工具会关闭读缓存和慢查询日志，测试结束后恢复
+    monkeypatch.setattr(query_cache, 'enabled', query_cache.enabled)
+    monkeypatch.setattr(query_profiler, 'slow_query_ms', query_profiler.slow_query_ms)
+    reports = CorpusGenerator(lemmas=2000, examples=5000, relations=3000, seed=7).generate()
+    assert all(report['imported'] for report in reports)
+
+    # 全局db已绑定测试数据库，直接在其上检查
+    result = check_query_plans.main(['--db', config.DB_PATH, '--in-place'])
+    output = capsys.readouterr().out
+    assert result == 0, output
+    assert '：0 条有问题' in output
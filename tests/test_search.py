@@ -0,0 +1,42 @@
+"""全文索引的行号在删除和VACUUM之后仍与lemmas/examples对应"""
+import sqlite3
+import config
+from services.example_service import example_service
+from services.lemma_service import lemma_service
+
+
+def _vacuum():
+    conn = sqlite3.connect(config.DB_PATH)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def test_rowid_is_an_explicit_primary_key():
+    conn = sqlite3.connect(config.DB_PATH)
+    try:
+        for table in ('lemmas', 'examples'):
+            columns = {row[1]: row[5] for row in conn.execute(f"PRAGMA table_info({table})")}
+            assert columns['seq'] == 1  # INTEGER PRIMARY KEY，即rowid的别名
+    finally:
+        conn.close()
+
+
+def test_search_survives_delete_and_vacuum():
+    words = [f"vacuum{chr(97 + i)}" for i in range(6)]
+    example_ids = {}
+    for word in words:
+        lemma_service.create_lemma(word, collocation=f"{word} collocation", topic='search')
+        example_ids[word] = example_service.create_example(f"The {word} example sentence.", [word])[2]
+    for word in words[::2]:
+        assert lemma_service.delete_lemma(word)[0]
+        assert example_service.delete_example(example_ids[word])[0]
+    _vacuum()
+
+    assert lemma_service.get_lemma('vacuumb')
+    assert 'seq' not in lemma_service.get_lemma('vacuumb')
+    for word in words[1::2]:
+        assert [lemma['lemma'] for lemma in lemma_service.search_lemmas(word)] == [word]
+        examples = example_service.search_examples(word)['items']
+        assert [example['example'] for example in examples] == [f"The {word} example sentence."]
@@ -0,0 +1,3 @@
+"""
+命令行工具（在项目根目录以 python -m tools.<name> 运行）
+"""
@@ -0,0 +1,108 @@
+"""
+备份命令行工具
+
+用法（在项目根目录运行）:
+    python -m tools.backup                      # 创建备份并只保留最近10个
+    python -m tools.backup --keep 30 --dir /mnt/backups
+    python -m tools.backup --list
+    python -m tools.backup --verify backups/dictionary_backup_20250101_120000.db
+    python -m tools.backup --incremental        # 写入增量备份库（backups/store）
+    python -m tools.backup --restore dictionary_backup_20250101_120000 --to restored.db
+
+使用SQLite在线备份API，应用运行期间也可以安全备份。
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+import config
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="在线备份数据库")
+    parser.add_argument('--dir', default=config.BACKUP_DIR, help=f"备份目录（默认{config.BACKUP_DIR}）")
+    parser.add_argument('--keep', type=int, default=config.BACKUP_KEEP,
+                        help=f"保留最近的备份数量，0表示不清理（默认{config.BACKUP_KEEP}）")
+    parser.add_argument('--db', help=f"数据库文件（默认{config.DB_PATH}）")
+    parser.add_argument('--list', action='store_true', help="列出已有备份")
+    parser.add_argument('--verify', metavar='FILE', help="校验备份文件的完整性")
+    parser.add_argument('--incremental', action='store_true', help="写入增量备份库，只保存变化的数据块")
+    parser.add_argument('--restore', metavar='SNAPSHOT', help="从增量备份库恢复快照（需配合--to）")
+    parser.add_argument('--to', metavar='FILE', help="恢复出的数据库文件")
+    parser.add_argument('--force', action='store_true', help="恢复时覆盖已存在的文件")
+    args = parser.parse_args(argv)
+
+    if args.restore and not args.to:
+        parser.error("--restore 需要指定 --to")
+    if args.db:
+        config.DB_PATH = os.path.abspath(args.db)
+    if not (args.list or args.verify or args.restore) and not os.path.isfile(config.DB_PATH):
+        print(f"[错误] 找不到数据库文件: {config.DB_PATH}", file=sys.stderr)
+        return 2
+
+    # 全局db在导入时按config.DB_PATH确定数据库文件（首次使用时才连接），因此在确定路径之后再导入
+    from services.backup_service import backup_service
+
+    if args.list:
+        backups = backup_service.list_backups(args.dir)
+        for backup in backups:
+            modified = datetime.fromtimestamp(backup['modified']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{backup['name']}  {backup['size'] / 1024 / 1024:.1f} MB  {modified}")
+        print(f"总备份数: {len(backups)}")
+
+        snapshots = backup_service.list_snapshots(args.dir)
+        if snapshots:
+            print()
+            for snapshot in snapshots:
+                modified = datetime.fromtimestamp(snapshot['modified']).strftime('%Y-%m-%d %H:%M:%S')
+                print(f"{snapshot['name']}  (增量)  {modified}")
+            usage = backup_service.store_usage(args.dir)
+            print(f"增量快照数: {usage['snapshots']}，数据块: {usage['chunks']}，"
+                  f"占用 {usage['bytes'] / 1024 / 1024:.1f} MB")
+        return 0
+
+    if args.restore:
+        success, message = backup_service.restore_snapshot(args.restore, args.to, args.dir, args.force)
+        if not success:
+            print(f"[错误] {message}", file=sys.stderr)
+            return 1
+        print(f"[成功] {message}")
+        return 0
+
+    if args.verify:
+        valid, message = backup_service.verify_backup(args.verify)
+        if not valid:
+            print(f"[错误] 校验失败: {message}", file=sys.stderr)
+            return 1
+        print(f"[成功] 校验通过: {args.verify}")
+        return 0
+
+    def progress(status, remaining, total):
+        print(f"\r[备份中] {total - remaining}/{total} 页", end='', file=sys.stderr, flush=True)
+
+    if args.incremental:
+        success, message, _ = backup_service.create_snapshot(args.dir, args.keep, progress)
+        print(file=sys.stderr)
+        if not success:
+            print(f"[错误] {message}", file=sys.stderr)
+            return 1
+        usage = backup_service.store_usage(args.dir)
+        print(f"[成功] {message}")
+        print(f"增量快照数: {usage['snapshots']}，备份库占用 {usage['bytes'] / 1024 / 1024:.1f} MB")
+        return 0
+
+    success, message, path = backup_service.create_backup(args.dir, args.keep, progress)
+    print(file=sys.stderr)
+    if not success:
+        print(f"[错误] {message}", file=sys.stderr)
+        return 1
+
+    print(f"[成功] {message}")
+    print(f"备份文件: {path}")
+    print(f"文件大小: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    print(f"总备份数: {len(backup_service.list_backups(args.dir))}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
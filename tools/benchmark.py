@@ -0,0 +1,363 @@
+"""
+服务层性能基准测试
+
+用法（在项目根目录运行）:
+    python -m tools.generate_corpus bench.db                    # 先生成测试语料
+    python -m tools.benchmark --db bench.db                     # 结果写入benchmarks/目录
+    python -m tools.benchmark --db bench.db --output base.json
+    python -m tools.benchmark --db bench.db --compare base.json # 与之前的结果对比，变慢时返回1
+
+对LemmaService、ExampleService、RelationService的每个公开方法计时。
+默认在数据库的临时副本上运行（写方法会修改数据），并关闭服务层读缓存，
+测量的是每次调用实际访问数据库的开销；--cache保留缓存。
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import config
+
+
+class BenchmarkCase:
+    """一个被计时的调用"""
+
+    def __init__(self, name: str, func: Callable, setup: Optional[Callable[[int], tuple]] = None):
+        self.name = name  # 'LemmaService.get_lemma'
+        self.func = func  # 计时部分，参数为setup(i)的返回值（没有setup时为第i次运行的序号）
+        self.setup = setup  # 不计时的准备工作，如为删除操作创建数据
+
+
+class BenchmarkSuite:
+    """在config.DB_PATH指向的数据库上运行基准测试"""
+
+    def __init__(self, repeat: int = 5, budget: float = 10.0, cache: bool = False):
+        self.repeat = max(1, repeat)
+        self.budget = budget  # 每项测试的时间预算（秒），超出后不再重复，至少运行一次
+        self.cache = cache
+
+        # 全局db在导入时按config.DB_PATH确定数据库文件（首次使用时才连接），因此在确定路径之后再导入
+        from services.lemma_service import lemma_service, LemmaService
+        from services.example_service import example_service, ExampleService
+        from services.relation_service import relation_service, RelationService
+        self.services = [(LemmaService, lemma_service), (ExampleService, example_service),
+                         (RelationService, relation_service)]
+
+    def run(self, progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """
+        运行全部测试
+
+        Returns:
+            {'created', 'db', 'corpus', 'environment', 'settings',
+             'results': {方法名: 计时结果}, 'errors': {方法名: 错误}, 'uncovered': [没有测试的公开方法]}
+        """
+        from services.cache import query_cache
+        query_cache.enabled = self.cache
+
+        sample = self.sample()
+        cases = self.cases(sample)
+        results, errors = {}, {}
+        for case in cases:
+            try:
+                results[case.name] = self._time(case)
+            except Exception as e:
+                errors[case.name] = f"{type(e).__name__}: {e}"
+            if progress:
+                progress(case.name, results.get(case.name) or {'error': errors[case.name]})
+
+        covered = {case.name for case in cases}
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'db': config.DB_PATH,
+            'corpus': self._corpus(),
+            'environment': {
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform()
+            },
+            'settings': {'repeat': self.repeat, 'budget': self.budget, 'cache': self.cache},
+            'results': results,
+            'errors': errors,
+            'uncovered': [name for name in self.public_methods() if name not in covered]
+        }
+
+    def public_methods(self) -> List[str]:
+        """三个服务类的全部公开方法"""
+        return [f"{cls.__name__}.{name}"
+                for cls, _ in self.services
+                for name, _ in inspect.getmembers(cls, inspect.isfunction)
+                if not name.startswith('_')]
+
+    def _time(self, case: BenchmarkCase) -> Dict:
+        """重复运行一项测试，返回耗时统计（毫秒）和每次调用执行的SQL条数"""
+        from database.profiler import query_profiler
+
+        samples, queries = [], 0
+        started = time.perf_counter()
+        for i in range(self.repeat):
+            args = case.setup(i) if case.setup else (i,)
+            with query_profiler.scope(f"benchmark:{case.name}") as scope:
+                begin = time.perf_counter()
+                result = case.func(*args)
+                samples.append(time.perf_counter() - begin)
+            queries = scope.query_count
+            # 写方法返回(False, 消息, ...)表示操作没有完成，计时没有意义
+            if isinstance(result, tuple) and result and result[0] is False:
+                raise RuntimeError(result[1])
+            if time.perf_counter() - started > self.budget:
+                break
+
+        return {
+            'median_ms': statistics.median(samples) * 1000,
+            'min_ms': min(samples) * 1000,
+            'max_ms': max(samples) * 1000,
+            'first_ms': samples[0] * 1000,
+            'runs': len(samples),
+            'queries': queries
+        }
+
+    def sample(self) -> Dict:
+        """从数据库中选出测试用的数据：最常用的lemma、典型lemma、topic、example和relation"""
+        from database.db_manager import db
+
+        def scalar(query, params=()):
+            rows = db.execute_query(query, params)
+            return rows[0][0] if rows else None
+
+        count = scalar("SELECT COUNT(*) FROM lemmas")
+        if not count:
+            raise RuntimeError("数据库中没有lemma，请先用tools.generate_corpus生成语料")
+        hot = db.execute_query("""
+            SELECT lemma1, specific_word1 FROM relations
+            GROUP BY lemma1, specific_word1 ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        typical = scalar("SELECT lemma FROM lemmas ORDER BY rowid LIMIT 1 OFFSET ?", (count // 2,))
+        return {
+            'hot_lemma': scalar("""SELECT lemma FROM example_lemma_links
+                                   GROUP BY lemma ORDER BY COUNT(*) DESC LIMIT 1""") or typical,
+            'lemma': typical,
+            'lemma_id': scalar("SELECT id FROM lemmas WHERE lemma = ?", (typical,)),
+            'keyword': typical.split('_')[0],
+            'topic': scalar("SELECT topic FROM topic_stats ORDER BY lemma_count DESC LIMIT 1"),
+            'network': (hot[0][0], hot[0][1]) if hot else (typical, typical.split('_')[0]),
+            'example_id': scalar("SELECT id FROM examples ORDER BY rowid LIMIT 1 OFFSET ?",
+                                 (scalar("SELECT COUNT(*) FROM examples") // 2,)),
+            'relation_id': scalar("SELECT id FROM relations ORDER BY id LIMIT 1 OFFSET ?",
+                                  (scalar("SELECT COUNT(*) FROM relations") // 2,)),
+            'example_word': scalar("""SELECT lemma FROM example_lemma_links
+                                      WHERE example_id = (SELECT id FROM examples LIMIT 1)""")
+        }
+
+    def cases(self, s: Dict) -> List[BenchmarkCase]:
+        """全部测试项（写操作使用带运行标记的数据，不与已有数据冲突）"""
+        (_, lemmas), (_, examples), (_, relations) = self.services
+        # lemma只能包含字母，运行标记用字母表示时间
+        tag = ''.join(chr(97 + int(digit)) for digit in datetime.now().strftime('%H%M%S'))
+
+        def new_lemma(i):
+            name = f"benchmark_{tag}_{chr(97 + i % 26)}{'x' * (i // 26)}"
+            lemmas.create_lemma(name, pos_meaning=[{'pos': 'n.', 'meanings': ['a test word']}])
+            return (name,)
+
+        def new_example(i):
+            return (examples.create_example(f"Benchmark example {tag} {i}.", [s['lemma']])[2],)
+
+        def new_relation(i):
+            return (relations.create_relation(s['lemma'], s['keyword'], s['hot_lemma'],
+                                              s['hot_lemma'].split('_')[0], config.RELATION_TYPES[0])[2],)
+
+        case = BenchmarkCase
+        return [
+            # LemmaService
+            case('LemmaService.get_lemma', lambda i: lemmas.get_lemma(s['lemma'])),
+            case('LemmaService.get_lemma_by_id', lambda i: lemmas.get_lemma_by_id(s['lemma_id'])),
+            case('LemmaService.get_all_lemmas', lambda i: lemmas.get_all_lemmas()),
+            case('LemmaService.search_lemmas', lambda i: lemmas.search_lemmas(s['keyword'])),
+            case('LemmaService.get_lemmas_by_topic', lambda i: lemmas.get_lemmas_by_topic(s['topic'])),
+            case('LemmaService.get_lemma_summaries', lambda i: lemmas.get_lemma_summaries()),
+            case('LemmaService.get_lemma_page', lambda i: lemmas.get_lemma_page(page_size=50)),
+            case('LemmaService.get_all_topics', lambda i: lemmas.get_all_topics()),
+            case('LemmaService.count_lemmas', lambda i: lemmas.count_lemmas()),
+            case('LemmaService.count_lemmas_by_topic', lambda i: lemmas.count_lemmas_by_topic(s['topic'])),
+            case('LemmaService.lemma_exists', lambda i: lemmas.lemma_exists(s['lemma'])),
+            case('LemmaService.lemmas_exist',
+                 lambda i: lemmas.lemmas_exist([s['lemma'], s['hot_lemma'], f"missing_{i}"])),
+            case('LemmaService.create_lemma', lambda name: lemmas.create_lemma(
+                     name, pos_meaning=[{'pos': 'v.', 'meanings': ['to test']}], topic=s['topic']),
+                 lambda i: (f"benchmark_{tag}_new_{chr(97 + i % 26)}{'x' * (i // 26)}",)),
+            case('LemmaService.update_lemma',
+                 lambda i: lemmas.update_lemma(s['lemma'], collocation=f"benchmark {i}")),
+            case('LemmaService.delete_lemma', lemmas.delete_lemma, new_lemma),
+            # ExampleService
+            case('ExampleService.create_example', lambda i: examples.create_example(
+                     f"A new benchmark sentence {tag} {i}.", [s['lemma'], s['hot_lemma'], 'missing'])),
+            case('ExampleService.get_example', lambda i: examples.get_example(s['example_id'])),
+            case('ExampleService.get_all_examples', lambda i: examples.get_all_examples()),
+            case('ExampleService.get_examples_by_lemma',
+                 lambda i: examples.get_examples_by_lemma(s['hot_lemma'])),
+            case('ExampleService.search_examples',
+                 lambda i: examples.search_examples(s['example_word'] or s['keyword'])),
+            case('ExampleService.get_linked_lemmas', lambda i: examples.get_linked_lemmas(s['example_id'])),
+            case('ExampleService.update_example', lambda example_id: examples.update_example(
+                     example_id, example="An edited benchmark sentence.", lemmas=[s['hot_lemma']]),
+                 new_example),
+            case('ExampleService.delete_example', examples.delete_example, new_example),
+            case('ExampleService.refresh_lemma_validity', lambda i: examples.refresh_lemma_validity()),
+            # RelationService
+            case('RelationService.create_relation', lambda i: relations.create_relation(
+                     s['lemma'], s['keyword'], s['hot_lemma'], s['hot_lemma'].split('_')[0],
+                     config.RELATION_TYPES[i % len(config.RELATION_TYPES)], f"benchmark {i}")),
+            case('RelationService.get_relation', lambda i: relations.get_relation(s['relation_id'])),
+            case('RelationService.get_all_relations', lambda i: relations.get_all_relations()),
+            case('RelationService.get_relations_by_lemma',
+                 lambda i: relations.get_relations_by_lemma(s['network'][0])),
+            case('RelationService.get_relation_network',
+                 lambda i: relations.get_relation_network(*s['network'])),
+            case('RelationService.count_relations', lambda i: relations.count_relations(s['network'][0])),
+            case('RelationService.update_relation',
+                 lambda i: relations.update_relation(s['relation_id'], note=f"benchmark {i}")),
+            case('RelationService.delete_relation', relations.delete_relation, new_relation),
+        ]
+
+    def _corpus(self) -> Dict:
+        """被测数据库的规模"""
+        from services.stats_service import stats_service
+
+        stats = stats_service.get_stats()
+        return {
+            'lemmas': stats['total_lemmas'],
+            'examples': stats['total_examples'],
+            'relations': stats['total_relations'],
+            'size_mb': round(os.path.getsize(config.DB_PATH) / 1024 / 1024, 1)
+        }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 1.25,
+                    min_delta_ms: float = 1.0) -> Tuple[List[Dict], List[Dict]]:
+    """
+    按中位数耗时对比两次结果
+
+    Args:
+        threshold: 变慢（或变快）超过该倍数才计入
+        min_delta_ms: 差值小于该毫秒数时视为噪声
+
+    Returns:
+        (变慢的项, 变快的项)，每项为{'name', 'before_ms', 'after_ms', 'ratio'}
+    """
+    regressions, improvements = [], []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        before_ms, after_ms = before['median_ms'], result['median_ms']
+        if abs(after_ms - before_ms) < min_delta_ms:
+            continue
+        item = {'name': name, 'before_ms': before_ms, 'after_ms': after_ms,
+                'ratio': after_ms / before_ms if before_ms else float('inf')}
+        if after_ms > before_ms * threshold:
+            regressions.append(item)
+        elif before_ms > after_ms * threshold:
+            improvements.append(item)
+    return regressions, improvements
+
+
+def copy_database(source: str, directory: str) -> str:
+    """用在线备份API复制数据库（源数据库可以正在被使用）"""
+    target = os.path.join(directory, os.path.basename(source))
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return target
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="服务层性能基准测试")
+    parser.add_argument('--db', required=True, help="被测数据库（可用tools.generate_corpus生成）")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测试的运行次数（默认5）")
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help="每项测试的时间预算（秒，默认10），超出后不再重复")
+    parser.add_argument('--cache', action='store_true', help="保留服务层读缓存")
+    parser.add_argument('--in-place', action='store_true', help="直接在数据库上运行（写测试会修改数据）")
+    parser.add_argument('--output', help=f"结果JSON文件（默认写入{config.BENCHMARK_DIR}）")
+    parser.add_argument('--compare', metavar='FILE', help="与之前的结果JSON对比")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="中位数变慢超过该倍数视为性能回退（默认1.25）")
+    args = parser.parse_args(argv)
+
+    source = os.path.abspath(args.db)
+    if not os.path.isfile(source):
+        print(f"[错误] 找不到数据库文件: {source}", file=sys.stderr)
+        return 2
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    # 每项的耗时都会单独报告，不再输出慢查询日志
+    from database.profiler import query_profiler
+    query_profiler.slow_query_ms = float('inf')
+
+    workdir = None
+    if args.in_place:
+        config.DB_PATH = source
+    else:
+        workdir = tempfile.mkdtemp(prefix='benchmark_')
+        config.DB_PATH = copy_database(source, workdir)
+
+    def progress(name, result):
+        if 'error' in result:
+            print(f"  {name:<42} [错误] {result['error']}")
+        else:
+            print(f"  {name:<42} {result['median_ms']:>10.2f} ms  "
+                  f"(min {result['min_ms']:.2f}, {result['runs']}次, {result['queries']}条SQL)")
+
+    try:
+        report = BenchmarkSuite(args.repeat, args.budget, args.cache).run(progress)
+    finally:
+        if workdir:
+            from database.db_manager import db
+            db.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+    report['db'] = source
+
+    output = args.output
+    if not output:
+        os.makedirs(config.BENCHMARK_DIR, exist_ok=True)
+        output = os.path.join(config.BENCHMARK_DIR,
+                              f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[完成] {len(report['results'])} 项，结果已写入 {output}")
+    for name in report['uncovered']:
+        print(f"[警告] 没有测试的公开方法: {name}")
+
+    failed = bool(report['errors'])
+    if baseline:
+        regressions, improvements = compare_results(baseline, report, args.threshold)
+        for item in improvements:
+            print(f"[变快] {item['name']}: {item['before_ms']:.2f} -> {item['after_ms']:.2f} ms "
+                  f"(x{item['ratio']:.2f})")
+        for item in regressions:
+            print(f"[回退] {item['name']}: {item['before_ms']:.2f} -> {item['after_ms']:.2f} ms "
+                  f"(x{item['ratio']:.2f})")
+        if regressions:
+            failed = True
+        else:
+            print(f"[成功] 与 {args.compare} 相比没有超过 {args.threshold} 倍的回退")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+查询计划检查工具
+
+用法（在项目根目录运行）:
+    python -m tools.check_query_plans --db bench.db          # 有问题时返回1
+    python -m tools.check_query_plans --db bench.db --verbose
+
+依次调用服务层的全部公开方法（与tools.benchmark相同的用例，外加列表/分页/导出的各个分支，
+关系图缓存开启和关闭各调用一遍，以及一次小批量导入），
+收集实际执行过的每条SQL及其参数，对每条SQL执行EXPLAIN QUERY PLAN：
+- 出现全表扫描（SCAN，FTS虚拟表除外）；
+- 或使用临时B树排序/分组/去重（USE TEMP B-TREE）
+且不在ALLOWLIST中时视为问题。应在有代表性数据量的数据库上运行
+（如tools.generate_corpus生成的语料），小表上SQLite可能选择不同的计划。
+"""
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import config
+
+
+# 有意的全表扫描/临时排序: (调用方法, 计划中的问题) -> 原因
+# 调用方法为"服务文件:方法名"，问题为"SCAN 表名"或"TEMP B-TREE FOR ..."
+ALLOWLIST = {
+    ('services/lemma_service.py:get_all_lemmas', 'SCAN l'): "按lemma顺序列出全部lemma（沿索引扫描）",
+    ('services/lemma_service.py:get_lemma_summaries', 'SCAN l'): "列出全部lemma摘要",
+    ('services/lemma_service.py:get_lemma_summaries', 'TEMP B-TREE FOR ORDER BY'):
+        "关键词搜索的结果按lemma排序，只排序匹配的行",
+    ('services/lemma_service.py:get_all_topics', 'SCAN lemmas'): "沿topic索引取不同的topic",
+    ('services/lemma_service.py:search_lemmas', 'TEMP B-TREE FOR ORDER BY'): "按bm25相关度排序，没有可用的索引",
+    ('services/lemma_service.py:_search_page', 'TEMP B-TREE FOR ORDER BY'): "按bm25相关度排序，没有可用的索引",
+    ('services/example_service.py:search_examples', 'TEMP B-TREE FOR ORDER BY'): "按bm25相关度排序，没有可用的索引",
+    ('services/example_service.py:get_all_examples', 'SCAN examples'): "列出全部example",
+    ('services/example_service.py:get_all_examples', 'SCAN example_lemma_links'): "一次取出全部关联",
+    ('services/example_service.py:get_examples_by_lemma', 'TEMP B-TREE FOR ORDER BY'):
+        "经关联表取出一个lemma的example后按created_at排序，created_at不在关联表上",
+    ('services/example_service.py:refresh_lemma_validity', 'SCAN example_lemma_links'):
+        "修复工具：重新检查所有链接",
+    ('services/relation_service.py:get_all_relations', 'SCAN relations'): "列出全部relation",
+    ('services/relation_service.py:_query_relation_network', 'TEMP B-TREE FOR GROUP BY'):
+        "递归遍历的中间结果按节点去重，行数受NETWORK_MAX_NODES限制",
+    ('services/relation_service.py:_query_relation_network', 'TEMP B-TREE FOR ORDER BY'):
+        "节点按跳数、边按created_at排序，行数受NETWORK_MAX_NODES/NETWORK_MAX_EDGES限制",
+    ('services/relation_service.py:get_all_relations', 'TEMP B-TREE FOR ORDER BY'):
+        "整表排序；沿created_at索引读取整表并不更快（50万行: 1.79s 对 1.68s）",
+    ('services/import_service.py:_write_chunk', 'SCAN sqlite_master'): "读取触发器定义，系统表只有几十行",
+    ('services/import_service.py:_write_chunk', 'TEMP B-TREE FOR count(DISTINCT)'):
+        "只对本块新增example的关联去重",
+    ('services/stats_service.py:get_stats', 'SCAN topic_stats'): "topic统计表很小（每个topic一行）",
+    ('services/stats_service.py:get_stats', 'SCAN corpus_stats'): "计数表只有几行",
+    ('services/stats_service.py:get_stats', 'TEMP B-TREE FOR ORDER BY'): "两个统计表合计只有几十行",
+    ('services/export_service.py:_iter_batches', 'TEMP B-TREE FOR ORDER BY'):
+        "按topic导出relations时两侧匹配的行需要按id合并",
+}
+
+_SCAN = re.compile(r"^\s*SCAN (\S+)")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_SUBQUERY = re.compile(r"^\s*(?:MATERIALIZE|CO-ROUTINE) (\S+)")
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+_INTERNAL = re.compile(r"'\w+'\.'\w+'")  # SQLite模块内部的语句使用带引号的"库名.表名"
+_ALIAS = r"\b(?:FROM|JOIN)\s+{}\s+(?:AS\s+)?(\w+)"
+
+
+def plan_issues(plan: List[str], limited: bool = False, sql: str = '') -> List[str]:
+    """
+    从EXPLAIN QUERY PLAN的detail列中找出全表扫描和临时B树
+
+    不算作问题的SCAN：FTS虚拟表、子查询（包括WITH定义的公用表）的中间结果，
+    以及语句带LIMIT时沿索引顺序的扫描（读到LIMIT行就停止，如分页的第一页）。
+
+    Args:
+        plan: explain()返回的计划
+        limited: 语句是否带LIMIT
+        sql: 语句原文，用于识别子查询的别名（计划中的SCAN显示别名）
+    """
+    subqueries = {match.group(1) for match in map(_SUBQUERY.match, plan) if match}
+    for name in list(subqueries):
+        subqueries.update(re.findall(_ALIAS.format(re.escape(name)), sql, re.IGNORECASE))
+    issues = []
+    for detail in plan:
+        scan = _SCAN.match(detail)
+        if scan and not ('VIRTUAL TABLE' in detail or scan.group(1) == 'CONSTANT'
+                         or scan.group(1) in subqueries
+                         or (limited and 'USING' in detail and 'INDEX' in detail)):
+            issues.append(f"SCAN {scan.group(1)}")
+        temp = _TEMP_BTREE.search(detail)
+        if temp:
+            issues.append(f"TEMP B-TREE FOR {temp.group(1)}")
+    return issues
+
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+    """返回语句的查询计划（detail列，按层级缩进）"""
+    if isinstance(params, list) and params and isinstance(params[0], (tuple, list)):
+        params = params[0]  # executemany: 取第一组参数
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params or ())).fetchall()
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node_id] + detail)
+    return plan
+
+
+def collect_statements() -> Dict[str, Tuple]:
+    """
+    调用服务层的各个方法，收集执行过的SQL
+
+    Returns:
+        {SQL: (参数, 调用位置)}
+    """
+    from database.profiler import query_profiler
+    from services.cache import query_cache
+    from tools.benchmark import BenchmarkSuite
+
+    query_cache.enabled = False  # 每次调用都要真正执行SQL
+    suite = BenchmarkSuite(repeat=1)
+    sample = suite.sample()
+    graph_cache = config.RELATION_GRAPH_CACHE
+    with query_profiler.scope('query-plan-check', capture=True) as scope, \
+            _trace_writes() as written:
+        try:
+            # 关闭关系图缓存时关系网络和关系计数改为查询数据库
+            for enabled in (True, False):
+                config.RELATION_GRAPH_CACHE = enabled
+                for case in suite.cases(sample):
+                    args = case.setup(0) if case.setup else (0,)
+                    case.func(*args)
+                for call in _extra_calls(sample):
+                    call()
+        finally:
+            config.RELATION_GRAPH_CACHE = graph_cache
+        _import_sample(sample)
+
+    statements = dict(scope.statements)
+    seen = {query_profiler.normalize(sql) for sql in statements}
+    for normalized, (sql, site) in written.items():
+        if normalized not in seen:
+            statements[sql] = ((), site)
+    return statements
+
+
+def check(conn: sqlite3.Connection, statements: Dict[str, Tuple],
+          allowlist: Dict = ALLOWLIST) -> List[Dict]:
+    """
+    检查每条语句的查询计划
+
+    Returns:
+        [{'site', 'sql', 'plan', 'issues', 'allowed'}]，issues中不在allowlist里的问题为未允许的问题
+    """
+    results = []
+    for sql, (params, site) in statements.items():
+        if sql.lstrip().upper().startswith(('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')):
+            continue
+        method = _method(site)
+        plan = explain(conn, sql, params)
+        issues = plan_issues(plan, limited=bool(_LIMIT.search(sql)), sql=sql)
+        results.append({
+            'site': site,
+            'sql': ' '.join(sql.split()),
+            'plan': plan,
+            'issues': [issue for issue in issues if (method, issue) not in allowlist],
+            'allowed': [issue for issue in issues if (method, issue) in allowlist]
+        })
+    return results
+
+
+def _extra_calls(s: Dict) -> List:
+    """基准测试用例没有覆盖到的参数分支"""
+    from services.lemma_service import lemma_service
+    from services.example_service import example_service
+    from services.relation_service import relation_service
+    from services.stats_service import stats_service
+    from services.export_service import export_service
+
+    calls = [
+        stats_service.get_stats,
+        lambda: example_service.search_examples(),
+        lambda: relation_service.get_relations_by_lemma(*s['network']),
+        lambda: lemma_service.get_lemma_summaries(topic=s['topic']),
+        lambda: lemma_service.get_lemma_summaries(keyword=s['keyword']),
+        lambda: lemma_service.get_lemma_summaries(sort_by='created_at'),
+        lambda: lemma_service.get_lemma_summaries(sort_by='topic', projection='detail'),
+    ]
+    # 列表分页的每种排序、过滤和搜索，包括第二页（带游标）
+    for kwargs in ({'sort_by': 'lemma'}, {'sort_by': 'created_at'}, {'sort_by': 'topic'},
+                   {'topic': s['topic']}, {'keyword': s['keyword']},
+                   {'keyword': s['keyword'], 'topic': s['topic']}):
+        def page(kwargs=kwargs):
+            first = lemma_service.get_lemma_page(page_size=5, **kwargs)
+            if first['next_cursor']:
+                lemma_service.get_lemma_page(page_size=5, cursor=first['next_cursor'], **kwargs)
+        calls.append(page)
+
+    def examples_page(query=None):
+        first = example_service.search_examples(query, limit=5)
+        if first['next_cursor']:
+            example_service.search_examples(query, cursor=first['next_cursor'], limit=5)
+    calls += [examples_page, lambda: examples_page(s['example_word'] or s['keyword'])]
+
+    # 导出：每种类型的第一批和第二批，以及各个过滤条件
+    for kind in export_service.KINDS:
+        for kwargs in ({}, {'topic': s['topic']}, {'updated_since': '2025-01-01'}):
+            def export(kind=kind, kwargs=kwargs):
+                items = getattr(export_service, f'iter_{kind}')(batch_size=5, **kwargs)
+                for _, _ in zip(range(6), items):
+                    pass
+            calls.append(export)
+    return calls
+
+
+@contextmanager
+def _trace_writes() -> Iterator[Dict[str, Tuple[str, str]]]:
+    """
+    记录写连接上执行的查询和写入语句
+
+    导入等在写任务中直接使用连接，这些语句不经过性能分析器。
+    SQLite交给回调的是代入参数后的SQL，按规范化后的SQL去重；
+    FTS5读写自身内部表的语句和不在服务层调用栈中的语句不记录。
+
+    Yields:
+        {规范化SQL: (SQL, 调用位置)}
+    """
+    from database.db_manager import db
+    from database.profiler import query_profiler
+
+    statements = {}
+
+    def trace(sql: str):
+        if (sql.lstrip()[:6].upper() not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+                or _INTERNAL.search(sql)):
+            return
+        site = _service_site()
+        if site is not None:
+            statements.setdefault(query_profiler.normalize(sql), (sql, site))
+
+    db.write(lambda conn: conn.set_trace_callback(trace))
+    try:
+        yield statements
+    finally:
+        db.write(lambda conn: conn.set_trace_callback(None))
+
+
+def _import_sample(s: Dict):
+    """每种类型导入一行，覆盖导入时补齐全文索引和统计的语句"""
+    from services.import_service import import_service
+
+    tag = ''.join(chr(97 + int(digit, 16) % 26) for digit in uuid.uuid4().hex[:8])
+    lemma = f"plancheck_{tag}"
+    import_service.import_lemmas([{'lemma': lemma, 'topic': s['topic'],
+                                   'pos_meaning': [{'pos': 'n.', 'meanings': ['a test word']}]}])
+    import_service.import_examples([{'example': f"Plan check example {tag}.",
+                                     'lemmas': [lemma, s['lemma']]}])
+    import_service.import_relations([{'lemma1': lemma, 'specific_word1': lemma,
+                                      'lemma2': s['lemma'], 'specific_word2': s['keyword'],
+                                      'relation_type': config.RELATION_TYPES[0]}])
+
+
+def _service_site() -> Optional[str]:
+    """调用栈中最近的服务层位置，格式同性能分析器的调用位置；不在服务层中时为None"""
+    services_dir = os.path.join(config.BASE_DIR, 'services') + os.sep
+    frame = sys._getframe(1)
+    while frame is not None and not frame.f_code.co_filename.startswith(services_dir):
+        frame = frame.f_back
+    if frame is None:
+        return None
+    filename = os.path.relpath(frame.f_code.co_filename, config.BASE_DIR).replace(os.sep, '/')
+    return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def _method(site: str) -> str:
+    """'services/lemma_service.py:120 get_lemma' -> 'services/lemma_service.py:get_lemma'"""
+    location, _, function = site.partition(' ')
+    return f"{location.rsplit(':', 1)[0]}:{function}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="检查服务层SQL的查询计划")
+    parser.add_argument('--db', required=True, help="有代表性数据量的数据库（可用tools.generate_corpus生成）")
+    parser.add_argument('--verbose', action='store_true', help="显示每条语句的查询计划")
+    parser.add_argument('--in-place', action='store_true', help="直接在数据库上运行（写方法会写入测试数据）")
+    args = parser.parse_args(argv)
+
+    source = os.path.abspath(args.db)
+    if not os.path.isfile(source):
+        print(f"[错误] 找不到数据库文件: {source}", file=sys.stderr)
+        return 2
+
+    workdir: Optional[str] = None
+    if args.in_place:
+        config.DB_PATH = source
+    else:
+        from tools.benchmark import copy_database
+        workdir = tempfile.mkdtemp(prefix='query_plans_')
+        config.DB_PATH = copy_database(source, workdir)
+
+    from database.profiler import query_profiler
+    query_profiler.slow_query_ms = float('inf')
+    try:
+        statements = collect_statements()
+        from database.db_manager import db
+        with db.connection() as conn:
+            results = check(conn, statements)
+    finally:
+        if workdir:
+            from database.db_manager import db
+            db.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    problems = [result for result in results if result['issues']]
+    for result in results:
+        if not (args.verbose or result['issues']):
+            continue
+        status = '[问题]' if result['issues'] else ('[允许]' if result['allowed'] else '[正常]')
+        print(f"{status} {result['site']}")
+        print(f"  {result['sql'][:200]}")
+        for line in result['plan']:
+            print(f"    {line}")
+        if result['issues']:
+            print(f"  -> {', '.join(result['issues'])}")
+
+    allowed = sum(1 for result in results if result['allowed'] and not result['issues'])
+    print(f"[完成] 检查了 {len(results)} 条语句：{len(problems)} 条有问题，{allowed} 条为允许的扫描")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+导出命令行工具
+
+用法（在项目根目录运行）:
+    python -m tools.export_data lemmas lemmas.jsonl
+    python -m tools.export_data examples examples.csv.gz --topic travel
+    python -m tools.export_data relations relations.jsonl --since 2025-01-01 --db data/other.db
+
+导出文件可以用 python -m tools.import_data 导回。
+"""
+import argparse
+import os
+import sys
+import config
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="将数据导出为CSV/JSONL文件")
+    parser.add_argument('kind', choices=['lemmas', 'examples', 'relations'], help="导出的数据类型")
+    parser.add_argument('path', help="输出文件，以.gz结尾时压缩")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], dest='file_format',
+                        help="文件格式，默认根据扩展名判断")
+    parser.add_argument('--topic', help="只导出该topic相关的数据")
+    parser.add_argument('--since', help="只导出该时间之后更新（lemma）或创建的数据，如2025-01-01")
+    parser.add_argument('--db', help=f"数据库文件（默认{config.DB_PATH}）")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        if not os.path.isfile(args.db):
+            print(f"[错误] 找不到数据库文件: {args.db}", file=sys.stderr)
+            return 2
+        config.DB_PATH = os.path.abspath(args.db)
+
+    # 全局db在导入时按config.DB_PATH确定数据库文件（首次使用时才连接），因此在确定路径之后再导入
+    from services.export_service import export_service
+
+    def progress(rows):
+        print(f"\r[导出中] 已写出 {rows} 行", end='', file=sys.stderr, flush=True)
+
+    try:
+        report = export_service.export_file(args.kind, args.path, args.file_format,
+                                            args.topic, args.since, progress)
+    except ValueError as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+
+    size = os.path.getsize(report['path']) / 1024 / 1024
+    print(f"[完成] {args.kind}: {report['rows']} 行 -> {report['path']}（{size:.1f} MB），"
+          f"耗时 {report['elapsed']:.1f} 秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+合成语料生成工具
+
+用法（在项目根目录运行）:
+    python -m tools.generate_corpus bench.db                     # 10万lemma、100万example、50万relation
+    python -m tools.generate_corpus small.db --lemmas 5000 --examples 20000 --relations 10000
+    python -m tools.generate_corpus bench.db --seed 7 --force     # 覆盖已存在的文件
+
+同样的参数和seed总是生成完全相同的数据（包括id和时间），便于不同版本之间对比性能。
+数据通过批量导入服务写入，与真实导入走同一条路径：
+- lemma的pos_meaning/inflection/derivation按界面录入的格式生成，topic分布不均匀；
+- example和relation按热度（类Zipf分布）选择lemma，少数常用词关联大量数据；
+- 约3%的example关联尚不存在的lemma（无效链接）。
+"""
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+import config
+
+
+class CorpusGenerator:
+    """确定性的合成语料生成器"""
+
+    ONSETS = ['b', 'bl', 'br', 'c', 'ch', 'cl', 'cr', 'd', 'dr', 'f', 'fl', 'fr', 'g', 'gl', 'gr',
+              'h', 'j', 'k', 'l', 'm', 'n', 'p', 'pl', 'pr', 'r', 's', 'sh', 'sk', 'sl', 'sp', 'st',
+              'str', 't', 'th', 'tr', 'v', 'w', 'wh', 'y', 'z', '']
+    VOWELS = ['a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'ee', 'oo', 'ou', 'ie', 'oa']
+    CODAS = ['', '', 'b', 'ck', 'd', 'ft', 'g', 'l', 'ld', 'll', 'm', 'n', 'nd', 'ng', 'nt', 'p',
+             'r', 'rd', 'rn', 'rt', 's', 'sh', 'st', 't', 'th', 'x']
+    PARTICLES = ['up', 'out', 'off', 'in', 'over', 'down', 'away', 'back']
+    # 词性及其出现权重
+    POS_WEIGHTS = [('n.', 40), ('v.', 25), ('adj.', 18), ('adv.', 8), ('prep.', 2), ('conj.', 1),
+                   ('pron.', 1), ('interj.', 1), ('aux.', 1), ('det.', 1)]
+    TOPIC_NAMES = ['daily life', 'business', 'travel', 'food', 'health', 'education', 'technology',
+                   'nature', 'emotion', 'law', 'sport', 'art', 'science', 'politics', 'family',
+                   'weather', 'finance', 'medicine', 'music', 'movement']
+    DEFINITION_TEMPLATES = ['to {w} something {a}', 'a {w} that is {a}', 'the act of {w}ing',
+                            'in a {a} way', 'having the quality of being {a}',
+                            'a person who {w}s', 'to become {a}', 'relating to {w}']
+    SENTENCE_TEMPLATES = ['The {0} was {a} when we {1}.', 'She decided to {0} before the {1} began.',
+                          'Can you {0} the {1} without a {w}?', 'Nobody expected the {0} to {1} so {a}.',
+                          'They always {0} after the {w}, even when it feels {a}.',
+                          'It is hard to {0} a {1} in such a {a} {w}.', '{0} and {1} go together.']
+
+    def __init__(self, lemmas: int = 100_000, examples: int = 1_000_000, relations: int = 500_000,
+                 seed: int = 42):
+        self.lemmas = lemmas
+        self.examples = examples
+        self.relations = relations
+        self.seed = seed
+        self._names: Optional[List[str]] = None
+        self._topics: Optional[List[str]] = None
+        self._epoch = datetime(2024, 1, 1)
+
+    def lemma_names(self) -> List[str]:
+        """所有lemma名（按生成顺序，结果只计算一次）"""
+        if self._names is None:
+            rnd = self._random('names')
+            names, seen = [], set()
+            while len(names) < self.lemmas:
+                name = self._word(rnd)
+                if rnd.random() < 0.05:
+                    name = f"{name}_{rnd.choice(self.PARTICLES)}"  # 短语动词
+                elif rnd.random() < 0.01:
+                    name = f"{name}'s"
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+            self._names = names
+        return self._names
+
+    def topics(self) -> List[str]:
+        """topic列表：基础主题加编号，数量随语料规模增长"""
+        if self._topics is None:
+            count = max(len(self.TOPIC_NAMES), self.lemmas // 500)
+            self._topics = [self.TOPIC_NAMES[i % len(self.TOPIC_NAMES)]
+                            + (f" {i // len(self.TOPIC_NAMES)}" if i >= len(self.TOPIC_NAMES) else '')
+                            for i in range(count)]
+        return self._topics
+
+    def iter_lemmas(self) -> Iterator[Dict]:
+        """逐个产生lemma行（导入格式）"""
+        rnd = self._random('lemmas')
+        topics = self.topics()
+        pos_options = [pos for pos, _ in self.POS_WEIGHTS]
+        pos_weights = [weight for _, weight in self.POS_WEIGHTS]
+        for i, name in enumerate(self.lemma_names()):
+            stem = name.split('_')[0]
+            stem = stem[:-2] if stem.endswith("'s") else stem
+            parts = rnd.choices(pos_options, pos_weights, k=rnd.choices([1, 2, 3], [70, 25, 5])[0])
+            pos_meaning = [{'pos': pos,
+                            'meanings': [self._definition(rnd) for _ in range(rnd.randint(1, 3))]}
+                           for pos in dict.fromkeys(parts)]
+            created = self._timestamp(i, self.lemmas)
+            yield {
+                'id': self._uuid(rnd),
+                'lemma': name,
+                'pronunciation_british': f"/{stem}/" if rnd.random() < 0.8 else None,
+                'spell_nuance': f"also spelt {stem}{rnd.choice(self.CODAS) or 'e'}" if rnd.random() < 0.05 else None,
+                'pos_meaning': pos_meaning,
+                'inflection': self._inflection(stem, pos_meaning, rnd),
+                'derivation': [{'word': stem + suffix, 'meaning': self._definition(rnd)}
+                               for suffix in rnd.sample(['er', 'ness', 'ly', 'ment', 'able', 'ful'],
+                                                        rnd.choices([0, 1, 2, 3], [40, 35, 20, 5])[0])],
+                'collocation': ', '.join(f"{name.replace('_', ' ')} {self._word(rnd)}"
+                                         for _ in range(rnd.randint(0, 3))) or None,
+                # 前几个topic占大头，约15%的lemma没有topic
+                'topic': None if rnd.random() < 0.15 else topics[self._hot_index(rnd, len(topics))],
+                'created_at': created,
+                'updated_at': created
+            }
+
+    def iter_examples(self) -> Iterator[Dict]:
+        """逐个产生example行（导入格式），约3%关联不存在的lemma"""
+        rnd = self._random('examples')
+        names = self.lemma_names()
+        for i in range(self.examples):
+            count = rnd.choices([1, 2, 3, 4], [30, 45, 20, 5])[0]
+            linked = list(dict.fromkeys(names[self._hot_index(rnd, len(names))] for _ in range(count)))
+            if rnd.random() < 0.03:
+                linked.append(f"{self._word(rnd)}{self._word(rnd)}")
+            words = [name.replace('_', ' ') for name in linked] + [self._word(rnd)]
+            template = rnd.choice(self.SENTENCE_TEMPLATES)
+            sentence = template.format(words[0], words[1 % len(words)], w=self._word(rnd),
+                                       a=self._word(rnd))
+            if len(words) > 2:
+                sentence += f" ({', '.join(words[2:-1] or words[-1:])})"
+            yield {
+                'id': self._uuid(rnd),
+                'example': sentence[0].upper() + sentence[1:],
+                'lemmas': linked,
+                'created_at': self._timestamp(i, self.examples)
+            }
+
+    def iter_relations(self) -> Iterator[Dict]:
+        """逐个产生relation行（导入格式），关系多出现在同一批相邻的常用词之间"""
+        rnd = self._random('relations')
+        names = self.lemma_names()
+        if len(names) < 2:
+            return
+        for i in range(self.relations):
+            first = self._hot_index(rnd, len(names))
+            second = (first + rnd.randint(1, min(50, len(names) - 1))) % len(names)  # 近义词群：热门词附近的词
+            lemma1, lemma2 = names[first], names[second]
+            yield {
+                'lemma1': lemma1,
+                'specific_word1': self._specific_word(lemma1, rnd),
+                'lemma2': lemma2,
+                'specific_word2': self._specific_word(lemma2, rnd),
+                'relation_type': rnd.choice(config.RELATION_TYPES),
+                'note': f"in {self._word(rnd)} contexts" if rnd.random() < 0.3 else None,
+                'created_at': self._timestamp(i, self.relations)
+            }
+
+    def generate(self, chunk_size: int = config.IMPORT_CHUNK_SIZE,
+                 progress: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        通过批量导入服务把语料写入config.DB_PATH
+
+        Returns:
+            lemmas、examples、relations三次导入的报告
+        """
+        from services.import_service import import_service
+
+        return [
+            import_service.import_rows('lemmas', self.iter_lemmas(), chunk_size, progress),
+            import_service.import_rows('examples', self.iter_examples(), chunk_size, progress),
+            import_service.import_rows('relations', self.iter_relations(), chunk_size, progress)
+        ]
+
+    def _random(self, stream: str) -> random.Random:
+        """每类数据使用独立的随机序列，改变一类数据的数量不影响其他类"""
+        return random.Random(f"{self.seed}:{stream}")
+
+    def _word(self, rnd: random.Random) -> str:
+        return ''.join(rnd.choice(self.ONSETS) + rnd.choice(self.VOWELS) + rnd.choice(self.CODAS)
+                       for _ in range(rnd.choices([1, 2, 3], [45, 45, 10])[0]))
+
+    def _definition(self, rnd: random.Random) -> str:
+        return rnd.choice(self.DEFINITION_TEMPLATES).format(w=self._word(rnd), a=self._word(rnd))
+
+    def _inflection(self, stem: str, pos_meaning: List[Dict], rnd: random.Random) -> Optional[Dict]:
+        """按词性生成变形，格式同界面录入（词性名: [形式, ...]）"""
+        inflection = {}
+        for item in pos_meaning:
+            if item['pos'] == 'v.':
+                past = stem + ('d' if stem.endswith('e') else 'ed')
+                inflection['verb'] = [past, past] if rnd.random() < 0.9 else [stem + 'ought', stem + 'en']
+            elif item['pos'] == 'n.' and rnd.random() < 0.7:
+                inflection['noun'] = [stem + ('es' if stem.endswith(('s', 'sh', 'ch', 'x')) else 's')]
+            elif item['pos'] == 'adj.' and rnd.random() < 0.5:
+                inflection['adjective'] = [stem + 'er', stem + 'est']
+        return inflection or None
+
+    def _specific_word(self, lemma: str, rnd: random.Random) -> str:
+        """specific word只能是单个词：短语取第一个词，偶尔使用变形"""
+        word = lemma.split('_')[0].replace("'", '') or 'word'
+        return word + rnd.choice(['s', 'ed', 'ing']) if rnd.random() < 0.2 else word
+
+    def _hot_index(self, rnd: random.Random, size: int) -> int:
+        """类Zipf分布的下标：靠前的元素被选中的概率高得多"""
+        return min(size - 1, int(size * rnd.random() ** 3))
+
+    def _uuid(self, rnd: random.Random) -> str:
+        return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+    def _timestamp(self, index: int, total: int) -> str:
+        """在两年内均匀分布的创建时间"""
+        seconds = int(index * (2 * 365 * 24 * 3600) / max(1, total))
+        return (self._epoch + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="生成用于性能测试的合成语料数据库")
+    parser.add_argument('path', help="生成的数据库文件")
+    parser.add_argument('--lemmas', type=int, default=100_000, help="lemma数量（默认100000）")
+    parser.add_argument('--examples', type=int, default=1_000_000, help="example数量（默认1000000）")
+    parser.add_argument('--relations', type=int, default=500_000, help="relation数量（默认500000）")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子（默认42）")
+    parser.add_argument('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE,
+                        help=f"每个事务写入的行数（默认{config.IMPORT_CHUNK_SIZE}）")
+    parser.add_argument('--force', action='store_true', help="覆盖已存在的文件")
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.path)
+    if os.path.exists(path):
+        if not args.force:
+            print(f"[错误] 文件已存在: {path}（使用--force覆盖）", file=sys.stderr)
+            return 2
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    config.DB_PATH = path
+
+    generator = CorpusGenerator(args.lemmas, args.examples, args.relations, args.seed)
+
+    def progress(report):
+        print(f"\r[生成中] {report['kind']}: 已写入 {report['imported']} 行", end='',
+              file=sys.stderr, flush=True)
+
+    # 全局db在导入时按config.DB_PATH确定数据库文件（首次使用时才连接），因此在确定路径之后再生成
+    reports = generator.generate(args.chunk_size, progress)
+    print(file=sys.stderr)
+
+    failed = 0
+    for report in reports:
+        failed += report['failed']
+        print(f"[完成] {report['kind']}: {report['imported']} 行，耗时 {report['elapsed']:.1f} 秒")
+        for error in report['errors'][:5]:
+            print(f"  第{error['line']}行: {error['error']}")
+    print(f"[完成] {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
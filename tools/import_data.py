@@ -0,0 +1,63 @@
+"""
+批量导入命令行工具
+
+用法（在项目根目录运行）:
+    python -m tools.import_data lemmas lemmas.jsonl
+    python -m tools.import_data examples examples.csv --chunk-size 10000
+    python -m tools.import_data relations relations.jsonl.gz --db data/other.db
+
+建议按 lemmas -> examples -> relations 的顺序导入，
+这样example的关联有效性和relation的lemma检查都能基于已导入的lemma。
+"""
+import argparse
+import os
+import sys
+import config
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="从CSV/JSONL文件批量导入数据")
+    parser.add_argument('kind', choices=['lemmas', 'examples', 'relations'], help="导入的数据类型")
+    parser.add_argument('path', help="CSV或JSONL文件（可以是.gz压缩文件）")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], dest='file_format',
+                        help="文件格式，默认根据扩展名判断")
+    parser.add_argument('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE,
+                        help=f"每个事务写入的行数（默认{config.IMPORT_CHUNK_SIZE}）")
+    parser.add_argument('--db', help=f"数据库文件（默认{config.DB_PATH}）")
+    parser.add_argument('--show-errors', type=int, default=20, help="最多显示的错误行数")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.path):
+        print(f"[错误] 找不到文件: {args.path}", file=sys.stderr)
+        return 2
+    if args.db:
+        config.DB_PATH = os.path.abspath(args.db)
+
+    # 全局db在导入时按config.DB_PATH确定数据库文件（首次使用时才连接），因此在确定路径之后再导入
+    from services.import_service import import_service
+
+    def progress(report):
+        print(f"\r[导入中] 已处理 {report['total']} 行，成功 {report['imported']}，"
+              f"失败 {report['failed']}", end='', file=sys.stderr, flush=True)
+
+    try:
+        report = import_service.import_file(args.kind, args.path, args.file_format,
+                                            args.chunk_size, progress)
+    except ValueError as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+
+    rate = report['total'] / report['elapsed'] if report['elapsed'] else 0
+    print(f"[完成] {args.kind}: 成功 {report['imported']} 行，失败 {report['failed']} 行，"
+          f"耗时 {report['elapsed']:.1f} 秒（{rate:.0f} 行/秒）")
+    for error in report['errors'][:args.show_errors]:
+        print(f"  第{error['line']}行: {error['error']}")
+    if report['failed'] > args.show_errors:
+        print(f"  ……其余 {report['failed'] - args.show_errors} 条错误未显示")
+
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
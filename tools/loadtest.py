@@ -0,0 +1,401 @@
+"""
+多会话并发负载测试
+
+用法（在项目根目录运行）:
+    python -m tools.loadtest --db bench.db                          # 8个会话（线程）运行30秒
+    python -m tools.loadtest --db bench.db --sessions 32 --duration 60 --think 200
+    python -m tools.loadtest --db bench.db --processes              # 每个会话一个进程
+    python -m tools.loadtest --db bench.db --mix browse=50,search=30,create_example=20
+
+模拟多人同时使用应用：每个会话按比例随机执行浏览、搜索、查看详情、创建和更新操作
+（每个操作对应界面上一次交互所调用的服务方法），统计每种操作的延迟分位数、
+吞吐量、等待连接池/写队列的时间以及"database is locked"错误数。
+
+线程模式下所有会话共享一个进程（同一个Streamlit服务进程中的多个用户），
+共用连接池和读缓存；--processes时每个会话是独立进程（多个应用实例访问同一个数据库）。
+默认在数据库的临时副本上运行。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+# 默认操作比例：读多写少
+DEFAULT_MIX = {
+    'browse': 30,
+    'search': 20,
+    'view': 25,
+    'create_example': 10,
+    'create_lemma': 5,
+    'create_relation': 4,
+    'update_lemma': 3,
+    'update_example': 3,
+}
+
+
+class LoadSession:
+    """一个模拟用户：每个方法对应一次界面交互调用的服务方法"""
+
+    def __init__(self, index: int, sample: Dict, seed: int):
+        from services.lemma_service import lemma_service
+        from services.example_service import example_service
+        from services.relation_service import relation_service
+        from services.stats_service import stats_service
+        self.lemmas = lemma_service
+        self.examples = example_service
+        self.relations = relation_service
+        self.stats = stats_service
+
+        self.sample = sample
+        self.rnd = random.Random(f"{seed}:{index}")
+        self.tag = f"{sample['tag']}_{_letters(index)}"  # lemma只能包含字母
+        self.counter = 0
+
+    def browse(self):
+        """侧边栏统计 + 浏览列表（偶尔翻页）+ 展开一个lemma"""
+        self.stats.get_stats()
+        page = self.lemmas.get_lemma_page(sort_by=self.rnd.choice(['lemma', 'created_at', 'topic']),
+                                          page_size=config.DEFAULT_PAGE_SIZE)
+        if page['next_cursor'] and self.rnd.random() < 0.3:
+            page = self.lemmas.get_lemma_page(cursor=page['next_cursor'],
+                                              page_size=config.DEFAULT_PAGE_SIZE)
+        if page['items']:
+            self.lemmas.get_lemma(self.rnd.choice(page['items'])['lemma'])
+
+    def search(self):
+        """搜索lemma和例句"""
+        keyword = self._lemma().split('_')[0][:self.rnd.randint(3, 6)]
+        self.lemmas.get_lemma_page(keyword=keyword, page_size=config.DEFAULT_PAGE_SIZE)
+        self.examples.search_examples(keyword)
+
+    def view(self):
+        """查看lemma详情：例句、关系和关系网络"""
+        lemma, word = self.rnd.choice(self.sample['network'])
+        self.lemmas.get_lemma(lemma)
+        self.examples.get_examples_by_lemma(lemma)
+        self.relations.get_relations_by_lemma(lemma)
+        self.relations.get_relation_network(lemma, word)
+
+    def create_example(self):
+        lemmas = [self._lemma() for _ in range(self.rnd.randint(1, 3))]
+        return self.examples.create_example(
+            f"Load test sentence {self.tag} {self._next()} with {' '.join(lemmas)}.", lemmas)
+
+    def create_lemma(self):
+        return self.lemmas.create_lemma(
+            f"load_{self.tag}_{_letters(self._next())}",
+            pos_meaning=[{'pos': 'n.', 'meanings': ['a load test word']}],
+            topic=self.rnd.choice(self.sample['topics'] or [None]))
+
+    def create_relation(self):
+        lemma1, lemma2 = self._lemma(), self._lemma()
+        return self.relations.create_relation(lemma1, _word(lemma1), lemma2, _word(lemma2),
+                                              self.rnd.choice(config.RELATION_TYPES))
+
+    def update_lemma(self):
+        return self.lemmas.update_lemma(self._lemma(), collocation=f"load test {self._next()}")
+
+    def update_example(self):
+        return self.examples.update_example(self.rnd.choice(self.sample['examples']),
+                                            lemmas=[self._lemma() for _ in range(2)])
+
+    def _lemma(self) -> str:
+        """按热度选择lemma：靠前的lemma被选中的概率高"""
+        names = self.sample['lemmas']
+        return names[min(len(names) - 1, int(len(names) * self.rnd.random() ** 3))]
+
+    def _next(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def run_load(sample: Dict, sessions: int = 8, duration: float = 30.0,
+             mix: Optional[Dict[str, int]] = None, think_ms: float = 0.0, seed: int = 42,
+             processes: bool = False, cache: bool = True) -> Dict:
+    """
+    在config.DB_PATH上运行负载测试
+
+    Args:
+        sample: load_sample()返回的测试数据
+        sessions: 并发会话数
+        duration: 运行时长（秒）
+        mix: 操作名 -> 权重，默认DEFAULT_MIX
+        think_ms: 两次操作之间的平均思考时间（毫秒，指数分布），0表示连续操作
+        processes: 每个会话使用独立进程而不是线程
+        cache: 是否使用服务层读缓存
+
+    Returns:
+        负载测试报告，见_report
+    """
+    mix = mix or DEFAULT_MIX
+    unknown = [name for name in mix if not hasattr(LoadSession, name) or name.startswith('_')]
+    if unknown:
+        raise ValueError(f"未知的操作: {', '.join(unknown)}")
+    settings = {'sessions': sessions, 'duration': duration, 'mix': mix, 'think_ms': think_ms,
+                'seed': seed, 'processes': processes, 'cache': cache}
+
+    started = time.perf_counter()
+    if processes:
+        samples = _run_processes(sample, settings)
+    else:
+        samples = _run_threads(sample, settings)
+    return _report(samples, settings, time.perf_counter() - started)
+
+
+def load_sample(db_path: str, limit: int = 20000) -> Dict:
+    """读取测试用的lemma、example、topic和关系网络起点（直接连接，不经过服务层）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        lemmas = [row[0] for row in conn.execute("SELECT lemma FROM lemmas ORDER BY rowid LIMIT ?", (limit,))]
+        if not lemmas:
+            raise ValueError("数据库中没有lemma，请先用tools.generate_corpus生成语料")
+        network = [tuple(row) for row in conn.execute("""
+            SELECT lemma1, specific_word1 FROM relations
+            GROUP BY lemma1, specific_word1 ORDER BY COUNT(*) DESC LIMIT 200
+        """)] or [(lemma, _word(lemma)) for lemma in lemmas[:200]]
+        return {
+            'lemmas': lemmas,
+            'examples': [row[0] for row in conn.execute(
+                "SELECT id FROM examples ORDER BY rowid DESC LIMIT ?", (limit // 10,))] or [''],
+            'topics': [row[0] for row in conn.execute("SELECT topic FROM topic_stats LIMIT 100")],
+            'network': network,
+            'tag': ''.join(chr(97 + int(digit)) for digit in datetime.now().strftime('%H%M%S'))
+        }
+    finally:
+        conn.close()
+
+
+def _run_session(index: int, sample: Dict, settings: Dict,
+                 barrier) -> List[Tuple[str, float, float, Optional[str]]]:
+    """运行一个会话直到时间结束，返回[(操作, 耗时, 锁等待, 错误)]"""
+    from database.profiler import query_profiler
+    from services.cache import query_cache
+    query_cache.enabled = settings['cache']
+
+    session = LoadSession(index, sample, settings['seed'])
+    names = list(settings['mix'])
+    weights = [settings['mix'][name] for name in names]
+    think = settings['think_ms'] / 1000
+    samples = []
+
+    barrier.wait()
+    deadline = time.perf_counter() + settings['duration']
+    while time.perf_counter() < deadline:
+        name = session.rnd.choices(names, weights)[0]
+        error = None
+        with query_profiler.scope(f"loadtest:{name}") as scope:
+            begin = time.perf_counter()
+            try:
+                result = getattr(session, name)()
+                # 写方法失败时返回(False, 消息, ...)
+                if isinstance(result, tuple) and result and result[0] is False:
+                    error = str(result[1])
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - begin
+        samples.append((name, elapsed, scope.lock_wait, error))
+        if think:
+            time.sleep(session.rnd.expovariate(1 / think))
+    return samples
+
+
+def _run_threads(sample: Dict, settings: Dict) -> List[Tuple]:
+    """所有会话在当前进程中以线程运行"""
+    from database.profiler import query_profiler
+    query_profiler.enabled = True
+    query_profiler.slow_query_ms = float('inf')
+
+    barrier = threading.Barrier(settings['sessions'])
+    results: List[List[Tuple]] = [[] for _ in range(settings['sessions'])]
+
+    def worker(index):
+        results[index] = _run_session(index, sample, settings, barrier)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True)
+               for index in range(settings['sessions'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [item for result in results for item in result]
+
+
+def _run_processes(sample: Dict, settings: Dict) -> List[Tuple]:
+    """每个会话一个进程（各自的连接池和读缓存）"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(settings['sessions'])
+    queue = context.Queue()
+    workers = [context.Process(target=_process_main,
+                               args=(config.DB_PATH, index, sample, settings, barrier, queue))
+               for index in range(settings['sessions'])]
+    for worker in workers:
+        worker.start()
+    samples = []
+    for _ in workers:
+        samples.extend(queue.get())
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def _process_main(db_path: str, index: int, sample: Dict, settings: Dict, barrier, queue):
+    """子进程入口：设置数据库路径后运行一个会话"""
+    config.DB_PATH = db_path
+    samples = []
+    try:
+        from database.profiler import query_profiler
+        query_profiler.enabled = True
+        query_profiler.slow_query_ms = float('inf')
+        samples = _run_session(index, sample, settings, barrier)
+    finally:
+        queue.put(samples)
+
+
+def _report(samples: List[Tuple], settings: Dict, elapsed: float) -> Dict:
+    """汇总每种操作的延迟分位数、吞吐量、锁等待和错误"""
+    duration = settings['duration']
+
+    def summarize(items):
+        latencies = sorted(item[1] for item in items)
+        waits = sorted(item[2] for item in items)
+        errors = [item[3] for item in items if item[3]]
+        return {
+            'count': len(items),
+            'errors': len(errors),
+            'locked': sum(1 for error in errors if 'locked' in error or 'busy' in error),
+            'throughput': len(items) / duration,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p95_ms': _percentile(latencies, 95) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'lock_wait_total_ms': sum(waits) * 1000,
+            'lock_wait_mean_ms': sum(waits) / len(waits) * 1000,
+            'lock_wait_p95_ms': _percentile(waits, 95) * 1000,
+            'lock_wait_p99_ms': _percentile(waits, 99) * 1000
+        }
+
+    by_operation: Dict[str, List[Tuple]] = {}
+    errors: Dict[str, int] = {}
+    for item in samples:
+        by_operation.setdefault(item[0], []).append(item)
+        if item[3]:
+            errors[item[3]] = errors.get(item[3], 0) + 1
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'db': config.DB_PATH,
+        'settings': settings,
+        'elapsed': elapsed,
+        'operations': {name: summarize(items) for name, items in sorted(by_operation.items())},
+        'overall': summarize(samples) if samples else {},
+        'errors': dict(sorted(errors.items(), key=lambda item: -item[1])[:20])
+    }
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """已排序列表的百分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    rank = max(1, int(round(percent / 100 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+def _letters(number: int) -> str:
+    """把数字写成字母（lemma不能包含数字）"""
+    return ''.join(chr(97 + int(digit)) for digit in str(number))
+
+
+def _word(lemma: str) -> str:
+    """lemma对应的specific word：短语取第一个词"""
+    return lemma.split('_')[0].replace("'", '') or 'word'
+
+
+def _parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = int(weight) if weight else 1
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="多会话并发负载测试")
+    parser.add_argument('--db', required=True, help="被测数据库（可用tools.generate_corpus生成）")
+    parser.add_argument('--sessions', type=int, default=8, help="并发会话数（默认8）")
+    parser.add_argument('--duration', type=float, default=30.0, help="运行时长（秒，默认30）")
+    parser.add_argument('--mix', help="操作比例，如 browse=50,search=30,create_example=20"
+                                      f"（可用操作: {', '.join(DEFAULT_MIX)}）")
+    parser.add_argument('--think', type=float, default=0.0,
+                        help="两次操作之间的平均思考时间（毫秒，默认0即连续操作）")
+    parser.add_argument('--processes', action='store_true', help="每个会话使用独立进程")
+    parser.add_argument('--no-cache', action='store_true', help="关闭服务层读缓存")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子（默认42）")
+    parser.add_argument('--in-place', action='store_true', help="直接在数据库上运行（会写入测试数据）")
+    parser.add_argument('--output', help="把报告写入JSON文件")
+    args = parser.parse_args(argv)
+
+    source = os.path.abspath(args.db)
+    if not os.path.isfile(source):
+        print(f"[错误] 找不到数据库文件: {source}", file=sys.stderr)
+        return 2
+
+    workdir = None
+    if args.in_place:
+        config.DB_PATH = source
+    else:
+        from tools.benchmark import copy_database
+        workdir = tempfile.mkdtemp(prefix='loadtest_')
+        config.DB_PATH = copy_database(source, workdir)
+
+    try:
+        mix = _parse_mix(args.mix) if args.mix else None
+        print(f"[运行中] {args.sessions}个会话（{'进程' if args.processes else '线程'}），"
+              f"{args.duration:.0f}秒 ...", file=sys.stderr)
+        report = run_load(load_sample(config.DB_PATH), args.sessions, args.duration, mix,
+                          args.think, args.seed, args.processes, not args.no_cache)
+    except ValueError as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return 2
+    finally:
+        if workdir:
+            if 'database.db_manager' in sys.modules:
+                sys.modules['database.db_manager'].db.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+    report['db'] = source
+
+    header = (f"{'操作':<16}{'次数':>8}{'错误':>6}{'锁错误':>6}{'次/秒':>9}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'锁等待p95':>11}{'锁等待p99':>11}")
+    print(header)
+    rows = list(report['operations'].items())
+    if report['overall']:
+        rows.append(('总计', report['overall']))
+    for name, stats in rows:
+        print(f"{name:<16}{stats['count']:>8}{stats['errors']:>6}{stats['locked']:>6}"
+              f"{stats['throughput']:>9.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+              f"{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+              f"{stats['lock_wait_p95_ms']:>11.1f}{stats['lock_wait_p99_ms']:>11.1f}")
+    print("（耗时单位: 毫秒）")
+    for error, count in list(report['errors'].items())[:5]:
+        print(f"[错误] {count}次: {error}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[完成] 报告已写入 {args.output}")
+    return 1 if report['overall'].get('errors') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,7 @@
 import streamlit as st
 from services.example_service import example_service
 from services.lemma_service import lemma_service
+import config
 
 
 def render():
@@ -30,11 +31,12 @@ def render():
             
             st.write("**Lemma Validation:**")
             cols = st.columns(min(len(lemmas_list), 4))
+            exists = lemma_service.lemmas_exist(lemmas_list)
             
             for i, lemma in enumerate(lemmas_list):
                 col_idx = i % 4
                 with cols[col_idx]:
-                    if lemma_service.lemma_exists(lemma):
+                    if exists[lemma]:
                         st.success(f"✅ {lemma}")
                     else:
                         st.warning(f"⚠️ {lemma} (not found)")
@@ -81,22 +83,39 @@ def render():
     st.markdown("---")
     st.markdown("### 📋 All Examples")
     
-    examples = example_service.get_all_examples()
-    
-    if not examples:
-        st.info("No examples added yet")
-        return
-    
     # 搜索框
     search = st.text_input("🔎 Search examples", placeholder="Type to search...")
     
-    # 过滤examples
-    if search:
-        filtered_examples = [e for e in examples if search.lower() in e['example'].lower()]
-    else:
-        filtered_examples = examples
+    # 分页状态：保存每一页的起始游标，搜索词变化时回到第一页
+    if st.session_state.get('examples_view') != search:
+        st.session_state.examples_view = search
+        st.session_state.examples_cursors = [None]
+    cursors = st.session_state.examples_cursors
+    
+    # 服务端搜索和分页
+    page = example_service.search_examples(search or None, cursor=cursors[-1],
+                                           limit=config.DEFAULT_PAGE_SIZE)
+    filtered_examples = page['items']
+    
+    if page['total'] == 0:
+        st.info("No examples found" if search else "No examples added yet")
+        return
+    
+    st.write(f"Showing {len(filtered_examples)} of {page['total']} example(s)")
     
-    st.write(f"Showing {len(filtered_examples)} example(s)")
+    # 翻页
+    col1, col2, col3 = st.columns([1, 1, 6])
+    with col1:
+        if st.button("⬅️ Prev", key="examples_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ➡️", key="examples_next", disabled=page['next_cursor'] is None):
+            cursors.append(page['next_cursor'])
+            st.rerun()
+    with col3:
+        total_pages = max(1, -(-page['total'] // config.DEFAULT_PAGE_SIZE))
+        st.caption(f"Page {len(cursors)} / {total_pages}")
     
     # 显示examples
     for ex in filtered_examples:
@@ -3,7 +3,6 @@
 """
 import streamlit as st
 from services.lemma_service import lemma_service
-from services.example_service import example_service
 from utils.validators import validate_lemma
 import config
 
@@ -177,8 +176,6 @@ def render():
         
         if success:
             st.success(f"✅ {message}")
-            # 刷新example的有效性
-            example_service.refresh_lemma_validity()
             # 重置POS meanings
             st.session_state.pos_meanings = [{'pos': 'n.', 'meanings': ['']}]
             st.rerun()
@@ -189,10 +186,11 @@ def render():
     st.markdown("---")
     st.markdown("### 📋 Recently Added")
     
-    lemmas = lemma_service.get_all_lemmas(sort_by='created_at')
+    # 只取按创建时间排序的前5个
+    lemmas = lemma_service.get_lemma_page(sort_by='created_at', page_size=5,
+                                          projection='detail')['items']
     if lemmas:
-        recent = lemmas[:5]  # 显示最近5个
-        for lemma_data in recent:
+        for lemma_data in lemmas:
             with st.expander(f"**{lemma_data['lemma']}** - {lemma_data['topic'] or 'No topic'}"):
                 st.write(f"**Pronunciation:** {lemma_data['pronunciation_british'] or 'N/A'}")
                 if lemma_data['pos_meaning']:
@@ -5,6 +5,7 @@ import streamlit as st
 from services.lemma_service import lemma_service
 from services.example_service import example_service
 from services.relation_service import relation_service
+from services.stats_service import stats_service
 import config
 
 
@@ -50,27 +51,23 @@ def render():
     # 统计面板
     col1, col2, col3 = st.columns(3)
     
-    total_lemmas = lemma_service.count_lemmas()
-    topics = lemma_service.get_all_topics()
+    stats = stats_service.get_stats()
+    topics = list(stats['topics'])
     
     with col1:
-        st.metric("Total Lemmas", total_lemmas)
+        st.metric("Total Lemmas", stats['total_lemmas'])
     with col2:
-        st.metric("Topics", len(topics))
+        st.metric("Topics", stats['topic_count'])
     with col3:
-        # 计算有examples的lemmas数量
-        all_lemmas = lemma_service.get_all_lemmas()
-        lemmas_with_examples = sum(1 for l in all_lemmas 
-                                   if example_service.get_examples_by_lemma(l['lemma']))
-        st.metric("Lemmas with Examples", lemmas_with_examples)
+        st.metric("Lemmas with Examples", stats['lemmas_with_examples'])
     
     st.markdown("---")
     
     # 搜索和过滤
-    col1, col2, col3 = st.columns([3, 2, 2])
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
     
     with col1:
-        search_term = st.text_input("🔎 Search lemma", placeholder="Type to search...")
+        search_term = st.text_input("🔎 Search", placeholder="Lemma, meaning, collocation, derivation...")
     
     with col2:
         selected_topic = st.selectbox(
@@ -84,26 +81,58 @@ def render():
             ["Alphabetical", "Recently Added", "Topic"]
         )
     
-    # 获取lemmas
+    with col4:
+        page_size = st.selectbox(
+            "📄 Per page",
+            config.PAGE_SIZE_OPTIONS,
+            index=config.PAGE_SIZE_OPTIONS.index(config.DEFAULT_PAGE_SIZE)
+        )
+    
+    # 分页状态：保存每一页的起始游标，过滤条件变化时回到第一页
+    view = (search_term, selected_topic, sort_by, page_size)
+    if st.session_state.get('browse_view') != view:
+        st.session_state.browse_view = view
+        st.session_state.browse_cursors = [None]
+    cursors = st.session_state.browse_cursors
+    
+    # 获取当前页lemmas（连同example/relation数量一次查出）
+    sort_map = {
+        "Alphabetical": "lemma",
+        "Recently Added": "created_at",
+        "Topic": "topic"
+    }
     if search_term:
-        lemmas = lemma_service.search_lemmas(search_term)
+        page = lemma_service.get_lemma_page(keyword=search_term, cursor=cursors[-1],
+                                            page_size=page_size)
     elif selected_topic != "All Topics":
-        lemmas = lemma_service.get_lemmas_by_topic(selected_topic)
+        page = lemma_service.get_lemma_page(topic=selected_topic, cursor=cursors[-1],
+                                            page_size=page_size)
     else:
-        sort_map = {
-            "Alphabetical": "lemma",
-            "Recently Added": "created_at",
-            "Topic": "topic"
-        }
-        lemmas = lemma_service.get_all_lemmas(sort_by=sort_map[sort_by])
+        page = lemma_service.get_lemma_page(sort_by=sort_map[sort_by], cursor=cursors[-1],
+                                            page_size=page_size)
+    lemmas = page['items']
     
     # 显示结果
-    st.markdown(f"### Found {len(lemmas)} lemma(s)")
+    st.markdown(f"### Found {page['total']} lemma(s)")
     
     if not lemmas:
         st.info("No lemmas found. Try a different search or add some lemmas!")
         return
     
+    # 翻页
+    total_pages = max(1, -(-page['total'] // page_size))
+    col1, col2, col3 = st.columns([1, 1, 6])
+    with col1:
+        if st.button("⬅️ Prev", key="browse_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ➡️", key="browse_next", disabled=page['next_cursor'] is None):
+            cursors.append(page['next_cursor'])
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(cursors)} / {total_pages}")
+    
     # 显示lemmas（超紧凑模式）
     for lemma_data in lemmas:
         with st.container():
@@ -118,6 +147,9 @@ def render():
                 if lemma_data['topic']:
                     lemma_display += f" · 📚 {lemma_data['topic']}"
                 st.markdown(lemma_display)
+                # 搜索时显示命中的内容片段
+                if lemma_data.get('snippet'):
+                    st.caption(f"↳ {lemma_data['snippet']}")
             
             with col2:
                 # 展开按钮 - 修改key避免冲突
@@ -129,9 +161,10 @@ def render():
                 # 编辑按钮
                 if st.button("✏️", key=f"edit_btn_{lemma_data['id']}", help="Edit"):
                     st.session_state[f'editing_lemma_{lemma_data["id"]}'] = True
-                    # 初始化POS编辑数据
-                    if lemma_data['pos_meaning']:
-                        st.session_state[f'edit_pos_{lemma_data["id"]}'] = lemma_data['pos_meaning'].copy()
+                    # 初始化POS编辑数据（列表只含摘要字段，释义从完整记录读取）
+                    detail = lemma_service.get_lemma(lemma_data['lemma']) or {}
+                    if detail.get('pos_meaning'):
+                        st.session_state[f'edit_pos_{lemma_data["id"]}'] = detail['pos_meaning'].copy()
                     else:
                         st.session_state[f'edit_pos_{lemma_data["id"]}'] = [{'pos': 'n.', 'meanings': ['']}]
             
@@ -146,9 +179,8 @@ def render():
                         st.error(msg)
             
             with col5:
-                # 关系网络按钮（如果有relations）
-                relations = relation_service.get_relations_by_lemma(lemma_data['lemma'])
-                if relations:
+                # 关系网络按钮（如果有relations，计数来自内存关系图）
+                if relation_service.count_relations(lemma_data['lemma']):
                     if st.button("🕸️", key=f"net_btn_{lemma_data['id']}", help="Relation network"):
                         net_key = f'show_network_{lemma_data["id"]}'
                         st.session_state[net_key] = not st.session_state.get(net_key, False)
@@ -157,43 +189,47 @@ def render():
             if st.session_state.get(f"expanded_{lemma_data['id']}", False):
                 st.markdown("---")
                 col1, col2 = st.columns(2)
+                # 列表只含摘要字段，展开时再读取完整记录
+                detail = lemma_service.get_lemma(lemma_data['lemma']) or {}
                 
                 with col1:
-                    if lemma_data['spell_nuance']:
-                        st.write(f"**Spell Nuance:** {lemma_data['spell_nuance']}")
+                    if detail.get('spell_nuance'):
+                        st.write(f"**Spell Nuance:** {detail['spell_nuance']}")
                     
                     # POS和meanings
-                    if lemma_data['pos_meaning']:
+                    if detail.get('pos_meaning'):
                         st.write("**Meanings:**")
-                        for pm in lemma_data['pos_meaning']:
+                        for pm in detail['pos_meaning']:
                             st.write(f"*{pm['pos']}*")
                             for i, meaning in enumerate(pm['meanings'], 1):
                                 st.write(f"  {i}. {meaning}")
                 
                 with col2:
                     # Inflection
-                    if lemma_data['inflection']:
+                    if detail.get('inflection'):
                         st.write("**Inflection:**")
-                        for key, values in lemma_data['inflection'].items():
+                        for key, values in detail['inflection'].items():
                             st.write(f"  *{key}:* {', '.join(values)}")
                     
                     # Derivation
-                    if lemma_data['derivation']:
+                    if detail.get('derivation'):
                         st.write("**Derivation:**")
-                        for deriv in lemma_data['derivation']:
+                        for deriv in detail['derivation']:
                             if deriv.get('meaning'):
                                 st.write(f"  • {deriv['word']}: {deriv['meaning']}")
                             else:
                                 st.write(f"  • {deriv['word']}")
                     
                     # Collocation
-                    if lemma_data['collocation']:
-                        st.write(f"**Collocation:** {lemma_data['collocation']}")
+                    if detail.get('collocation'):
+                        st.write(f"**Collocation:** {detail['collocation']}")
                 
                 st.markdown("---")
                 
                 # Examples按钮
-                examples = example_service.get_examples_by_lemma(lemma_data['lemma'])
+                examples = []
+                if lemma_data['example_count']:
+                    examples = example_service.get_examples_by_lemma(lemma_data['lemma'])
                 if examples:
                     if st.button(f"📖 Examples ({len(examples)})", key=f"show_ex_{lemma_data['id']}"):
                         ex_key = f'show_examples_{lemma_data["id"]}'
@@ -211,7 +247,9 @@ def render():
                     st.caption("_No examples yet_")
                 
                 # Relations列表
-                relations = relation_service.get_relations_by_lemma(lemma_data['lemma'])
+                relations = []
+                if relation_service.count_relations(lemma_data['lemma']):
+                    relations = relation_service.get_relations_by_lemma(lemma_data['lemma'])
                 if relations:
                     if st.button(f"🔗 Relations ({len(relations)})", key=f"show_rel_{lemma_data['id']}"):
                         rel_key = f'show_relations_{lemma_data["id"]}'
@@ -235,11 +273,15 @@ def render():
             # 显示关系网络（如果被触发，显示在当前lemma下方）
             if st.session_state.get(f'show_network_{lemma_data["id"]}', False):
                 st.markdown("---")
-                show_relation_network_inline(lemma_data, relations)
+                relations = relation_service.get_relations_by_lemma(lemma_data['lemma'])
+                if relations:
+                    show_relation_network_inline(lemma_data, relations)
             
             # 编辑表单（在下方显示）
             if st.session_state.get(f'editing_lemma_{lemma_data["id"]}', False):
-                render_edit_form(lemma_data)
+                detail = lemma_service.get_lemma(lemma_data['lemma'])
+                if detail:
+                    render_edit_form(detail)
             
             st.markdown("---")
 
@@ -0,0 +1,53 @@
+"""
+侧边栏性能面板 - 显示本次重新运行及当前页面累计的数据库开销
+"""
+import streamlit as st
+import config
+from database.profiler import query_profiler, ProfileScope
+
+
+def render(profile: ProfileScope):
+    """
+    渲染性能面板
+
+    Args:
+        profile: 本次重新运行的统计范围（已结束）
+    """
+    with st.expander("⏱ Performance", expanded=False):
+        st.caption(f"This run · {profile.name}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queries", profile.query_count)
+        col2.metric("DB time", f"{profile.db_time * 1000:.1f} ms")
+        col3.metric("Run time", f"{profile.elapsed * 1000:.0f} ms")
+        if profile.lock_wait:
+            st.caption(f"Waiting for connections / write queue: {profile.lock_wait * 1000:.1f} ms")
+
+        top = profile.top()
+        if top:
+            st.markdown("**Top queries (this run)**")
+            st.dataframe(_table(top), hide_index=True, use_container_width=True)
+        else:
+            st.info("No queries in this run")
+
+        page = query_profiler.page_stats(profile.name)
+        if page:
+            st.caption(f"Page average over {page['runs']} runs: "
+                       f"{page['avg_queries']:.1f} queries, {page['avg_db_time_ms']:.1f} ms DB time")
+            st.markdown("**Top queries (page total)**")
+            st.dataframe(_table(page['top']), hide_index=True, use_container_width=True)
+
+        st.caption(f"Slow query log threshold: {config.SLOW_QUERY_MS} ms")
+        if st.button("Reset page statistics", key="perf_panel_reset"):
+            query_profiler.reset()
+
+
+def _table(stats):
+    """把语句统计转换为表格行"""
+    return [{
+        'SQL': stat['sql'][:120],
+        'Calls': stat['count'],
+        'Total ms': round(stat['total_ms'], 2),
+        'Max ms': round(stat['max_ms'], 2),
+        'Rows': stat['rows'],
+        'Call site': stat['site']
+    } for stat in stats]
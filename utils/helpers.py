@@ -1,9 +1,13 @@
 """
 辅助函数
 """
+import gzip
 import json
+import os
+import re
+import time
 import uuid
-from typing import Any, Optional
+from typing import IO, Any, Optional
 
 
 def generate_uuid() -> str:
@@ -11,6 +15,19 @@ def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+def generate_time_uuid() -> str:
+    """
+    生成按时间递增的UUID（版本7格式：前48位为毫秒时间戳，其余为随机数）
+
+    批量插入时主键索引基本按顺序追加，避免随机UUID造成的B树页分裂
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | (0x7 << 76)  # 版本号
+    value = value & ~(0x3 << 62) | (0x2 << 62)  # 变体
+    h = '%032x' % value  # 直接格式化，比构造uuid.UUID对象快
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
 def to_json(obj: Any) -> str:
     """将对象转换为JSON字符串"""
     if obj is None:
@@ -30,4 +47,45 @@ def from_json(json_str: Optional[str]) -> Any:
 
 def safe_get(dictionary: dict, key: str, default=None) -> Any:
     """安全地从字典获取值"""
-    return dictionary.get(key, default) if dictionary else default
\ No newline at end of file
+    return dictionary.get(key, default) if dictionary else default
+
+
+def to_fts_query(keyword: str) -> Optional[str]:
+    """
+    将用户输入的关键词转换为FTS5查询语句
+    
+    每个词作为前缀匹配，多个词之间为AND关系；输入中的FTS5语法字符会被忽略。
+    没有可检索的词时返回None。
+    """
+    if not keyword:
+        return None
+    terms = re.findall(r"[^\W_]+", keyword)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def detect_file_format(path: str) -> str:
+    """根据扩展名判断导入/导出文件的格式（'csv' 或 'jsonl'），忽略.gz后缀"""
+    name = path[:-3] if path.endswith('.gz') else path
+    ext = os.path.splitext(name)[1].lower().lstrip('.')
+    if ext in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if ext == 'csv':
+        return 'csv'
+    raise ValueError(f"无法识别文件格式: {path}（请指定csv或jsonl）")
+
+
+def open_text_file(path: str, mode: str = 'r', compressed: Optional[bool] = None) -> IO[str]:
+    """
+    以UTF-8打开文本文件
+
+    compressed为空时根据.gz后缀判断是否gzip压缩/解压
+    """
+    encoding = 'utf-8-sig' if mode == 'r' else 'utf-8'  # 读取时兼容Excel保存的BOM
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    if compressed:
+        # 压缩级别6与zlib默认相同，比gzip默认的9快一倍，体积只略大
+        return gzip.open(path, mode + 't', compresslevel=6, encoding=encoding, newline='')
+    return open(path, mode, encoding=encoding, newline='')